@@ -5,6 +5,9 @@ It exposes the ASGI callable as a module-level variable named ``application``.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
+
+Luồng sự kiện phòng (/api/events/rooms/, Server-Sent Events) giữ kết nối lâu,
+nên cần chạy bằng ASGI server: python manage.py serve_asgi (uvicorn core.asgi:application)
 """
 
 import os
@@ -10,6 +10,8 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+import importlib.util
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -47,6 +49,7 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'corsheaders.middleware.CorsMiddleware',
+    'hotel.middleware.CompressionMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -54,8 +57,17 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'hotel.middleware.SQLiteWriteQueueMiddleware',
+    'hotel.middleware.QueryStatsMiddleware',
+    'hotel.middleware.ReplicaStickinessMiddleware',
 ]
 
+# Chỉ nén gzip response từ cỡ này trở lên (byte)
+GZIP_MIN_LENGTH = 1024
+
+# Đo số query / thời gian SQL của mỗi request (header X-DB-* + log 'hotel.sql'), mặc định bật khi DEBUG
+SQL_INSTRUMENTATION = DEBUG
+
 ROOT_URLCONF = 'core.urls'
 
 TEMPLATES = [
@@ -74,6 +86,12 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = 'core.wsgi.application'
+# Chạy production bằng ASGI (uvicorn): python manage.py serve_asgi, cần cho luồng sự kiện phòng
+ASGI_APPLICATION = 'core.asgi.application'
+
+# Luồng sự kiện phòng (SSE): None = chỉ bật khi chạy ASGI; ROOM_EVENTS=0/1 để tắt/bật hẳn
+ROOM_EVENTS_ENABLED = {'0': False, '1': True}.get(os.environ.get('ROOM_EVENTS'))
+ROOM_EVENTS_TICKET_SECONDS = 30
 
 
 # Database
@@ -86,6 +104,68 @@ DATABASES = {
     }
 }
 
+# Chạy trên PostgreSQL (VD: thử tải): DB_ENGINE=postgresql DB_NAME=kiot DB_USER=... (cần cài psycopg)
+if os.environ.get('DB_ENGINE') == 'postgresql':
+    DATABASES['default'] = {
+        'ENGINE': 'django.db.backends.postgresql',
+        'NAME': os.environ.get('DB_NAME', 'kiot'),
+        'USER': os.environ.get('DB_USER', 'postgres'),
+        'PASSWORD': os.environ.get('DB_PASSWORD', ''),
+        'HOST': os.environ.get('DB_HOST', 'localhost'),
+        'PORT': os.environ.get('DB_PORT', '5432'),
+    }
+
+# SQLite cho chi nhánh nhỏ chạy 1 máy: SQLITE_MODE=production (WAL + pragma + hàng đợi ghi, xem hotel/sqlite_writer.py)
+SQLITE_PRODUCTION_MODE = os.environ.get('SQLITE_MODE') == 'production'
+if SQLITE_PRODUCTION_MODE and DATABASES['default']['ENGINE'] == 'django.db.backends.sqlite3':
+    DATABASES['default']['OPTIONS'] = {
+        'transaction_mode': 'IMMEDIATE',  # Giành khóa ghi từ BEGIN, chờ theo timeout thay vì báo "database is locked"
+        'timeout': 20,  # busy_timeout (giây)
+        'init_command': (
+            'PRAGMA journal_mode=WAL;'
+            'PRAGMA synchronous=NORMAL;'
+            'PRAGMA cache_size=-20000;'  # ~20MB
+            'PRAGMA temp_store=MEMORY;'
+            'PRAGMA mmap_size=134217728;'
+        ),
+    }
+
+# DB replica chỉ đọc cho báo cáo / thống kê / xuất dữ liệu (hotel/replica.py).
+# SQLite thử trên máy: DB_REPLICA_NAME=db.replica.sqlite3 rồi chạy `manage.py sync_replica --interval 5`
+# PostgreSQL: DB_REPLICA_HOST=... (và DB_REPLICA_NAME nếu khác tên DB chính)
+if os.environ.get('DB_REPLICA_NAME') or os.environ.get('DB_REPLICA_HOST'):
+    DATABASES['replica'] = {
+        **DATABASES['default'],
+        'NAME': os.environ.get('DB_REPLICA_NAME', DATABASES['default']['NAME']),
+        'TEST': {'MIRROR': 'default'},
+    }
+    if os.environ.get('DB_REPLICA_HOST'):
+        DATABASES['replica']['HOST'] = os.environ['DB_REPLICA_HOST']
+    DATABASE_ROUTERS = ['hotel.db_router.ReplicaRouter']
+
+REPLICA_MAX_LAG_SECONDS = float(os.environ.get('REPLICA_MAX_LAG_SECONDS', 5))  # Trễ hơn thì đọc DB chính
+REPLICA_STICKY_SECONDS = float(os.environ.get('REPLICA_STICKY_SECONDS', 10))  # Sau khi ghi, user đọc DB chính trong N giây
+
+
+# Cache (dùng cho cache báo cáo). Chạy nhiều worker thì đổi sang Redis/Memcached để dùng chung
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'kiot-default',
+        'OPTIONS': {'MAX_ENTRIES': 5000},
+    }
+}
+
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {'console': {'class': 'logging.StreamHandler'}},
+    'loggers': {
+        'hotel.sql': {'handlers': ['console'], 'level': 'WARNING', 'propagate': False},
+    },
+}
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -140,6 +220,12 @@ REST_FRAMEWORK = {
     'DEFAULT_PERMISSION_CLASSES': (
         'rest_framework.permissions.IsAuthenticated', # Bắt buộc đăng nhập mới được gọi API
     ),
+    # JSON của DRF vẫn là mặc định; orjson / msgpack khi client chọn qua Accept (xem hotel/renderers.py, đều là gói tùy chọn)
+    'DEFAULT_RENDERER_CLASSES': [
+        'rest_framework.renderers.JSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+        'hotel.renderers.ORJSONRenderer',
+    ] + (['hotel.renderers.MsgPackRenderer'] if importlib.util.find_spec('msgpack') else []),
 }
 
 from datetime import timedelta
@@ -0,0 +1,89 @@
+"""
+Ghi nhật ký hoạt động (ActivityLog) kiểu write-behind:
+- Mặc định: gom vào bộ đệm trong process sau khi transaction nghiệp vụ commit, ghi bằng bulk_create
+  khi đủ ACTIVITY_LOG_BUFFER_SIZE dòng hoặc sau ACTIVITY_LOG_FLUSH_INTERVAL giây; luôn ghi nốt khi process tắt
+  (process bị kill thì mất phần chưa ghi). created_at là lúc ghi xuống DB, để dòng ghi trễ luôn nằm đầu danh sách
+  phân trang theo cursor (-created_at) thay vì lọt vào trang client đã đọc qua.
+- durable=True: ghi ngay trong transaction nghiệp vụ (commit/rollback cùng nhau), bắt buộc cho nhật ký kiểm soát
+  (tiền, nhận/trả phòng, đặt/hủy đơn).
+- settings.ACTIVITY_LOG_MODE = 'sync' để mọi log đều ghi ngay (VD: khi chạy test).
+"""
+import atexit
+import logging
+import threading
+
+from django.conf import settings
+from django.db import transaction, close_old_connections
+from django.utils import timezone
+
+from . import sqlite_writer
+from .models import ActivityLog
+
+logger = logging.getLogger(__name__)
+
+MAX_BUFFERED = 10000  # DB lỗi lâu thì bỏ bớt log cũ, không để bộ nhớ tăng mãi
+
+
+class ActivityLogBuffer:
+    def __init__(self, size=100, interval=2.0, background=True):
+        self.size = size
+        self.interval = interval
+        self.background = background
+        self.lock = threading.Lock()
+        self.entries = []
+        self.wakeup = threading.Event()
+        self.thread = None
+
+    def add(self, entry):
+        with self.lock:
+            self.entries.append(entry)
+            if len(self.entries) > MAX_BUFFERED:
+                del self.entries[:len(self.entries) - MAX_BUFFERED]
+            full = len(self.entries) >= self.size
+            if self.background and self.thread is None:
+                self.thread = threading.Thread(target=self.run, name='activity-log-writer', daemon=True)
+                self.thread.start()
+        if full:
+            self.wakeup.set()
+
+    def flush(self):
+        with self.lock:
+            entries, self.entries = self.entries, []
+        if not entries:
+            return 0
+        now = timezone.now()
+        for entry in entries:
+            entry.created_at = now
+        try:
+            with sqlite_writer.write_slot():
+                ActivityLog.objects.bulk_create(entries, batch_size=500)
+        except Exception:
+            logger.exception("Không ghi được %s dòng nhật ký, sẽ thử lại", len(entries))
+            with self.lock:
+                self.entries[:0] = entries
+            return 0
+        return len(entries)
+
+    def run(self):
+        while True:
+            self.wakeup.wait(self.interval)
+            self.wakeup.clear()
+            close_old_connections()
+            self.flush()
+
+
+buffer = ActivityLogBuffer(
+    size=getattr(settings, 'ACTIVITY_LOG_BUFFER_SIZE', 100),
+    interval=getattr(settings, 'ACTIVITY_LOG_FLUSH_INTERVAL', 2.0),
+)
+atexit.register(buffer.flush)
+
+
+def log_activity(user, action, content, durable=False):
+    user = user if user is not None and user.is_authenticated else None
+    if durable or getattr(settings, 'ACTIVITY_LOG_MODE', 'buffered') == 'sync':
+        return ActivityLog.objects.create(user=user, action=action, content=content)
+
+    entry = ActivityLog(user=user, action=action, content=content)
+    transaction.on_commit(lambda: buffer.add(entry))
+    return entry
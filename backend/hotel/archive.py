@@ -0,0 +1,36 @@
+"""
+Lưu trữ nhật ký hoạt động: chuyển ActivityLog cũ sang ActivityLogArchive theo từng lô,
+mỗi lô 1 transaction (copy rồi xóa), để bảng đang dùng luôn nhỏ và truy vấn dashboard nhanh.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .models import ActivityLog, ActivityLogArchive
+
+RETENTION_DAYS = getattr(settings, 'ACTIVITY_LOG_RETENTION_DAYS', 90)
+BATCH_SIZE = 5000
+
+
+def archive_activity_logs(older_than_days=RETENTION_DAYS, batch_size=BATCH_SIZE, dry_run=False):
+    """Chuyển nhật ký cũ hơn `older_than_days` ngày sang bảng lưu trữ. Trả về số dòng đã chuyển."""
+    cutoff = timezone.now() - timedelta(days=older_than_days)
+    old_logs = ActivityLog.objects.filter(created_at__lt=cutoff)
+    if dry_run:
+        return old_logs.count()
+
+    moved = 0
+    while True:
+        with transaction.atomic():
+            batch = list(old_logs.order_by('id').values('id', 'user_id', 'action', 'content', 'created_at')[:batch_size])
+            if not batch:
+                return moved
+            ActivityLogArchive.objects.bulk_create([
+                ActivityLogArchive(original_id=row['id'], user_id=row['user_id'], action=row['action'],
+                                   content=row['content'], created_at=row['created_at'])
+                for row in batch
+            ])
+            ActivityLog.objects.filter(id__in=[row['id'] for row in batch]).delete()
+        moved += len(batch)
@@ -0,0 +1,121 @@
+"""
+Lịch phòng trống: mỗi đêm phòng bị giữ là 1 dòng RoomNight (room, date) có ràng buộc unique.
+- Giữ phòng = bulk insert các đêm; trùng với đơn khác thì DB báo IntegrityError -> từ chối, không cần khóa.
+- Tìm phòng trống cả chi nhánh trong khoảng ngày = 1 query (loại các phòng có đêm bị giữ trong khoảng).
+- Cùng 1 quy tắc cho đặt trước, nhận phòng trực tiếp và xác nhận nhận phòng: lượt ở theo ngày / qua đêm giữ mọi đêm
+  [ngày vào, ngày ra dự kiến) (không có ngày ra thì 1 đêm); lượt ở theo giờ giữ nguyên ngày vào (trùng đơn theo ngày
+  hoặc đơn theo giờ khác cùng ngày thì bị từ chối, trả phòng xong thì ngày đó được nhả ra).
+- Khách ở quá ngày ra dự kiến: extend_open_stays() giữ thêm các đêm tới hôm nay (chạy mỗi đêm bằng lệnh
+  extend_room_nights, và trước mỗi lần giữ phòng), đơn đặt trước trùng đêm đó sẽ bị từ chối.
+"""
+from datetime import datetime, timedelta
+
+from django.db import transaction, IntegrityError
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .models import Room, RoomNight, BookingRoom
+
+
+class RoomUnavailable(Exception):
+    pass
+
+
+def to_datetime(value):
+    """Nhận datetime hoặc chuỗi ISO từ request, trả về datetime có múi giờ (hoặc None)."""
+    if isinstance(value, str):
+        value = parse_datetime(value)
+    if isinstance(value, datetime) and timezone.is_naive(value):
+        value = timezone.make_aware(value)
+    return value
+
+
+def nights_between(start, end=None):
+    """Các đêm bị chiếm khi ở từ start tới end: [ngày vào, ngày ra), tối thiểu 1 đêm."""
+    first = timezone.localdate(start)
+    last = timezone.localdate(end) if end else first
+    return [first + timedelta(days=i) for i in range(max(1, (last - first).days))]
+
+
+def stay_nights(booking_type, start, end=None):
+    """Các đêm 1 lượt ở phải giữ theo loại lượt ở (theo giờ: chỉ giữ ngày vào)."""
+    if booking_type == 'HOURLY':
+        return [timezone.localdate(start)]
+    return nights_between(start, end)
+
+
+def open_stays():
+    """Lượt ở đang có khách (mọi loại lượt ở)."""
+    return BookingRoom.objects.filter(check_in_actual__isnull=False, check_out_actual__isnull=True)
+
+
+def extend_open_stays(room_id=None, today=None):
+    """Giữ thêm cho khách đang ở các đêm từ ngày vào tới hôm nay còn thiếu (đêm đã có đơn khác giữ thì bỏ qua).
+    Trả về số đêm còn thiếu."""
+    today = today or timezone.localdate()
+    stays = open_stays()
+    if room_id is not None:
+        stays = stays.filter(room_id=room_id)
+    stays = list(stays.only('id', 'room_id', 'check_in_actual'))
+    if not stays:
+        return 0
+    held = set(RoomNight.objects.filter(booking_room__in=stays).values_list('booking_room_id', 'date'))
+    missing = []
+    for stay in stays:
+        first = timezone.localdate(stay.check_in_actual)
+        missing += [
+            RoomNight(room_id=stay.room_id, date=night, booking_room=stay)
+            for night in (first + timedelta(days=i) for i in range((today - first).days + 1))
+            if (stay.id, night) not in held
+        ]
+    RoomNight.objects.bulk_create(missing, ignore_conflicts=True)
+    return len(missing)
+
+
+def claim(booking_room, start, end=None):
+    """Giữ phòng cho BookingRoom trong khoảng thời gian, báo RoomUnavailable nếu trùng."""
+    nights = stay_nights(booking_room.booking_type, start, end)
+    extend_open_stays(room_id=booking_room.room_id)
+    held = list(RoomNight.objects.filter(room_id=booking_room.room_id, date__in=nights).values_list('date', 'booking_room_id'))
+    taken = [d for d, owner in held if owner != booking_room.id]
+    own = {d for d, owner in held if owner == booking_room.id}
+    if not taken:
+        try:
+            with transaction.atomic():
+                RoomNight.objects.bulk_create([
+                    RoomNight(room_id=booking_room.room_id, date=night, booking_room=booking_room)
+                    for night in nights if night not in own
+                ])
+            return nights
+        except IntegrityError:
+            # Đơn khác vừa giữ cùng đêm
+            taken = list(RoomNight.objects.filter(room_id=booking_room.room_id, date__in=nights)
+                         .exclude(booking_room=booking_room).values_list('date', flat=True))
+    raise RoomUnavailable(f"Phòng đã có khách/đặt trước các đêm: {', '.join(d.strftime('%d/%m') for d in sorted(taken))}")
+
+
+def reconcile(booking_room, start, end=None):
+    """Giữ lại đúng các đêm của lượt ở khi ngày vào / loại lượt ở thay đổi (VD: nhận phòng khác ngày đặt trước)."""
+    nights = stay_nights(booking_room.booking_type, start, end)
+    RoomNight.objects.filter(booking_room=booking_room).exclude(date__in=nights).delete()
+    return claim(booking_room, start, end)
+
+
+def release(booking_rooms, from_date=None):
+    """Trả lại các đêm đã giữ (hủy đơn, trả phòng sớm)."""
+    nights = RoomNight.objects.filter(booking_room__in=booking_rooms)
+    if from_date:
+        nights = nights.filter(date__gte=from_date)
+    nights.delete()
+
+
+def free_rooms(branch_id, start_date, end_date, room_class_id=None):
+    """Phòng còn trống mọi đêm trong [start_date, end_date)."""
+    busy = RoomNight.objects.filter(date__gte=start_date, date__lt=max(end_date, start_date + timedelta(days=1))).values('room_id')
+    rooms = Room.objects.filter(branch_id=branch_id, is_active=True).exclude(id__in=busy)
+    if start_date <= timezone.localdate():
+        # Khách đang ở luôn giữ đêm nay, kể cả khi lệnh extend_room_nights chưa chạy
+        rooms = rooms.exclude(id__in=open_stays().values('room_id'))
+    if room_class_id:
+        rooms = rooms.filter(room_class_id=room_class_id)
+    return rooms
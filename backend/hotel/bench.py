@@ -0,0 +1,164 @@
+"""
+Đo thời gian các API nóng qua đúng view thật (APIClient trong process, không qua mạng).
+- Thao tác ghi (check-in, check-out, đặt phòng) chạy trong transaction rồi rollback: dữ liệu không đổi giữa các lần đo.
+- API báo cáo được đo khi cache trống (đường chậm nhất); cache_stats / writer_stats không đo.
+- Mỗi API ghi lại mean/p50/p95/p99/min/max (ms) và số query, để lưu JSON và so sánh giữa các phiên bản.
+- RenderBenchmark: thời gian render và cỡ payload (thô / gzip) của danh sách đơn, khách theo từng renderer.
+"""
+import gzip
+import math
+import random
+import statistics
+import time
+from datetime import timedelta
+
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+
+from .models import Room
+from .renderers import available_renderers
+from .query_stats import record_queries
+from .views import ReportViewSet
+
+SKIPPED_REPORT_ACTIONS = ('cache_stats', 'writer_stats')
+
+
+def percentile(sorted_values, p):
+    if not sorted_values:
+        return 0
+    # Nearest-rank: giá trị nhỏ nhất mà >= p% số mẫu không vượt quá
+    rank = max(1, math.ceil(p / 100 * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+def summarize(durations_ms):
+    values = sorted(durations_ms)
+    return {
+        'runs': len(values),
+        'mean_ms': round(statistics.fmean(values), 3) if values else 0,
+        'p50_ms': round(percentile(values, 50), 3),
+        'p95_ms': round(percentile(values, 95), 3),
+        'p99_ms': round(percentile(values, 99), 3),
+        'min_ms': round(values[0], 3) if values else 0,
+        'max_ms': round(values[-1], 3) if values else 0,
+    }
+
+
+class _Rollback(Exception):
+    pass
+
+
+class EndpointBenchmark:
+    def __init__(self, user, runs=20, rng=None):
+        self.client = APIClient()
+        self.client.force_authenticate(user)
+        self.runs = runs
+        self.rng = rng or random.Random(0)
+
+    def cases(self):
+        branch_id = Room.objects.values_list('branch_id', flat=True).first()
+        cases = [
+            ('rooms.list', lambda: self.client.get('/api/rooms/', {'branch': branch_id}), False),
+            ('rooms.check_in', lambda: self.client.post(f"/api/rooms/{self.pick_room('AVAILABLE')}/check_in/",
+                                                       {'full_name': "Khách Benchmark", 'booking_type': 'DAILY'}, format='json'), True),
+            ('rooms.check_out', lambda: self.client.post(f"/api/rooms/{self.pick_room('OCCUPIED')}/check_out/"), True),
+            ('bookings.reserve', self.reserve, True),
+            ('bookings.stats', lambda: self.client.get('/api/bookings/stats/'), False),
+        ]
+        for extra in ReportViewSet.get_extra_actions():
+            if extra.__name__ not in SKIPPED_REPORT_ACTIONS:
+                url = f"/api/reports/{extra.url_path}/"
+                cases.append((f'reports.{extra.__name__}', lambda url=url: self.client.get(url, {'filter': 'this_month'}), False))
+        return cases
+
+    def pick_room(self, status):
+        ids = list(Room.objects.filter(status=status).values_list('id', flat=True)[:200])
+        if not ids:
+            raise RuntimeError(f"Không có phòng {status} để đo")
+        return self.rng.choice(ids)
+
+    def reserve(self):
+        start = timezone.now() + timedelta(days=self.rng.randint(400, 800))
+        return self.client.post('/api/bookings/reserve/', {
+            'customer': {'full_name': "Khách Benchmark", 'phone': "0900000000"},
+            'room_id': self.pick_room('AVAILABLE'), 'booking_type': 'DAILY',
+            'check_in_expected': start.isoformat(), 'check_out_expected': (start + timedelta(days=2)).isoformat(),
+        }, format='json')
+
+    def measure(self, request, writes):
+        cache.clear()
+        with record_queries() as rec:
+            started = time.perf_counter()
+            if writes:
+                try:
+                    with transaction.atomic():
+                        response = request()
+                        raise _Rollback
+                except _Rollback:
+                    pass
+            else:
+                response = request()
+            elapsed = (time.perf_counter() - started) * 1000
+        if response.status_code >= 400:
+            raise RuntimeError(f"{response.status_code}: {getattr(response, 'data', '')}")
+        return elapsed, rec.count
+
+    def run(self):
+        results = {}
+        for name, request, writes in self.cases():
+            self.measure(request, writes)  # Làm nóng (cache trong process, kết nối DB)
+            durations, queries = [], []
+            for _ in range(self.runs):
+                elapsed, count = self.measure(request, writes)
+                durations.append(elapsed)
+                queries.append(count)
+            results[name] = {**summarize(durations), 'queries': max(queries)}
+        return results
+
+
+class RenderBenchmark:
+    LISTS = (('bookings', '/api/bookings/'), ('customers', '/api/customers/'))
+
+    def __init__(self, user, runs=20):
+        self.client = APIClient()
+        self.client.force_authenticate(user)
+        self.runs = runs
+
+    def run(self):
+        """{'render.<danh sách>.<định dạng>': thời gian render + bytes, gzip_bytes, size_vs_json}."""
+        results = {}
+        for name, url in self.LISTS:
+            json_bytes = None
+            for renderer_class in [JSONRenderer] + available_renderers():
+                # Mỗi renderer lấy dữ liệu qua đúng view (renderer nhanh nhận tiền dạng số), chỉ bấm giờ phần render
+                response = self.client.get(url, HTTP_ACCEPT=renderer_class.media_type)
+                if response.status_code >= 400:
+                    raise RuntimeError(f"{response.status_code}: {getattr(response, 'data', '')}")
+                renderer, durations = renderer_class(), []
+                for _ in range(self.runs):
+                    started = time.perf_counter()
+                    content = renderer.render(response.data, renderer_class.media_type, {})
+                    durations.append((time.perf_counter() - started) * 1000)
+                json_bytes = json_bytes or len(content)
+                results[f'render.{name}.{renderer_class.format}'] = {
+                    **summarize(durations),
+                    'bytes': len(content),
+                    'gzip_bytes': len(gzip.compress(content)),
+                    'size_vs_json': round(len(content) / json_bytes, 3),
+                }
+        return results
+
+
+def compare(previous, current):
+    """[(kích thước, API, p50 cũ, p50 mới, tỉ lệ)] giữa 2 file kết quả."""
+    rows = []
+    for size, endpoints in current['results'].items():
+        for name, stats in endpoints.items():
+            old = previous.get('results', {}).get(size, {}).get(name)
+            if old:
+                ratio = stats['p50_ms'] / old['p50_ms'] if old['p50_ms'] else None
+                rows.append((size, name, old['p50_ms'], stats['p50_ms'], ratio))
+    return rows
@@ -0,0 +1,108 @@
+"""
+Sinh mã đơn (Booking.code) không trùng, không cần 1 lần gọi DB cho mỗi mã.
+- Mỗi process xin 1 khối số liên tiếp từ CodeSequence (UPDATE next_value = next_value + N) rồi cấp dần trong bộ nhớ.
+- Khối được xin trong transaction ngắn riêng và commit ngay (gọi từ trong transaction của request thì chạy trên kết nối
+  riêng), để dòng CodeSequence không bị khóa tới khi request commit. Request rollback thì để hở số, chấp nhận được.
+  Chi nhánh chưa commit (tạo trong cùng request) thì kết nối riêng không thấy: quay về xin trong transaction hiện tại.
+- Riêng SQLite: DB chỉ có 1 người ghi, transaction của request đã giữ khóa ghi nên kết nối riêng sẽ phải chờ chính nó.
+  Khi đó khối xin trong transaction hiện tại và chỉ được dùng chung sau khi commit (rollback thì bộ đếm cũng quay lại).
+- Mã dạng DP20261018-01-0000123: đọc được, sắp xếp được theo ngày + số thứ tự trong chi nhánh.
+"""
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import connection, transaction, IntegrityError
+from django.db.models import F
+from django.utils import timezone
+
+from .models import CodeSequence
+
+BLOCK_SIZE = getattr(settings, 'BOOKING_CODE_BLOCK_SIZE', 50)
+SINGLE_WRITER_VENDORS = ('sqlite',)
+
+
+class _Block:
+    def __init__(self, start, end):
+        self.next = start
+        self.end = end
+
+    def take(self):
+        if self.next >= self.end:
+            return None
+        value = self.next
+        self.next += 1
+        return value
+
+
+class CodeGenerator:
+    def __init__(self, block_size=BLOCK_SIZE):
+        self.block_size = block_size
+        self.lock = threading.Lock()
+        self.blocks = {}  # (branch_id, prefix) -> _Block đã commit, dùng chung trong process
+
+    def reserve(self, branch_id, prefix):
+        """Tăng bộ đếm thêm 1 khối (gọi trong transaction), trả về khối vừa xin."""
+        sequences = CodeSequence.objects.filter(branch_id=branch_id, prefix=prefix)
+        if not sequences.update(next_value=F('next_value') + self.block_size):
+            try:
+                with transaction.atomic():
+                    CodeSequence.objects.create(branch_id=branch_id, prefix=prefix, next_value=1 + self.block_size)
+            except IntegrityError:
+                # Process khác vừa tạo bộ đếm
+                sequences.update(next_value=F('next_value') + self.block_size)
+        end = sequences.values_list('next_value', flat=True).get()
+        return _Block(end - self.block_size, end)
+
+    def allocate_block(self, branch_id, prefix):
+        """Trả về (khối, đã commit chưa)."""
+        if not connection.in_atomic_block:
+            with transaction.atomic(durable=True):
+                return self.reserve(branch_id, prefix), True
+        if connection.vendor in SINGLE_WRITER_VENDORS:
+            return self.reserve(branch_id, prefix), False
+        try:
+            with ThreadPoolExecutor(1) as pool:
+                return pool.submit(self.reserve_on_own_connection, branch_id, prefix).result(), True
+        except (IntegrityError, CodeSequence.DoesNotExist):
+            # Chi nhánh vừa tạo trong transaction của request, kết nối riêng chưa thấy: xin trong transaction hiện tại
+            return self.reserve(branch_id, prefix), False
+
+    def reserve_on_own_connection(self, branch_id, prefix):
+        # Chạy trong thread riêng = kết nối DB riêng, commit ngay không chờ transaction của request
+        try:
+            with transaction.atomic(durable=True):
+                return self.reserve(branch_id, prefix)
+        finally:
+            connection.close()
+
+    def next_value(self, branch_id, prefix):
+        key = (branch_id, prefix)
+        with self.lock:
+            block = self.blocks.get(key)
+            value = block.take() if block else None
+        if value is not None:
+            return value
+
+        block, committed = self.allocate_block(branch_id, prefix)
+        value = block.take()
+
+        def share():
+            with self.lock:
+                self.blocks[key] = block
+        if committed:
+            share()
+        else:
+            transaction.on_commit(share)
+        return value
+
+    def next_code(self, branch_id, prefix):
+        value = self.next_value(branch_id, prefix)
+        return f"{prefix}{timezone.localdate():%Y%m%d}-{branch_id:02d}-{value:07d}"
+
+
+generator = CodeGenerator()
+
+
+def next_booking_code(branch_id, prefix):
+    return generator.next_code(branch_id, prefix)
@@ -0,0 +1,91 @@
+"""
+Cache trong process cho dữ liệu cấu hình giá: BranchSetting và RoomClass (vài lần 1 năm mới đổi).
+- Hỏi DB phiên bản hiện tại trong ConfigVersion (1 câu rất nhẹ) tối đa 1 lần mỗi PRICING_CONFIG_CHECK_SECONDS giây;
+  trong khoảng đó dùng cache không tốn query nào. Khác bản đang giữ thì nạp lại toàn bộ (2 query).
+- Lưu/xóa BranchSetting, RoomClass (qua API, admin...) sẽ đổi phiên bản qua signal: worker đó nạp lại ngay ở lần dùng sau,
+  worker khác chậm nhất sau PRICING_CONFIG_CHECK_SECONDS giây.
+- Phiên bản là thời gian (ns) chứ không tăng dần: transaction bị rollback không làm 2 bộ dữ liệu khác nhau trùng phiên bản.
+- QuerySet.update()/bulk_create() không phát signal: sau khi sửa hàng loạt phải gọi bump() (hoặc lưu lại 1 bản ghi).
+Các object trả về dùng chung giữa các request: chỉ đọc, không sửa rồi save().
+"""
+import threading
+import time
+
+from django.conf import settings as django_settings
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from .models import BranchSetting, RoomClass, ConfigVersion
+
+VERSION_NAME = 'pricing'
+CHECK_SECONDS = getattr(django_settings, 'PRICING_CONFIG_CHECK_SECONDS', 1.0)
+
+
+class PricingConfigCache:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.version = None
+        self.settings = {}     # branch_id -> BranchSetting
+        self.room_classes = {}  # room_class_id -> RoomClass
+        self.checked_at = None  # time.monotonic() lần cuối hỏi phiên bản
+
+    def current_version(self):
+        return ConfigVersion.objects.filter(name=VERSION_NAME).values_list('version', flat=True).first()
+
+    def refresh(self):
+        with self.lock:
+            if self.checked_at is not None and time.monotonic() - self.checked_at < CHECK_SECONDS:
+                return self.settings, self.room_classes
+        version = self.current_version()
+        with self.lock:
+            if version is not None and version == self.version:
+                self.checked_at = time.monotonic()
+                return self.settings, self.room_classes
+        settings = {s.branch_id: s for s in BranchSetting.objects.all()}
+        room_classes = {rc.id: rc for rc in RoomClass.objects.all()}
+        if version is not None:
+            # Chưa có dòng phiên bản thì không giữ lại (không biết khi nào cũ)
+            with self.lock:
+                self.version, self.settings, self.room_classes = version, settings, room_classes
+                self.checked_at = time.monotonic()
+        return settings, room_classes
+
+    def get(self, branch_id, room_class_id):
+        """(BranchSetting hoặc None, RoomClass) của 1 phòng, tối đa 1 query khi cache còn mới (thường là 0)."""
+        settings, room_classes = self.refresh()
+        room_class = room_classes.get(room_class_id)
+        if room_class is None:
+            room_class = RoomClass.objects.get(pk=room_class_id)
+        return settings.get(branch_id), room_class
+
+    def expire(self):
+        """Lần dùng sau hỏi lại phiên bản ngay."""
+        with self.lock:
+            self.checked_at = None
+
+    def clear(self):
+        with self.lock:
+            self.version, self.settings, self.room_classes, self.checked_at = None, {}, {}, None
+
+
+cache = PricingConfigCache()
+
+
+def pricing_config(room):
+    """(BranchSetting, RoomClass) của phòng, lấy từ cache."""
+    return cache.get(room.branch_id, room.room_class_id)
+
+
+def room_class(room_class_id):
+    return cache.get(None, room_class_id)[1]
+
+
+def bump():
+    ConfigVersion.objects.update_or_create(name=VERSION_NAME, defaults={'version': time.time_ns()})
+    cache.expire()
+
+
+@receiver([post_save, post_delete], sender=BranchSetting)
+@receiver([post_save, post_delete], sender=RoomClass)
+def _config_changed(sender, **kwargs):
+    bump()
@@ -0,0 +1,24 @@
+from django.db import DEFAULT_DB_ALIAS
+
+from . import replica
+
+
+class ReplicaRouter:
+    """
+    Router cho cấu hình có DB replica: mọi lệnh ghi vào DB chính; lệnh đọc chỉ sang replica khi view
+    đang ở chế độ đọc replica (xem hotel/replica.py). Replica là bản chép nên không chạy migrate trên đó.
+    """
+    def db_for_read(self, model, **hints):
+        return replica.current_read_alias()
+
+    def db_for_write(self, model, **hints):
+        # Object đọc từ replica khi save() vẫn phải ghi vào DB chính
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if db == replica.REPLICA_ALIAS:
+            return False
+        return None
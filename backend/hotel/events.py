@@ -0,0 +1,173 @@
+"""
+Đẩy thay đổi trạng thái phòng tới các máy lễ tân qua Server-Sent Events (chạy dưới ASGI: manage.py serve_asgi).
+- Chỉ bật khi server hỗ trợ (settings.ROOM_EVENTS_ENABLED, mặc định None = chỉ khi chạy ASGI): dưới WSGI mỗi kết nối
+  sẽ giữ 1 worker thread tới khi tab đóng. Frontend hỏi POST /api/events/ticket/ trước, không bật thì không kết nối.
+- Xác thực bằng vé ngắn hạn (ký bằng SECRET_KEY, sống ROOM_EVENTS_TICKET_SECONDS giây) gửi qua ?ticket=,
+  không đưa JWT lên URL (URL bị ghi vào access log).
+- Broker mặc định: InProcessBroker (1 process / 1 node).
+- Đổi broker qua settings.ROOM_EVENTS_BROKER (đường dẫn class), VD: broker Redis pub/sub khi chạy nhiều node / nhiều worker.
+"""
+import asyncio
+import json
+import threading
+from functools import lru_cache
+
+from django.conf import settings
+from django.core import signing
+from django.core.handlers.asgi import ASGIRequest
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.http import JsonResponse, StreamingHttpResponse
+from django.utils.module_loading import import_string
+from rest_framework.decorators import api_view
+from rest_framework.response import Response
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
+from rest_framework_simplejwt.tokens import AccessToken
+
+KEEPALIVE_SECONDS = 15
+TICKET_SALT = 'hotel.events.ticket'
+
+
+class BaseBroker:
+    """Giao diện broker: publish() gọi từ view (sync), subscribe() dùng trong view async."""
+
+    def publish(self, branch_id, event):
+        raise NotImplementedError
+
+    def subscribe(self, branch_id=None):
+        """Trả về Subscription có `async get(timeout)` và `close()`; branch_id=None nhận mọi chi nhánh."""
+        raise NotImplementedError
+
+
+class InProcessSubscription:
+    def __init__(self, broker, branch_id, maxsize):
+        self.broker = broker
+        self.branch_id = branch_id
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue(maxsize=maxsize)
+
+    def deliver(self, event):
+        # Gọi từ thread của view -> chuyển sang event loop của client
+        self.loop.call_soon_threadsafe(self._put, event)
+
+    def _put(self, event):
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            pass  # Client quá chậm: bỏ sự kiện, client sẽ tải lại khi kết nối lại
+
+    async def get(self, timeout):
+        return await asyncio.wait_for(self.queue.get(), timeout)
+
+    def close(self):
+        self.broker.unsubscribe(self)
+
+
+class InProcessBroker(BaseBroker):
+    def __init__(self, maxsize=100):
+        self.maxsize = maxsize
+        self.lock = threading.Lock()
+        self.subscriptions = set()
+
+    def publish(self, branch_id, event):
+        with self.lock:
+            targets = [s for s in self.subscriptions if s.branch_id in (None, branch_id)]
+        for subscription in targets:
+            subscription.deliver(event)
+
+    def subscribe(self, branch_id=None):
+        subscription = InProcessSubscription(self, branch_id, self.maxsize)
+        with self.lock:
+            self.subscriptions.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self.lock:
+            self.subscriptions.discard(subscription)
+
+
+@lru_cache(maxsize=None)
+def get_broker():
+    return import_string(getattr(settings, 'ROOM_EVENTS_BROKER', 'hotel.events.InProcessBroker'))()
+
+
+def publish_room_status(room, previous_status):
+    """Phát sự kiện đổi trạng thái phòng sau khi transaction commit."""
+    event = {
+        'type': 'room_status',
+        'room_id': room.id,
+        'room_name': room.name,
+        'branch_id': room.branch_id,
+        'previous_status': previous_status,
+        'status': room.status,
+    }
+    transaction.on_commit(lambda: get_broker().publish(room.branch_id, event))
+
+
+def stream_supported(request):
+    """Server có giữ được kết nối SSE lâu không (settings.ROOM_EVENTS_ENABLED; None = chỉ khi request đến qua ASGI)."""
+    enabled = getattr(settings, 'ROOM_EVENTS_ENABLED', None)
+    return isinstance(request, ASGIRequest) if enabled is None else enabled
+
+
+def ticket_seconds():
+    return getattr(settings, 'ROOM_EVENTS_TICKET_SECONDS', 30)
+
+
+def issue_ticket(user):
+    return signing.dumps(user.pk, salt=TICKET_SALT)
+
+
+def _authenticate(request):
+    # EventSource không gửi được header: trình duyệt dùng vé ?ticket=, client khác có thể gửi Authorization: Bearer
+    ticket = request.GET.get('ticket')
+    if ticket:
+        try:
+            return signing.loads(ticket, salt=TICKET_SALT, max_age=ticket_seconds())
+        except signing.BadSignature:  # Gồm cả vé hết hạn
+            return None
+    header = request.headers.get('Authorization', '')
+    if header.startswith('Bearer '):
+        try:
+            return AccessToken(header[len('Bearer '):])[jwt_settings.USER_ID_CLAIM]
+        except (TokenError, KeyError):
+            return None
+    return None
+
+
+@api_view(['POST'])
+def stream_ticket(request):
+    """POST /api/events/ticket/ (JWT như mọi API): vé để mở luồng sự kiện, hoặc enabled=false nếu server không hỗ trợ."""
+    if not stream_supported(request._request):
+        return Response({'enabled': False})
+    return Response({'enabled': True, 'ticket': issue_ticket(request.user), 'expires_in': ticket_seconds()})
+
+
+async def room_events(request):
+    """GET /api/events/rooms/?branch=<id>&ticket=<vé từ /api/events/ticket/>"""
+    if not stream_supported(request):
+        return JsonResponse({'detail': 'Luồng sự kiện chỉ chạy dưới ASGI server (manage.py serve_asgi)'}, status=503)
+    if _authenticate(request) is None:
+        return JsonResponse({'detail': 'Vé không hợp lệ hoặc đã hết hạn'}, status=401)
+    branch = request.GET.get('branch')
+    branch_id = int(branch) if branch and branch.isdigit() else None
+
+    async def stream():
+        subscription = get_broker().subscribe(branch_id)
+        try:
+            yield 'retry: 3000\n\n'
+            while True:
+                try:
+                    event = await subscription.get(KEEPALIVE_SECONDS)
+                except asyncio.TimeoutError:
+                    yield ': ping\n\n'
+                    continue
+                yield f"event: {event['type']}\ndata: {json.dumps(event, cls=DjangoJSONEncoder, ensure_ascii=False)}\n\n"
+        finally:
+            subscription.close()
+
+    response = StreamingHttpResponse(stream(), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
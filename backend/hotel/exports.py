@@ -0,0 +1,49 @@
+"""
+Xuất dữ liệu lớn (CSV / JSON Lines) dạng stream: đọc DB theo từng chunk bằng QuerySet.iterator()
+và ghi ra response ngay, bộ nhớ không tăng theo số dòng.
+"""
+import csv
+import json
+from datetime import datetime
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+
+CHUNK_SIZE = 2000
+
+
+class Echo:
+    """File giả cho csv.writer: trả lại dòng vừa ghi thay vì lưu vào buffer."""
+    def write(self, value):
+        return value
+
+
+def _cell(value):
+    if isinstance(value, datetime):
+        return timezone.localtime(value).isoformat()
+    return value
+
+
+def csv_rows(queryset, columns):
+    writer = csv.writer(Echo())
+    # Gửi dòng tiêu đề trước khi chạy truy vấn (BOM để Excel đọc đúng tiếng Việt)
+    yield '\ufeff' + writer.writerow(columns)
+    for row in queryset.values_list(*columns).iterator(chunk_size=CHUNK_SIZE):
+        yield writer.writerow([_cell(v) for v in row])
+
+
+def jsonl_rows(queryset, columns):
+    for row in queryset.values(*columns).iterator(chunk_size=CHUNK_SIZE):
+        yield json.dumps(row, cls=DjangoJSONEncoder, ensure_ascii=False) + '\n'
+
+
+def stream_export(queryset, columns, filename, output='csv'):
+    if output == 'jsonl':
+        response = StreamingHttpResponse(jsonl_rows(queryset, columns), content_type='application/x-ndjson; charset=utf-8')
+        filename += '.jsonl'
+    else:
+        response = StreamingHttpResponse(csv_rows(queryset, columns), content_type='text/csv; charset=utf-8')
+        filename += '.csv'
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
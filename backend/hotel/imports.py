@@ -0,0 +1,146 @@
+"""
+Nhập hàng loạt từ file CSV (hàng hóa, phòng, khách hàng) khi mở chi nhánh mới.
+- Đọc file dạng stream, kiểm tra theo từng lô (khóa ngoại kiểm tra 1 query/lô thay vì 1 query/dòng).
+- Ghi bằng bulk_create, mỗi lô 1 transaction.
+- Trả về báo cáo lỗi theo số dòng trong file.
+"""
+import csv
+import io
+
+from django.core.exceptions import ValidationError
+from django.db import transaction
+
+from .models import Product, Room, Customer
+from .stock import record_initial_stock
+
+BATCH_SIZE = 1000
+MAX_REPORTED_ERRORS = 1000
+
+IMPORT_SPECS = {
+    'products': {
+        'model': Product,
+        'fields': ['branch', 'name', 'selling_price', 'stock_quantity'],
+        'required': ['branch', 'name'],
+        'after_create': record_initial_stock,  # Ghi sổ kho tồn ban đầu
+    },
+    'rooms': {
+        'model': Room,
+        'fields': ['branch', 'area', 'room_class', 'name', 'status', 'is_active'],
+        'required': ['branch', 'room_class', 'name'],
+    },
+    'customers': {
+        'model': Customer,
+        'fields': ['full_name', 'birth_date', 'identity_type', 'identity_card', 'phone', 'address', 'license_plate', 'type'],
+        'required': ['full_name'],
+        'unique': 'identity_card',  # Bỏ qua khách đã có CCCD trong hệ thống
+    },
+}
+
+
+class CsvImporter:
+    def __init__(self, kind, dry_run=False, batch_size=BATCH_SIZE):
+        spec = IMPORT_SPECS[kind]
+        self.model = spec['model']
+        self.fields = spec['fields']
+        self.required = set(spec['required'])
+        self.unique = spec.get('unique')
+        self.after_create = spec.get('after_create')
+        self.dry_run = dry_run
+        self.batch_size = batch_size
+        self.total = self.valid = self.error_count = 0
+        self.errors = []
+
+    def run(self, uploaded_file):
+        text = io.TextIOWrapper(uploaded_file, encoding='utf-8-sig', newline='')
+        reader = csv.DictReader(text)
+        missing = self.required - set(reader.fieldnames or [])
+        if missing:
+            raise ValidationError(f"File thiếu cột bắt buộc: {', '.join(sorted(missing))}")
+
+        batch = []
+        # Dòng 1 là tiêu đề
+        for line_no, row in enumerate(reader, start=2):
+            batch.append((line_no, row))
+            if len(batch) >= self.batch_size:
+                self.process_batch(batch)
+                batch = []
+        if batch:
+            self.process_batch(batch)
+        return self.report()
+
+    def add_error(self, line_no, errors):
+        self.error_count += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({'row': line_no, 'errors': errors})
+
+    def parse_row(self, row):
+        values, errors = {}, {}
+        for name in self.fields:
+            raw = (row.get(name) or '').strip()
+            if not raw:
+                if name in self.required:
+                    errors[name] = "Không được để trống"
+                continue
+            field = self.model._meta.get_field(name)
+            try:
+                if field.is_relation:
+                    values[field.attname] = field.target_field.to_python(raw)
+                else:
+                    values[name] = field.clean(raw, None)
+            except ValidationError as e:
+                errors[name] = ' '.join(e.messages)
+        return values, errors
+
+    def process_batch(self, batch):
+        parsed = []
+        for line_no, row in batch:
+            self.total += 1
+            values, errors = self.parse_row(row)
+            if errors:
+                self.add_error(line_no, errors)
+            else:
+                parsed.append((line_no, values))
+
+        # Kiểm tra khóa ngoại: 1 query cho mỗi cột trong cả lô
+        for field in self.model._meta.concrete_fields:
+            if not field.is_relation or field.name not in self.fields:
+                continue
+            ids = {v[field.attname] for _, v in parsed if field.attname in v}
+            existing = set(field.related_model.objects.filter(pk__in=ids).values_list('pk', flat=True))
+            valid = []
+            for line_no, values in parsed:
+                if field.attname in values and values[field.attname] not in existing:
+                    self.add_error(line_no, {field.name: f"Không tồn tại (id={values[field.attname]})"})
+                else:
+                    valid.append((line_no, values))
+            parsed = valid
+
+        if self.unique:
+            keys = {v[self.unique] for _, v in parsed if v.get(self.unique)}
+            seen = set(self.model.objects.filter(**{f'{self.unique}__in': keys}).values_list(self.unique, flat=True))
+            valid = []
+            for line_no, values in parsed:
+                key = values.get(self.unique)
+                if key and key in seen:
+                    self.add_error(line_no, {self.unique: f"Đã tồn tại: {key}"})
+                else:
+                    if key: seen.add(key)
+                    valid.append((line_no, values))
+            parsed = valid
+
+        if parsed and not self.dry_run:
+            with transaction.atomic():
+                objs = self.model.objects.bulk_create([self.model(**values) for _, values in parsed], batch_size=self.batch_size)
+                if self.after_create:
+                    self.after_create(objs)
+        self.valid += len(parsed)
+
+    def report(self):
+        return {
+            'total_rows': self.total,
+            'created': 0 if self.dry_run else self.valid,
+            'valid': self.valid,
+            'error_count': self.error_count,
+            'errors': self.errors,
+            'dry_run': self.dry_run,
+        }
@@ -0,0 +1,167 @@
+"""
+Giả lập nhiều lễ tân thao tác cùng lúc qua đúng view thật (APIClient, mỗi lễ tân 1 thread hoặc 1 process, kết nối DB riêng).
+Mỗi vòng: nhận phòng -> thêm dịch vụ -> trả phòng -> đặt trước phòng khác -> xác nhận nhận phòng -> trả phòng.
+Các lễ tân dùng chung 1 nhóm phòng nhỏ để cố tình tranh chấp. Kết quả mỗi thao tác được phân loại:
+- ok: 2xx
+- rejected: từ chối hợp lệ (phòng vừa có người nhận, hết phòng...)
+- lock_timeout: SQLite "database is locked", PostgreSQL lock timeout / deadlock / serialization failure
+- integrity: vi phạm ràng buộc DB (UNIQUE, FK...)
+- error: lỗi khác (500, exception)
+Cuối lượt chạy kiểm tra lại bất biến dữ liệu (mỗi phòng tối đa 1 lượt ở đang mở, trạng thái phòng khớp lượt ở, sổ kho, bảng tổng hợp).
+"""
+import multiprocessing
+import random
+import time
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from datetime import timedelta
+
+from django.db import connections, IntegrityError, OperationalError
+from django.db.models import Count, Q
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from . import bench, rollups, stock
+from .models import User, Room, Product, BookingRoom
+
+LOCK_MARKERS = ('database is locked', 'database table is locked', 'lock timeout', 'lock_timeout', 'deadlock', 'could not serialize', 'could not obtain lock')
+INTEGRITY_MARKERS = ('unique constraint', 'duplicate key', 'foreign key constraint', 'integrity', 'not null constraint')
+
+
+def classify(status_code=None, message='', exc=None):
+    if exc is not None:
+        if isinstance(exc, IntegrityError):
+            return 'integrity'
+        message = str(exc)
+    text = str(message).lower()
+    if any(m in text for m in LOCK_MARKERS) or (exc is not None and isinstance(exc, OperationalError) and 'lock' in text):
+        return 'lock_timeout'
+    if any(m in text for m in INTEGRITY_MARKERS):
+        return 'integrity'
+    if exc is not None or status_code >= 500:
+        return 'error'
+    return 'ok' if status_code < 400 else 'rejected'
+
+
+class Receptionist:
+    def __init__(self, number, user_id, room_ids, product_ids, seed=0):
+        self.number = number
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.get(pk=user_id))
+        self.room_ids = room_ids
+        self.product_ids = product_ids
+        self.rng = random.Random(seed * 1000 + number)
+        self.samples = []  # (thao tác, ms, kết quả)
+        self.messages = Counter()
+        self.counter = 0
+
+    def call(self, op, method, url, data=None):
+        started = time.perf_counter()
+        try:
+            response = getattr(self.client, method)(url, data, format='json')
+            body = getattr(response, 'data', None)
+            message = (body.get('error') or body.get('message') or '') if isinstance(body, dict) else ''
+            outcome = classify(response.status_code, message)
+        except Exception as e:
+            response, message, outcome = None, str(e), classify(exc=e)
+        self.samples.append((op, (time.perf_counter() - started) * 1000, outcome))
+        if outcome not in ('ok', 'rejected'):
+            self.messages[f"{op}: {message}"[:200]] += 1
+        return response if outcome == 'ok' else None
+
+    def guest(self):
+        self.counter += 1
+        return f"Khách tải {self.number}-{self.counter}"
+
+    def cycle(self):
+        room_id = self.rng.choice(self.room_ids)
+        if self.call('check_in', 'post', f'/api/rooms/{room_id}/check_in/', {'full_name': self.guest(), 'booking_type': 'HOURLY'}):
+            for _ in range(self.rng.randint(1, 3)):
+                self.call('add_service', 'post', f'/api/rooms/{room_id}/add_service/',
+                          {'product_id': self.rng.choice(self.product_ids), 'quantity': 1})
+            self.call('check_out', 'post', f'/api/rooms/{room_id}/check_out/')
+
+        room_id = self.rng.choice(self.room_ids)
+        start = timezone.now()
+        response = self.call('reserve', 'post', '/api/bookings/reserve/', {
+            'customer': {'full_name': self.guest()}, 'room_id': room_id, 'booking_type': 'HOURLY',
+            'check_in_expected': start.isoformat(), 'check_out_expected': (start + timedelta(hours=2)).isoformat(),
+        })
+        if response and self.call('confirm_checkin', 'post', f"/api/bookings/{response.data['booking_id']}/confirm_checkin/", {}):
+            self.call('check_out', 'post', f'/api/rooms/{room_id}/check_out/')
+
+    def run(self, deadline, max_cycles):
+        try:
+            cycles = 0
+            while time.monotonic() < deadline and cycles < max_cycles:
+                self.cycle()
+                cycles += 1
+        finally:
+            connections.close_all()
+        return self.samples, self.messages
+
+
+def _run_receptionist(args):
+    number, user_id, room_ids, product_ids, seed, duration, max_cycles = args
+    return Receptionist(number, user_id, room_ids, product_ids, seed).run(time.monotonic() + duration, max_cycles)
+
+
+def check_invariants():
+    """Các sai lệch dữ liệu sau khi chạy tải: {tên kiểm tra: số lỗi}."""
+    open_stays = BookingRoom.objects.filter(check_out_actual__isnull=True, check_in_actual__isnull=False)
+    double_occupied = open_stays.values('room').annotate(n=Count('id')).filter(n__gt=1).count()
+    occupied_without_stay = Room.objects.filter(status='OCCUPIED').exclude(id__in=open_stays.values('room')).count()
+    stay_in_free_room = open_stays.filter(~Q(room__status='OCCUPIED')).count()
+    return {
+        'rooms_with_multiple_open_stays': double_occupied,
+        'occupied_rooms_without_open_stay': occupied_without_stay,
+        'open_stays_in_non_occupied_rooms': stay_in_free_room,
+        'stock_mismatches': len(stock.verify()),
+        'rollup_mismatches': len(rollups.verify()),
+    }
+
+
+def simulate(receptionists=8, duration=30, max_cycles=10 ** 9, rooms=10, use_processes=False, seed=0):
+    """Chạy giả lập, trả về dict kết quả (thông lượng, độ trễ theo thao tác, số lỗi theo loại, bất biến dữ liệu)."""
+    user_id = User.objects.filter(is_active=True).values_list('id', flat=True).first()
+    room_ids = list(Room.objects.filter(status='AVAILABLE', is_active=True).values_list('id', flat=True)[:rooms])
+    product_ids = list(Product.objects.filter(stock_quantity__gt=1000).values_list('id', flat=True)[:20])
+    if not (user_id and room_ids and product_ids):
+        raise ValueError("Cần có ít nhất 1 user, 1 phòng trống và 1 hàng hóa còn nhiều tồn (chạy seed_hotel_data)")
+
+    jobs = [(n, user_id, room_ids, product_ids, seed, duration, max_cycles) for n in range(receptionists)]
+    connections.close_all()  # Không để process con (fork) dùng chung kết nối của process cha
+    started = time.perf_counter()
+    if use_processes:
+        with ProcessPoolExecutor(receptionists, mp_context=multiprocessing.get_context('fork')) as pool:
+            outputs = list(pool.map(_run_receptionist, jobs))
+    else:
+        with ThreadPoolExecutor(receptionists) as pool:
+            outputs = list(pool.map(_run_receptionist, jobs))
+    elapsed = time.perf_counter() - started
+
+    by_op, outcomes, messages = defaultdict(list), Counter(), Counter()
+    for samples, worker_messages in outputs:
+        messages.update(worker_messages)
+        for op, ms, outcome in samples:
+            by_op[op].append((ms, outcome))
+            outcomes[outcome] += 1
+
+    total = sum(outcomes.values())
+    return {
+        'receptionists': receptionists,
+        'mode': 'processes' if use_processes else 'threads',
+        'database': connections['default'].vendor,
+        'rooms': len(room_ids),
+        'elapsed_s': round(elapsed, 3),
+        'operations': total,
+        'throughput_ops': round(total / elapsed, 2) if elapsed else 0,
+        'successful_ops': round(outcomes['ok'] / elapsed, 2) if elapsed else 0,
+        'outcomes': dict(outcomes),
+        'by_operation': {
+            op: {**bench.summarize([ms for ms, _ in rows]), 'outcomes': dict(Counter(o for _, o in rows))}
+            for op, rows in sorted(by_op.items())
+        },
+        'top_errors': messages.most_common(10),
+        'invariants': check_invariants(),
+    }
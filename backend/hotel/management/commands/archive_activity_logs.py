@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from hotel import archive
+
+
+class Command(BaseCommand):
+    help = "Chuyển nhật ký hoạt động cũ sang bảng lưu trữ (ActivityLogArchive)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=archive.RETENTION_DAYS, help="Giữ lại nhật ký trong N ngày gần nhất")
+        parser.add_argument('--batch-size', type=int, default=archive.BATCH_SIZE)
+        parser.add_argument('--dry-run', action='store_true', help="Chỉ đếm số dòng sẽ được chuyển")
+
+    def handle(self, *args, **options):
+        count = archive.archive_activity_logs(options['days'], batch_size=options['batch_size'], dry_run=options['dry_run'])
+        if options['dry_run']:
+            self.stdout.write(f"Có {count} dòng nhật ký cũ hơn {options['days']} ngày")
+        else:
+            self.stdout.write(self.style.SUCCESS(f"Đã chuyển {count} dòng nhật ký sang bảng lưu trữ"))
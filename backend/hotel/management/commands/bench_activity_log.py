@@ -0,0 +1,39 @@
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from hotel import activity
+from hotel.models import ActivityLog
+
+
+class Command(BaseCommand):
+    help = "So sánh thời gian ghi nhật ký trong request: ghi ngay (durable) và ghi đệm (write-behind). Dữ liệu thử được rollback."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--count', type=int, default=500, help="Số thao tác (mỗi thao tác = 1 transaction nghiệp vụ)")
+
+    def handle(self, *args, **options):
+        count = options['count']
+        user = get_user_model().objects.first()
+        buffer = activity.ActivityLogBuffer(size=count + 1, background=False)
+
+        with transaction.atomic():
+            sync_ms = self.measure(count, lambda i: activity.log_activity(user, "BENCH", f"Ghi ngay {i}", durable=True))
+            buffered_ms = self.measure(count, lambda i: buffer.add(ActivityLog(user=user, action="BENCH", content=f"Ghi đệm {i}")))
+            started = time.perf_counter()
+            flushed = buffer.flush()
+            flush_ms = (time.perf_counter() - started) * 1000
+            transaction.set_rollback(True)
+
+        self.stdout.write(f"Ghi ngay:  {sync_ms:.3f} ms/thao tác")
+        self.stdout.write(f"Ghi đệm:   {buffered_ms:.3f} ms/thao tác (ngoài request: bulk_create {flushed} dòng mất {flush_ms:.1f} ms)")
+        self.stdout.write(self.style.SUCCESS(f"Tiết kiệm: {sync_ms - buffered_ms:.3f} ms mỗi request"))
+
+    def measure(self, count, func):
+        started = time.perf_counter()
+        for i in range(count):
+            with transaction.atomic():
+                func(i)
+        return (time.perf_counter() - started) * 1000 / count
@@ -0,0 +1,104 @@
+import json
+import platform
+import random
+import subprocess
+import time
+
+import django
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test.utils import setup_test_environment, teardown_test_environment
+from django.utils import timezone
+
+from hotel import bench, seed
+
+
+class Command(BaseCommand):
+    help = (
+        "Đo thời gian các API nóng (sơ đồ phòng, check-in/out, đặt phòng, thống kê, mọi báo cáo) ở nhiều cỡ dữ liệu, "
+        "tùy chọn cả thời gian render / cỡ payload (--render), "
+        "ghi kết quả JSON. Mặc định chạy trên DB test riêng (tạo rồi xóa), không đụng dữ liệu thật."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', default='1000,10000,100000', help="Các cỡ dữ liệu (số đơn), VD: 1000,10000")
+        parser.add_argument('--branches', type=int, default=2)
+        parser.add_argument('--rooms-per-branch', type=int, default=100)
+        parser.add_argument('--runs', type=int, default=20, help="Số lần đo mỗi API")
+        parser.add_argument('--output', default='bench_results.json')
+        parser.add_argument('--compare', help="File kết quả cũ để so sánh p50")
+        parser.add_argument('--current-db', action='store_true', help="Đo trên DB hiện tại, không sinh dữ liệu")
+        parser.add_argument('--render', action='store_true',
+                            help="Đo thêm thời gian render và cỡ payload danh sách đơn / khách theo từng renderer (JSON, orjson, msgpack)")
+
+    def handle(self, *args, **options):
+        report = {
+            'meta': {
+                'started_at': timezone.now().isoformat(),
+                'git_commit': self.git_commit(),
+                'python': platform.python_version(),
+                'django': django.get_version(),
+                'database': connection.vendor,
+                'runs': options['runs'],
+            },
+            'results': {},
+        }
+        setup_test_environment()
+        try:
+            if options['current_db']:
+                report['results']['current'] = self.run_size(options['runs'], options['render'])
+            else:
+                report['results'] = self.run_sizes(options)
+        finally:
+            teardown_test_environment()
+
+        with open(options['output'], 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        self.stdout.write(self.style.SUCCESS(f"Đã ghi kết quả vào {options['output']}"))
+
+        if options['compare']:
+            with open(options['compare'], encoding='utf-8') as f:
+                previous = json.load(f)
+            for size, name, old, new, ratio in bench.compare(previous, report):
+                self.stdout.write(f"  {size:>8} {name:<28} {old:>9.2f} -> {new:>9.2f} ms" + (f"  x{ratio:.2f}" if ratio else ""))
+
+    def run_sizes(self, options):
+        sizes = sorted(int(s) for s in options['sizes'].split(','))
+        old_name = connection.settings_dict['NAME']
+        connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        try:
+            rng = random.Random(0)
+            seed.seed_structure(options['branches'], options['rooms_per_branch'], rng=rng)
+            seed.seed_occupancy(0.3, rng=rng)
+            results, seeded = {}, 0
+            for size in sizes:
+                started = time.perf_counter()
+                seed.seed_bookings(size - seeded, rng=rng)
+                seeded = size
+                self.stdout.write(f"{size} đơn (sinh dữ liệu {time.perf_counter() - started:.1f}s)")
+                results[str(size)] = self.run_size(options['runs'], options['render'])
+            return results
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+
+    def run_size(self, runs, render=False):
+        user = get_user_model().objects.filter(is_superuser=True).first()
+        if user is None:
+            user, _ = get_user_model().objects.get_or_create(username='bench', defaults={'role': 'ADMIN'})
+        results = bench.EndpointBenchmark(user, runs=runs).run()
+        for name, stats in results.items():
+            self.stdout.write(f"  {name:<28} p50 {stats['p50_ms']:>8.2f} ms  p95 {stats['p95_ms']:>8.2f} ms  {stats['queries']} query")
+        if render:
+            rendered = bench.RenderBenchmark(user, runs=runs).run()
+            for name, stats in rendered.items():
+                self.stdout.write(f"  {name:<28} p50 {stats['p50_ms']:>8.2f} ms  {stats['bytes']:>10} B  gzip {stats['gzip_bytes']:>9} B"
+                                  f"  x{stats['size_vs_json']:.2f}")
+            results.update(rendered)
+        return results
+
+    def git_commit(self):
+        try:
+            return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True).stdout.strip()
+        except (OSError, subprocess.CalledProcessError):
+            return None
@@ -0,0 +1,93 @@
+import time
+from contextlib import contextmanager
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.utils import timezone
+
+from hotel.models import Booking, BookingRoom, CashFlow, Customer, Branch, Room
+from hotel.views import date_range_filter
+
+
+class Command(BaseCommand):
+    help = (
+        "In query plan (EXPLAIN) và thời gian chạy của các truy vấn nóng: cách lọc ngày cũ (__date__range) so với khoảng nửa mở, "
+        "và cùng truy vấn khi tạm bỏ index mới (DROP INDEX trong transaction rồi rollback, DB không đổi)"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=30, help="Độ dài khoảng ngày cần lọc")
+        parser.add_argument('--runs', type=int, default=20, help="Số lần chạy để lấy thời gian trung bình")
+
+    def handle(self, *args, **options):
+        end = timezone.localdate()
+        start = end - timedelta(days=options['days'])
+        branch = Branch.objects.first()
+        room = Room.objects.first()
+        customer = Customer.objects.exclude(identity_card=None).first()
+
+        cases = [
+            # tiêu đề, truy vấn cũ, truy vấn mới, (model, field của index dùng cho truy vấn mới)
+            ("Booking COMPLETED theo ngày tạo",
+             Booking.objects.filter(status='COMPLETED', created_at__date__range=[start, end]),
+             Booking.objects.filter(status='COMPLETED', **date_range_filter('created_at', start, end)),
+             (Booking, ['status', 'created_at'])),
+            ("CashFlow theo chi nhánh + ngày",
+             CashFlow.objects.filter(branch=branch, created_at__date__range=[start, end]),
+             CashFlow.objects.filter(branch=branch, **date_range_filter('created_at', start, end)),
+             (CashFlow, ['branch', 'created_at', 'flow_type'])),
+            ("BookingRoom đang mở của phòng", None,
+             BookingRoom.objects.filter(room=room, check_out_actual__isnull=True).order_by('-id')[:1],
+             (BookingRoom, ['room', 'check_out_actual'])),
+            ("Customer theo CCCD", None,
+             Customer.objects.filter(identity_card=customer.identity_card if customer else ''),
+             (Customer, ['identity_card'])),
+        ]
+
+        for title, before, after, (model, fields) in cases:
+            self.stdout.write(self.style.MIGRATE_HEADING(title))
+            if before is not None:
+                self.report('Trước', before, options['runs'])
+            index = find_index(model, fields)
+            with without_index(model, index):
+                self.report(f'Không index {index.name}', after, options['runs'])
+            self.report('Sau', after, options['runs'])
+
+    def report(self, label, qs, runs):
+        self.stdout.write(f"  [{label}] {self.timeit(qs, runs):.3f} ms/lần")
+        for line in explain(qs, label).splitlines():
+            self.stdout.write(f"      {line}")
+
+    def timeit(self, qs, runs):
+        started = time.perf_counter()
+        for _ in range(runs):
+            list(qs.all())
+        return (time.perf_counter() - started) * 1000 / runs
+
+
+def explain(qs, label=''):
+    """
+    Như QuerySet.explain(), thêm chú thích vào câu lệnh: SQLite cache câu EXPLAIN đã biên dịch theo nội dung
+    và không biên dịch lại sau DROP INDEX, nên mỗi trường hợp (có / không index) phải là 1 câu lệnh khác nhau.
+    """
+    sql, params = qs.query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute(f"{connection.ops.explain_query_prefix()} {sql} /* {label} */", params)
+        return '\n'.join(' '.join(str(col) for col in row) for row in cursor.fetchall())
+
+
+def find_index(model, fields):
+    return next(index for index in model._meta.indexes if index.fields == fields)
+
+
+@contextmanager
+def without_index(model, index):
+    """Tạm bỏ index trong 1 transaction rồi rollback (SQLite và PostgreSQL đều rollback được DROP INDEX)."""
+    with transaction.atomic():
+        with connection.cursor() as cursor:
+            cursor.execute(f"DROP INDEX {connection.ops.quote_name(index.name)}")
+        try:
+            yield
+        finally:
+            transaction.set_rollback(True)
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from hotel import availability
+
+
+class Command(BaseCommand):
+    help = "Giữ thêm đêm nay cho các phòng đang có khách theo ngày / qua đêm (chạy mỗi ngày, VD: cron 00:05)"
+
+    def handle(self, *args, **options):
+        count = availability.extend_open_stays()
+        self.stdout.write(self.style.SUCCESS(f"Đã giữ thêm {count} đêm cho khách đang ở"))
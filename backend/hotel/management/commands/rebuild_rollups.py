@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from hotel import rollups
+
+
+class Command(BaseCommand):
+    help = "Tính lại bảng DailyRollup từ bảng gốc (Booking, ServiceOrder, BookingRoom, CashFlow) và đối chiếu"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--verify-only', action='store_true', help="Chỉ đối chiếu, không ghi lại bảng tổng hợp")
+
+    def handle(self, *args, **options):
+        if not options['verify_only']:
+            count = rollups.rebuild()
+            self.stdout.write(f"Đã dựng lại {count} dòng tổng hợp")
+
+        mismatches = rollups.verify()
+        for m in mismatches[:50]:
+            self.stdout.write(f"  Chi nhánh {m['branch_id']} ngày {m['date']} - {m['field']}: bảng gốc {m['expected']}, tổng hợp {m['actual']}")
+        if mismatches:
+            raise CommandError(f"Có {len(mismatches)} sai lệch giữa bảng tổng hợp và bảng gốc")
+        self.stdout.write(self.style.SUCCESS("Bảng tổng hợp khớp với bảng gốc"))
@@ -0,0 +1,31 @@
+import random
+
+from django.core.management.base import BaseCommand
+
+from hotel import seed
+
+
+class Command(BaseCommand):
+    help = "Sinh dữ liệu giả lập (chi nhánh, phòng, khách, lịch sử đơn, dịch vụ, thu chi) để benchmark / thử tải"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--branches', type=int, default=2, help="Số chi nhánh mới (0 = chỉ thêm đơn vào chi nhánh đã có)")
+        parser.add_argument('--rooms-per-branch', type=int, default=100)
+        parser.add_argument('--customers', type=int, default=10000)
+        parser.add_argument('--bookings', type=int, default=100000, help="Số đơn đã trả phòng cần thêm")
+        parser.add_argument('--days', type=int, default=365, help="Trải đơn đều trong N ngày gần nhất")
+        parser.add_argument('--occupancy', type=float, default=0.3, help="Tỉ lệ phòng đang có khách")
+        parser.add_argument('--batch-size', type=int, default=seed.BATCH_SIZE)
+        parser.add_argument('--seed', type=int, default=0, help="Seed ngẫu nhiên, cùng seed -> cùng dữ liệu")
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        if options['branches']:
+            created = seed.seed_structure(options['branches'], options['rooms_per_branch'], customers=options['customers'],
+                                          rng=rng, batch_size=options['batch_size'])
+            self.stdout.write(", ".join(f"{k}: {v}" for k, v in created.items()))
+        if options['bookings']:
+            totals = seed.seed_bookings(options['bookings'], days=options['days'], rng=rng, batch_size=options['batch_size'])
+            self.stdout.write(", ".join(f"{k}: {v}" for k, v in totals.items()))
+        occupied = seed.seed_occupancy(options['occupancy'], rng=rng)
+        self.stdout.write(self.style.SUCCESS(f"Xong. {occupied} phòng đang có khách"))
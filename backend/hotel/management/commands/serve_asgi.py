@@ -0,0 +1,29 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+
+class Command(BaseCommand):
+    help = (
+        "Chạy server production bằng uvicorn (ASGI, settings.ASGI_APPLICATION): cần cho luồng sự kiện phòng "
+        "/api/events/rooms/, mỗi kết nối SSE chỉ giữ 1 coroutine thay vì 1 worker thread như WSGI. "
+        "Nhiều worker thì cần ROOM_EVENTS_BROKER dùng chung giữa các process (VD: Redis)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--host', default='0.0.0.0')
+        parser.add_argument('--port', type=int, default=8000)
+        parser.add_argument('--workers', type=int, default=1)
+        parser.add_argument('--reload', action='store_true', help="Tự khởi động lại khi sửa code (chỉ dùng khi phát triển)")
+
+    def handle(self, *args, **options):
+        try:
+            import uvicorn
+        except ImportError:
+            raise CommandError("Chưa cài uvicorn (pip install -r requirements.txt)")
+        if options['workers'] > 1 and not getattr(settings, 'ROOM_EVENTS_BROKER', None):
+            self.stderr.write(self.style.WARNING(
+                "Nhiều worker với InProcessBroker: sự kiện phòng chỉ tới client cùng worker, nên cấu hình ROOM_EVENTS_BROKER"
+            ))
+        module, _, attr = settings.ASGI_APPLICATION.rpartition('.')
+        uvicorn.run(f"{module}:{attr}", host=options['host'], port=options['port'],
+                    workers=options['workers'], reload=options['reload'], proxy_headers=True)
@@ -0,0 +1,82 @@
+import json
+import logging
+import random
+from pathlib import Path
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test.utils import setup_test_environment, teardown_test_environment
+
+from hotel import activity, loadsim, seed
+
+
+class Command(BaseCommand):
+    help = (
+        "Giả lập nhiều lễ tân nhận/trả phòng, thêm dịch vụ, đặt trước, xác nhận cùng lúc; báo thông lượng, p50/p95/p99, "
+        "số lần khóa DB quá hạn, lỗi ràng buộc và sai lệch dữ liệu. Mặc định chạy trên DB test riêng (SQLite: file tạm)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--receptionists', type=int, default=8, help="Số lễ tân chạy song song")
+        parser.add_argument('--duration', type=float, default=30, help="Thời gian chạy (giây)")
+        parser.add_argument('--cycles', type=int, default=10 ** 9, help="Số vòng tối đa mỗi lễ tân")
+        parser.add_argument('--rooms', type=int, default=10, help="Số phòng dùng chung (ít phòng = tranh chấp nhiều)")
+        parser.add_argument('--processes', action='store_true', help="Mỗi lễ tân 1 process thay vì 1 thread")
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--output', help="Ghi kết quả JSON vào file")
+        parser.add_argument('--current-db', action='store_true', help="Chạy trên DB hiện tại (sẽ ghi dữ liệu thật!)")
+
+    def handle(self, *args, **options):
+        setup_test_environment()
+        logging.disable(logging.ERROR)  # Lỗi 500 / cảnh báo SQL của từng request đã được đếm trong kết quả
+        try:
+            if options['current_db']:
+                result = self.simulate(options)
+            else:
+                result = self.simulate_on_test_db(options)
+        finally:
+            logging.disable(logging.NOTSET)
+            teardown_test_environment()
+
+        self.print_result(result)
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as f:
+                json.dump(result, f, ensure_ascii=False, indent=2)
+
+    def simulate_on_test_db(self, options):
+        old_name = connection.settings_dict['NAME']
+        if connection.vendor == 'sqlite' and not connection.settings_dict['TEST'].get('NAME'):
+            # SQLite in-memory dùng chung cache khóa theo bảng, không giống file thật: dùng file tạm
+            connection.settings_dict['TEST']['NAME'] = f"{old_name}.loadsim"
+        connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        try:
+            seed.seed_structure(branches=1, rooms_per_branch=max(options['rooms'], 1), customers=100, rng=random.Random(options['seed']))
+            get_user_model().objects.create_user(username='loadsim', password=None, role='RECEPTIONIST')
+            return self.simulate(options)
+        finally:
+            activity.buffer.flush()
+            test_name = connection.settings_dict['NAME']
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            if connection.vendor == 'sqlite':
+                for suffix in ('-wal', '-shm'):  # File phụ của chế độ WAL
+                    Path(f"{test_name}{suffix}").unlink(missing_ok=True)
+
+    def simulate(self, options):
+        return loadsim.simulate(
+            receptionists=options['receptionists'], duration=options['duration'], max_cycles=options['cycles'],
+            rooms=options['rooms'], use_processes=options['processes'], seed=options['seed'],
+        )
+
+    def print_result(self, r):
+        self.stdout.write(f"{r['receptionists']} lễ tân ({r['mode']}, {r['database']}, {r['rooms']} phòng) trong {r['elapsed_s']}s")
+        self.stdout.write(f"Thông lượng: {r['throughput_ops']} thao tác/s ({r['successful_ops']} thành công/s). Kết quả: {r['outcomes']}")
+        for op, s in r['by_operation'].items():
+            self.stdout.write(f"  {op:<16} n={s['runs']:<6} p50 {s['p50_ms']:>8.1f}  p95 {s['p95_ms']:>8.1f}  p99 {s['p99_ms']:>8.1f} ms  {s['outcomes']}")
+        for message, count in r['top_errors']:
+            self.stdout.write(self.style.WARNING(f"  {count} x {message}"))
+        broken = {k: v for k, v in r['invariants'].items() if v}
+        if broken:
+            self.stdout.write(self.style.ERROR(f"Sai lệch dữ liệu: {broken}"))
+        else:
+            self.stdout.write(self.style.SUCCESS("Dữ liệu nhất quán"))
@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from hotel import stock
+
+
+class Command(BaseCommand):
+    help = "Đối chiếu tồn kho với sổ kho (StockMovement) và chốt tồn định kỳ (StockSnapshot)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--verify-only', action='store_true', help="Chỉ đối chiếu, không chốt tồn")
+
+    def handle(self, *args, **options):
+        mismatches = stock.verify()
+        for m in mismatches[:50]:
+            self.stdout.write(f"  Hàng hóa {m['product_id']}: tồn kho {m['stock_quantity']}, theo sổ {m['ledger']}")
+        if mismatches:
+            raise CommandError(f"Có {len(mismatches)} hàng hóa lệch tồn kho, chưa chốt tồn")
+        self.stdout.write(self.style.SUCCESS("Tồn kho khớp với sổ kho"))
+
+        if not options['verify_only']:
+            count = stock.take_snapshots()
+            self.stdout.write(f"Đã chốt tồn {count} hàng hóa")
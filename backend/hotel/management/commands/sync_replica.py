@@ -0,0 +1,34 @@
+import sqlite3
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from hotel import replica
+
+
+class Command(BaseCommand):
+    help = (
+        "Chép DB chính (SQLite) sang file replica để thử cấu hình đọc replica trên máy (DB_REPLICA_NAME). "
+        "--interval N: chép lại mỗi N giây (giả lập replica trễ tối đa N giây)"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--interval', type=float, help="Chạy liên tục, chép lại sau mỗi N giây")
+
+    def handle(self, *args, **options):
+        if not replica.enabled():
+            raise CommandError("Chưa cấu hình DB replica (đặt biến môi trường DB_REPLICA_NAME)")
+        source, target = connections['default'].settings_dict, connections[replica.REPLICA_ALIAS].settings_dict
+        if 'sqlite3' not in source['ENGINE'] or str(source['NAME']) == str(target['NAME']):
+            raise CommandError("Chỉ dùng cho SQLite với 2 file khác nhau; PostgreSQL dùng streaming replication")
+
+        while True:
+            replica.heartbeat(force=True)
+            started = time.perf_counter()
+            with sqlite3.connect(source['NAME']) as src, sqlite3.connect(target['NAME']) as dst:
+                src.backup(dst)
+            self.stdout.write(f"Đã chép {source['NAME']} -> {target['NAME']} ({(time.perf_counter() - started) * 1000:.0f} ms)")
+            if not options['interval']:
+                return
+            time.sleep(options['interval'])
@@ -0,0 +1,92 @@
+import json
+import logging
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.middleware.gzip import GZipMiddleware
+from rest_framework.permissions import SAFE_METHODS
+
+from . import replica, sqlite_writer
+from .query_stats import record_queries
+
+logger = logging.getLogger('hotel.sql')
+
+
+class QueryStatsMiddleware:
+    """
+    Gắn số liệu SQL của mỗi request vào header (X-DB-Queries, X-DB-Time-Ms, X-DB-Duplicate-Queries, X-DB-N-Plus-One)
+    và ghi 1 dòng log JSON vào logger 'hotel.sql' (WARNING nếu có dấu hiệu N+1).
+    Bật/tắt bằng settings.SQL_INSTRUMENTATION. Response dạng stream (xuất file, SSE) chỉ tính phần chạy trước khi trả header.
+    """
+    def __init__(self, get_response):
+        if not getattr(settings, 'SQL_INSTRUMENTATION', settings.DEBUG):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        with record_queries() as recorder:
+            response = self.get_response(request)
+
+        stats = recorder.summary()
+        response['X-DB-Queries'] = stats['queries']
+        response['X-DB-Time-Ms'] = stats['sql_ms']
+        response['X-DB-Duplicate-Queries'] = stats['duplicate_queries']
+        if stats['n_plus_one']:
+            response['X-DB-N-Plus-One'] = ','.join(stats['n_plus_one'])
+
+        record = {'method': request.method, 'path': request.path, 'status': response.status_code, **stats}
+        level = logging.WARNING if stats['n_plus_one'] else logging.INFO
+        logger.log(level, json.dumps(record, ensure_ascii=False, default=str))
+        return response
+
+
+class SQLiteWriteQueueMiddleware:
+    """
+    Chế độ SQLite production: request ghi đi tuần tự qua hàng đợi ghi (request đọc không bị chặn),
+    thời gian chờ trả về ở header X-DB-Writer-Wait-Ms.
+    """
+    def __init__(self, get_response):
+        if not sqlite_writer.enabled():
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if request.method in SAFE_METHODS:
+            return self.get_response(request)
+        with sqlite_writer.write_slot() as wait:
+            response = self.get_response(request)
+        response['X-DB-Writer-Wait-Ms'] = round(wait * 1000, 2)
+        return response
+
+
+class ReplicaStickinessMiddleware:
+    """
+    Sau request ghi (POST/PUT/PATCH/DELETE) của 1 user: các lần đọc báo cáo của user đó trong REPLICA_STICKY_SECONDS giây
+    đọc DB chính (thấy ngay cái vừa ghi), đồng thời ghi heartbeat để đo độ trễ replica. Chỉ chạy khi có DB replica.
+    """
+    def __init__(self, get_response):
+        if not replica.enabled():
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        if request.method not in SAFE_METHODS:
+            # request.user lúc này là user DRF đã xác thực (JWT) nếu view có dùng tới
+            replica.mark_write(getattr(request, 'user', None))
+            replica.heartbeat()
+        return response
+
+
+class CompressionMiddleware(GZipMiddleware):
+    """
+    Nén gzip response lớn (danh sách đơn, khách, file xuất...) khi client gửi Accept-Encoding: gzip.
+    Bỏ qua response nhỏ hơn settings.GZIP_MIN_LENGTH byte (nén không lợi) và luồng SSE (gzip giữ dữ liệu trong bộ đệm,
+    sự kiện sẽ đến trễ).
+    """
+    def process_response(self, request, response):
+        if response.get('Content-Type', '').startswith('text/event-stream'):
+            return response
+        if not response.streaming and len(response.content) < getattr(settings, 'GZIP_MIN_LENGTH', 1024):
+            return response
+        return super().process_response(request, response)
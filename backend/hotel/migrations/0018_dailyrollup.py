@@ -0,0 +1,31 @@
+# Generated by Django 5.2.8 on 2026-10-18 02:27
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hotel', '0017_booking_deposit_booking_people_count'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('revenue', models.DecimalField(decimal_places=0, default=0, max_digits=14, verbose_name='Tổng doanh thu')),
+                ('service_revenue', models.DecimalField(decimal_places=0, default=0, max_digits=14, verbose_name='Doanh thu dịch vụ')),
+                ('completed_bookings', models.IntegerField(default=0)),
+                ('room_checkins', models.IntegerField(default=0, verbose_name='Số lượt nhận phòng')),
+                ('receipt', models.DecimalField(decimal_places=0, default=0, max_digits=14, verbose_name='Tổng thu')),
+                ('payment', models.DecimalField(decimal_places=0, default=0, max_digits=14, verbose_name='Tổng chi')),
+                ('branch', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_rollups', to='hotel.branch')),
+            ],
+            options={
+                'unique_together': {('branch', 'date')},
+            },
+        ),
+    ]
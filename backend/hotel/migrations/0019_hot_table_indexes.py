@@ -0,0 +1,29 @@
+# Generated by Django 5.2.8 on 2026-10-18 02:29
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hotel', '0018_dailyrollup'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='booking',
+            index=models.Index(fields=['status', 'created_at'], name='hotel_booki_status_1615e5_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='bookingroom',
+            index=models.Index(fields=['room', 'check_out_actual'], name='hotel_booki_room_id_1aedc7_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='cashflow',
+            index=models.Index(fields=['branch', 'created_at', 'flow_type'], name='hotel_cashf_branch__6cb377_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='customer',
+            index=models.Index(fields=['identity_card'], name='hotel_custo_identit_81eefa_idx'),
+        ),
+    ]
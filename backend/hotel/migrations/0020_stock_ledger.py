@@ -0,0 +1,52 @@
+# Generated by Django 5.2.8 on 2026-10-18 02:32
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def create_baseline_snapshots(apps, schema_editor):
+    # Chốt tồn ban đầu cho hàng hóa đã có (chưa có lịch sử trong sổ kho)
+    Product = apps.get_model('hotel', 'Product')
+    StockSnapshot = apps.get_model('hotel', 'StockSnapshot')
+    StockSnapshot.objects.bulk_create([
+        StockSnapshot(product_id=product_id, quantity=quantity, last_movement_id=0)
+        for product_id, quantity in Product.objects.values_list('id', 'stock_quantity')
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hotel', '0019_hot_table_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StockMovement',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('movement_type', models.CharField(choices=[('IMPORT', 'Nhập kho'), ('SALE', 'Bán'), ('ADJUSTMENT', 'Điều chỉnh')], max_length=20)),
+                ('quantity', models.IntegerField()),
+                ('note', models.CharField(blank=True, default='', max_length=255)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('booking', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='hotel.booking')),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='stock_movements', to='hotel.product')),
+                ('user', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='StockSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('quantity', models.IntegerField()),
+                ('last_movement_id', models.BigIntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='stock_snapshots', to='hotel.product')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['product', '-last_movement_id'], name='hotel_stock_product_3ebad5_idx')],
+            },
+        ),
+        migrations.RunPython(create_baseline_snapshots, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,51 @@
+# Generated by Django 5.2.8 on 2026-10-18 02:33
+
+from datetime import timedelta
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def backfill_room_nights(apps, schema_editor):
+    # Giữ đêm cho các đơn đặt trước và các phòng đang có khách (không tính theo giờ)
+    BookingRoom = apps.get_model('hotel', 'BookingRoom')
+    RoomNight = apps.get_model('hotel', 'RoomNight')
+    today = timezone.localdate()
+    nights = []
+    open_rooms = BookingRoom.objects.filter(check_out_actual__isnull=True, booking__status__in=['RESERVED', 'CHECKED_IN']).exclude(booking_type='HOURLY')
+    for br in open_rooms.select_related('booking'):
+        start = br.check_in_actual or br.booking.check_in_expected
+        if not start:
+            continue
+        first = timezone.localdate(start)
+        last = timezone.localdate(br.booking.check_out_expected) if br.booking.check_out_expected else first
+        for i in range(max(1, (last - first).days)):
+            night = first + timedelta(days=i)
+            if night >= today or br.check_in_actual:
+                nights.append(RoomNight(room_id=br.room_id, date=night, booking_room_id=br.id))
+    RoomNight.objects.bulk_create(nights, ignore_conflicts=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hotel', '0020_stock_ledger'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RoomNight',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('booking_room', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='nights', to='hotel.bookingroom')),
+                ('room', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='nights', to='hotel.room')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['date', 'room'], name='hotel_roomn_date_76d210_idx')],
+                'constraints': [models.UniqueConstraint(fields=('room', 'date'), name='unique_room_night')],
+            },
+        ),
+        migrations.RunPython(backfill_room_nights, migrations.RunPython.noop),
+    ]
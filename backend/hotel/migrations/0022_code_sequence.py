@@ -0,0 +1,26 @@
+# Generated by Django 5.2.8 on 2026-10-18 02:35
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hotel', '0021_room_nights'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CodeSequence',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('prefix', models.CharField(max_length=10)),
+                ('next_value', models.BigIntegerField(default=1)),
+                ('branch', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='code_sequences', to='hotel.branch')),
+            ],
+            options={
+                'unique_together': {('branch', 'prefix')},
+            },
+        ),
+    ]
@@ -0,0 +1,47 @@
+# Generated by Django 5.2.8 on 2026-10-18 02:37
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hotel', '0023_activitylog_created_at_default'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ActivityLogArchive',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('original_id', models.BigIntegerField()),
+                ('action', models.CharField(max_length=50)),
+                ('content', models.TextField()),
+                ('created_at', models.DateTimeField()),
+                ('archived_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='activitylog',
+            index=models.Index(fields=['created_at'], name='hotel_activ_created_6098bd_idx'),
+        ),
+        migrations.AddField(
+            model_name='activitylogarchive',
+            name='user',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddIndex(
+            model_name='activitylogarchive',
+            index=models.Index(fields=['created_at'], name='hotel_activ_created_c6f601_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='activitylogarchive',
+            index=models.Index(fields=['user', 'created_at'], name='hotel_activ_user_id_694291_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='activitylogarchive',
+            index=models.Index(fields=['action', 'created_at'], name='hotel_activ_action_bcb3a8_idx'),
+        ),
+    ]
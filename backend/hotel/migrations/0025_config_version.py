@@ -0,0 +1,29 @@
+# Generated by Django 5.2.8 on 2026-10-18 02:40
+
+import time
+
+from django.db import migrations, models
+
+
+def create_pricing_version(apps, schema_editor):
+    ConfigVersion = apps.get_model('hotel', 'ConfigVersion')
+    ConfigVersion.objects.get_or_create(name='pricing', defaults={'version': time.time_ns()})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hotel', '0024_activity_log_archive'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ConfigVersion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=50, unique=True)),
+                ('version', models.BigIntegerField(default=0)),
+            ],
+        ),
+        migrations.RunPython(create_pricing_version, migrations.RunPython.noop),
+    ]
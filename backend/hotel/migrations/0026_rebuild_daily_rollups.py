@@ -0,0 +1,53 @@
+from collections import defaultdict
+
+from django.db import migrations
+from django.db.models import Count, F, Sum
+from django.db.models.functions import TruncDate
+
+ROLLUP_FIELDS = ('revenue', 'service_revenue', 'completed_bookings', 'room_checkins', 'receipt', 'payment')
+
+
+def rebuild_rollups(apps, schema_editor):
+    # Dữ liệu có trước khi có DailyRollup: dựng lại từ bảng gốc để báo cáo không hiện doanh thu 0.
+    # Bản sao cố định của rollups.rebuild() lúc viết migration, chỉ dùng model lịch sử
+    Booking = apps.get_model('hotel', 'Booking')
+    BookingRoom = apps.get_model('hotel', 'BookingRoom')
+    ServiceOrder = apps.get_model('hotel', 'ServiceOrder')
+    CashFlow = apps.get_model('hotel', 'CashFlow')
+    DailyRollup = apps.get_model('hotel', 'DailyRollup')
+    rows = defaultdict(lambda: dict.fromkeys(ROLLUP_FIELDS, 0))
+
+    completed = Booking.objects.filter(status='COMPLETED').annotate(date=TruncDate('created_at'))
+    for r in completed.values('branch_id', 'date').annotate(total=Sum('total_amount'), count=Count('id')):
+        rows[(r['branch_id'], r['date'])]['revenue'] = r['total'] or 0
+        rows[(r['branch_id'], r['date'])]['completed_bookings'] = r['count']
+
+    services = ServiceOrder.objects.filter(booking__status='COMPLETED').annotate(date=TruncDate('booking__created_at'))
+    for r in services.values('booking__branch_id', 'date').annotate(total=Sum(F('quantity') * F('unit_price_snapshot'))):
+        rows[(r['booking__branch_id'], r['date'])]['service_revenue'] = r['total'] or 0
+
+    checkins = BookingRoom.objects.filter(check_in_actual__isnull=False).annotate(date=TruncDate('check_in_actual'))
+    for r in checkins.values('booking__branch_id', 'date').annotate(count=Count('id')):
+        rows[(r['booking__branch_id'], r['date'])]['room_checkins'] = r['count']
+
+    flows = CashFlow.objects.annotate(date=TruncDate('created_at')).values('branch_id', 'date', 'flow_type').annotate(total=Sum('amount'))
+    for r in flows:
+        field = 'receipt' if r['flow_type'] == 'RECEIPT' else 'payment'
+        rows[(r['branch_id'], r['date'])][field] += r['total'] or 0
+
+    DailyRollup.objects.all().delete()
+    DailyRollup.objects.bulk_create(
+        [DailyRollup(branch_id=branch_id, date=day, **values) for (branch_id, day), values in rows.items()],
+        batch_size=1000
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hotel', '0025_config_version'),
+    ]
+
+    operations = [
+        migrations.RunPython(rebuild_rollups, migrations.RunPython.noop),
+    ]
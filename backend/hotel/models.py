@@ -83,6 +83,11 @@ class Customer(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     representative = models.ForeignKey('self', null=True, blank=True, on_delete=models.SET_NULL, related_name='entourage')
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['identity_card']),  # update_or_create khi check-in
+        ]
+
     def __str__(self):
         return self.full_name
 
@@ -103,6 +108,23 @@ class Booking(models.Model):
     
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'created_at']),
+        ]
+
+class CodeSequence(models.Model):
+    # Bộ đếm mã đơn theo chi nhánh + tiền tố (DP, RES); mỗi worker xin 1 khối số rồi cấp dần trong bộ nhớ
+    branch = models.ForeignKey(Branch, on_delete=models.CASCADE, related_name='code_sequences')
+    prefix = models.CharField(max_length=10)
+    next_value = models.BigIntegerField(default=1)
+
+    class Meta:
+        unique_together = ('branch', 'prefix')
+
+    def __str__(self):
+        return f"{self.prefix} - {self.branch_id}: {self.next_value}"
+
 class BookingRoom(models.Model):
     BOOKING_TYPE_CHOICES = (
         ('HOURLY', 'Theo giờ'),
@@ -120,9 +142,31 @@ class BookingRoom(models.Model):
     price_snapshot = models.DecimalField(max_digits=12, decimal_places=0, default=0)
     price_config_snapshot = models.JSONField(default=list, blank=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['room', 'check_out_actual']),  # Tìm lượt ở đang mở của phòng
+        ]
+
     def __str__(self):
         return f"{self.booking.code} - {self.room.name}"
 
+class RoomNight(models.Model):
+    # Lịch chiếm phòng theo đêm: mỗi (phòng, ngày) chỉ 1 dòng -> unique chặn đặt trùng một cách nguyên tử
+    room = models.ForeignKey(Room, on_delete=models.CASCADE, related_name='nights')
+    date = models.DateField()
+    booking_room = models.ForeignKey(BookingRoom, on_delete=models.CASCADE, related_name='nights')
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['room', 'date'], name='unique_room_night'),
+        ]
+        indexes = [
+            models.Index(fields=['date', 'room']),
+        ]
+
+    def __str__(self):
+        return f"{self.room_id} - {self.date}"
+
 # --- 5. PRODUCTS & SERVICES ---
 class Product(models.Model):
     branch = models.ForeignKey(Branch, on_delete=models.CASCADE, related_name='products')
@@ -133,6 +177,32 @@ class Product(models.Model):
     def __str__(self):
         return self.name
 
+class StockMovement(models.Model):
+    # Sổ kho chỉ ghi thêm: mỗi lần nhập/bán/điều chỉnh là 1 dòng, quantity có dấu (+ nhập, - xuất)
+    MOVEMENT_TYPE_CHOICES = (('IMPORT', 'Nhập kho'), ('SALE', 'Bán'), ('ADJUSTMENT', 'Điều chỉnh'))
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='stock_movements')
+    movement_type = models.CharField(max_length=20, choices=MOVEMENT_TYPE_CHOICES)
+    quantity = models.IntegerField()
+    booking = models.ForeignKey('Booking', on_delete=models.SET_NULL, null=True, blank=True)
+    user = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True)
+    note = models.CharField(max_length=255, blank=True, default='')
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.product_id} {self.movement_type} {self.quantity:+d}"
+
+class StockSnapshot(models.Model):
+    # Chốt tồn định kỳ: tồn theo sổ = snapshot mới nhất + tổng các movement có id > last_movement_id
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='stock_snapshots')
+    quantity = models.IntegerField()
+    last_movement_id = models.BigIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['product', '-last_movement_id']),
+        ]
+
 class ServiceOrder(models.Model):
     booking = models.ForeignKey(Booking, on_delete=models.CASCADE, related_name='service_orders')
     product = models.ForeignKey(Product, on_delete=models.PROTECT)
@@ -155,6 +225,11 @@ class CashFlow(models.Model):
     description = models.TextField(blank=True, null=True)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['branch', 'created_at', 'flow_type']),
+        ]
+
     def __str__(self):
         return f"{self.get_flow_type_display()} - {self.amount}"
 
@@ -206,7 +281,33 @@ class ActivityLog(models.Model):
     user = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True)
     action = models.CharField(max_length=50)
     content = models.TextField()
-    created_at = models.DateTimeField(auto_now_add=True)
+    # Không dùng auto_now_add: log ghi trễ (write-behind) được activity.py gán created_at lúc ghi xuống DB
+    created_at = models.DateTimeField(default=timezone.now, editable=False)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['created_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.user} - {self.action} - {self.created_at}"
+
+
+class ActivityLogArchive(models.Model):
+    # Nhật ký cũ hơn ACTIVITY_LOG_RETENTION_DAYS được chuyển sang đây để bảng ActivityLog luôn nhỏ
+    original_id = models.BigIntegerField()
+    user = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True)
+    action = models.CharField(max_length=50)
+    content = models.TextField()
+    created_at = models.DateTimeField()
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['created_at']),
+            models.Index(fields=['user', 'created_at']),
+            models.Index(fields=['action', 'created_at']),
+        ]
 
     def __str__(self):
         return f"{self.user} - {self.action} - {self.created_at}"
@@ -241,4 +342,33 @@ class BranchSetting(models.Model):
     early_checkin_free_hours = models.IntegerField(default=1, verbose_name="Số giờ miễn phí")
 
     def __str__(self):
-        return f"Cài đặt - {self.branch.name}"
\ No newline at end of file
+        return f"Cài đặt - {self.branch.name}"
+
+# --- 10. DAILY ROLLUP (Số liệu tổng hợp theo ngày cho báo cáo) ---
+class DailyRollup(models.Model):
+    branch = models.ForeignKey(Branch, on_delete=models.CASCADE, related_name='daily_rollups')
+    date = models.DateField()
+
+    # Doanh thu: đơn COMPLETED, tính theo ngày tạo đơn (giống báo cáo gốc)
+    revenue = models.DecimalField(max_digits=14, decimal_places=0, default=0, verbose_name="Tổng doanh thu")
+    service_revenue = models.DecimalField(max_digits=14, decimal_places=0, default=0, verbose_name="Doanh thu dịch vụ")
+    completed_bookings = models.IntegerField(default=0)
+    room_checkins = models.IntegerField(default=0, verbose_name="Số lượt nhận phòng")
+
+    # Thu chi: theo ngày tạo phiếu
+    receipt = models.DecimalField(max_digits=14, decimal_places=0, default=0, verbose_name="Tổng thu")
+    payment = models.DecimalField(max_digits=14, decimal_places=0, default=0, verbose_name="Tổng chi")
+
+    class Meta:
+        unique_together = ('branch', 'date')
+
+    def __str__(self):
+        return f"{self.branch_id} - {self.date}"
+
+# --- 11. CONFIG VERSION (Phiên bản dữ liệu cấu hình, để các worker biết cache trong bộ nhớ đã cũ) ---
+class ConfigVersion(models.Model):
+    name = models.CharField(max_length=50, unique=True)
+    version = models.BigIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.name}: {self.version}"
@@ -0,0 +1,25 @@
+from rest_framework.pagination import CursorPagination
+
+
+class CreatedAtCursorPagination(CursorPagination):
+    """
+    Phân trang theo con trỏ (keyset) trên (created_at, id).
+    - Thứ tự ổn định kể cả khi có bản ghi mới chèn vào giữa các lần tải trang.
+    - Chỉ bật khi client gửi ?cursor= hoặc ?page_size=, các màn hình cũ vẫn nhận nguyên danh sách.
+    """
+    ordering = ('-created_at', '-id')
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 500
+    opt_in = True
+
+    def paginate_queryset(self, queryset, request, view=None):
+        params = request.query_params
+        if self.opt_in and self.cursor_query_param not in params and self.page_size_query_param not in params:
+            return None
+        return super().paginate_queryset(queryset, request, view)
+
+
+class AlwaysCreatedAtCursorPagination(CreatedAtCursorPagination):
+    """Luôn phân trang (dùng cho dữ liệu chỉ có ở API mới, VD: nhật ký lưu trữ)."""
+    opt_in = False
@@ -0,0 +1,116 @@
+"""
+Bộ tính giá phòng (tách khỏi views để dùng chung cho check_out, quote, báo giá hàng loạt).
+- Bảng giá lũy tiến theo giờ được "biên dịch" 1 lần thành bảng cộng dồn, cache theo hash cấu hình.
+- Tính tiền cho số giờ bất kỳ trong O(1) thay vì lặp từng giờ.
+"""
+import json
+import math
+from datetime import datetime
+from decimal import Decimal
+from functools import lru_cache
+
+from django.utils import timezone
+
+
+class CompiledHourlyTable:
+    """Bảng giá theo giờ đã biên dịch: cumulative[h] = tổng tiền h giờ đầu, sau đó cộng đều tail_price."""
+
+    def __init__(self, cumulative, tail_price):
+        self.cumulative = cumulative
+        self.tail_price = tail_price
+
+    def price_for(self, hours):
+        last_hour = len(self.cumulative) - 1
+        if hours <= last_hour:
+            return self.cumulative[hours]
+        return self.cumulative[last_hour] + (hours - last_hour) * self.tail_price
+
+
+def config_key(config):
+    # Chuỗi chuẩn hóa của cấu hình, dùng làm khóa cache
+    return json.dumps(config, sort_keys=True, ensure_ascii=False)
+
+
+@lru_cache(maxsize=512)
+def _compile_hourly_config(key):
+    price_map = {}
+    next_price = 0
+    for item in json.loads(key):
+        if str(item.get('hour')).lower() == 'next':
+            next_price = int(item.get('price', 0))
+        else:
+            try:
+                price_map[int(item.get('hour'))] = int(item.get('price', 0))
+            except ValueError: pass
+
+    # Hết cấu hình thì dùng giá 'next' hoặc giá của giờ cuối cùng
+    tail_price = next_price if next_price > 0 else price_map.get(max(price_map.keys(), default=0), 0)
+    last_hour = max(max(price_map.keys(), default=0), 0)
+    cumulative = [0]
+    for h in range(1, last_hour + 1):
+        cumulative.append(cumulative[-1] + price_map.get(h, tail_price))
+    return CompiledHourlyTable(cumulative, tail_price)
+
+
+def compile_hourly_config(config):
+    """Trả về bảng giá đã biên dịch, hoặc None nếu không có cấu hình lũy tiến."""
+    if not (config and isinstance(config, list)):
+        return None
+    return _compile_hourly_config(config_key(config))
+
+
+def room_charge(booking_type, check_in, check_out, price_snapshot, price_config=None):
+    """Tiền phòng theo loại thuê. Trả về (room_money, hours)."""
+    seconds = (check_out - check_in).total_seconds()
+
+    if booking_type == 'HOURLY':
+        hours = max(1, math.ceil(seconds / 3600))
+        table = compile_hourly_config(price_config)
+        if table is not None:
+            return table.price_for(hours), hours
+        # Logic cũ: Nhân đều
+        return hours * price_snapshot, hours
+
+    if booking_type == 'OVERNIGHT':
+        return price_snapshot, math.ceil(seconds / 3600)
+
+    # DAILY
+    days = max(1, math.ceil(seconds / 86400))
+    return days * price_snapshot, days * 24
+
+
+def early_checkin_surcharge(check_in, settings, daily_price):
+    """Phụ thu nhận phòng sớm so với giờ nhận phòng chuẩn của chi nhánh."""
+    if not settings or not settings.check_in_time:
+        return 0
+
+    # Mốc giờ chuẩn: Ngày khách vào (theo giờ local) + Giờ chuẩn (VD: 14:00)
+    local_check_in = timezone.localtime(check_in)
+    standard_check_in = timezone.make_aware(datetime.combine(local_check_in.date(), settings.check_in_time))
+    if check_in >= standard_check_in:
+        return 0
+
+    early_diff_hours = (standard_check_in - check_in).total_seconds() / 3600
+    # Trừ giờ miễn phí
+    chargeable_hours = math.ceil(max(0, early_diff_hours - settings.early_checkin_free_hours))
+    if chargeable_hours <= 0:
+        return 0
+
+    # Vượt ngưỡng thì phạt 1 ngày
+    if early_diff_hours >= settings.early_checkin_threshold_hours:
+        return daily_price
+    if settings.early_checkin_method == 'FIXED':
+        return chargeable_hours * settings.early_checkin_fixed
+    # PERCENT
+    return (chargeable_hours * Decimal(settings.early_checkin_percent) * Decimal(daily_price) / 100).quantize(Decimal(1))
+
+
+def quote_booking_room(booking_room, settings, room_class, at=None):
+    """Báo giá tiền phòng của 1 BookingRoom đang mở tại thời điểm `at` (mặc định: bây giờ), không ghi gì vào DB."""
+    at = at or timezone.now()
+    room_money, hours = room_charge(
+        booking_room.booking_type, booking_room.check_in_actual, at,
+        booking_room.price_snapshot, booking_room.price_config_snapshot
+    )
+    early_surcharge = early_checkin_surcharge(booking_room.check_in_actual, settings, room_class.base_price_daily)
+    return {'hours': hours, 'room_money': room_money, 'early_surcharge': early_surcharge}
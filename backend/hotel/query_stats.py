@@ -0,0 +1,80 @@
+"""
+Đo SQL theo từng request / từng đoạn code: số query, tổng thời gian, các query lặp lại (cùng "dấu vân tay").
+- Dấu vân tay = câu SQL bỏ tham số/hằng số, gộp danh sách IN (...): cùng 1 câu chạy với id khác nhau là trùng.
+- Một câu lặp lại >= N_PLUS_ONE_THRESHOLD lần trong 1 request gần như chắc chắn là N+1 (truy vấn trong vòng lặp serializer).
+Dùng execute_wrapper nên đo được cả khi DEBUG=False, trên mọi DB alias.
+"""
+import hashlib
+import re
+import time
+from collections import Counter
+from contextlib import contextmanager, ExitStack
+
+from django.conf import settings
+from django.db import connections
+
+N_PLUS_ONE_THRESHOLD = getattr(settings, 'SQL_N_PLUS_ONE_THRESHOLD', 5)
+
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r"\b\d+(?:\.\d+)?\b")
+_IN_LIST = re.compile(r"\bIN\s*\((?:\s*(?:%s|\?)\s*,?)+\)", re.IGNORECASE)
+_SPACES = re.compile(r"\s+")
+
+
+def fingerprint(sql):
+    sql = _STRING.sub('?', sql)
+    sql = _NUMBER.sub('?', sql)
+    sql = sql.replace('%s', '?')
+    sql = _IN_LIST.sub('IN (...)', sql)
+    return _SPACES.sub(' ', sql).strip()
+
+
+def short_hash(text):
+    return hashlib.sha1(text.encode()).hexdigest()[:10]
+
+
+class QueryRecorder:
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.fingerprints = Counter()
+        self.samples = {}  # dấu vân tay -> 1 câu SQL mẫu
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - start
+            self.count += 1
+            fp = fingerprint(sql)
+            self.fingerprints[fp] += 1
+            self.samples.setdefault(fp, sql)
+
+    @property
+    def duplicates(self):
+        """[(dấu vân tay, số lần)] các câu chạy hơn 1 lần, nhiều nhất trước."""
+        return [(fp, n) for fp, n in self.fingerprints.most_common() if n > 1]
+
+    @property
+    def n_plus_one(self):
+        return [(fp, n) for fp, n in self.duplicates if n >= N_PLUS_ONE_THRESHOLD]
+
+    def summary(self):
+        return {
+            'queries': self.count,
+            'sql_ms': round(self.duration * 1000, 2),
+            'duplicate_queries': sum(n - 1 for _, n in self.duplicates),
+            'duplicates': [{'fingerprint': short_hash(fp), 'count': n, 'sql': fp} for fp, n in self.duplicates],
+            'n_plus_one': [short_hash(fp) for fp, _ in self.n_plus_one],
+        }
+
+
+@contextmanager
+def record_queries(aliases=None):
+    """with record_queries() as rec: ... -> rec.count, rec.duration, rec.duplicates, rec.n_plus_one"""
+    recorder = QueryRecorder()
+    with ExitStack() as stack:
+        for alias in aliases or connections:
+            stack.enter_context(connections[alias].execute_wrapper(recorder))
+        yield recorder
@@ -0,0 +1,115 @@
+"""
+Renderer nhanh cho client chủ động chọn qua header Accept (client không gửi thì vẫn nhận JSON của DRF như cũ):
+- Accept: application/vnd.hotel+json -> orjson (hoặc ?format=orjson); thiếu gói orjson thì ghi bằng JSONRenderer của DRF
+- Accept: application/msgpack        -> msgpack (chỉ có khi cài gói msgpack, hoặc ?format=msgpack)
+Với 2 renderer này, tiền VND (DecimalField, không có phần lẻ) trả về số nguyên thay vì chuỗi "150000",
+Decimal có phần lẻ vẫn là chuỗi để không mất chính xác. Xem CompactDecimalsMixin / compact_decimals().
+"""
+import datetime
+import decimal
+import uuid
+
+from django.db.models.query import QuerySet
+from django.utils.encoding import force_str
+from django.utils.functional import Promise
+from rest_framework import serializers
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+
+try:
+    import orjson
+except ImportError:  # Gói tùy chọn
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:  # Gói tùy chọn
+    msgpack = None
+
+
+def compact_decimals(request):
+    """Renderer được chọn cho request này có muốn Decimal ở dạng số không."""
+    renderer = getattr(request, 'accepted_renderer', None)
+    return getattr(renderer, 'compact_decimals', False)
+
+
+class CompactDecimalsMixin:
+    """Cho serializer có tiền: DecimalField trả Decimal (không ép thành chuỗi) khi renderer được chọn ghi được số."""
+    def get_fields(self):
+        fields = super().get_fields()
+        request = self.context.get('request')
+        if request is not None and compact_decimals(request):
+            for field in fields.values():
+                if isinstance(field, serializers.DecimalField):
+                    field.coerce_to_string = False
+        return fields
+
+
+def _decimal(value):
+    if value == value.to_integral_value():
+        return int(value)
+    return str(value)
+
+
+def _default(obj):
+    # Giống rest_framework.utils.encoders.JSONEncoder, trừ Decimal (số nguyên nếu không có phần lẻ)
+    if isinstance(obj, decimal.Decimal):
+        return _decimal(obj)
+    if isinstance(obj, Promise):
+        return force_str(obj)
+    if isinstance(obj, datetime.timedelta):
+        return str(obj.total_seconds())
+    if isinstance(obj, uuid.UUID):
+        return str(obj)
+    if isinstance(obj, QuerySet):
+        return list(obj)
+    if hasattr(obj, 'tolist'):
+        return obj.tolist()
+    if hasattr(obj, '__iter__'):
+        return list(obj)
+    raise TypeError(f"Không mã hóa được kiểu {type(obj).__name__}")
+
+
+def _msgpack_default(obj):
+    # msgpack không tự mã hóa ngày giờ: trả chuỗi ISO 8601 như JSON (datetime UTC kết thúc bằng Z giống DRF)
+    if isinstance(obj, datetime.datetime):
+        value = obj.isoformat()
+        return value[:-6] + 'Z' if value.endswith('+00:00') else value
+    if isinstance(obj, (datetime.date, datetime.time)):
+        return obj.isoformat()
+    return _default(obj)
+
+
+class ORJSONRenderer(JSONRenderer):
+    media_type = 'application/vnd.hotel+json'
+    format = 'orjson'
+    charset = None
+
+    @property
+    def compact_decimals(self):
+        # Không có orjson thì trả đúng như JSON mặc định (tiền là chuỗi)
+        return orjson is not None
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if orjson is None:
+            return super().render(data, accepted_media_type, renderer_context)
+        if data is None:
+            return b''
+        return orjson.dumps(data, default=_default, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_UTC_Z)
+
+
+class MsgPackRenderer(BaseRenderer):
+    media_type = 'application/msgpack'
+    format = 'msgpack'
+    charset = None
+    render_style = 'binary'
+    compact_decimals = True
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        return msgpack.packb(data, default=_msgpack_default, use_bin_type=True)
+
+
+def available_renderers():
+    """Các renderer nhanh dùng được trong môi trường hiện tại."""
+    return ([ORJSONRenderer] if orjson is not None else []) + ([MsgPackRenderer] if msgpack is not None else [])
@@ -0,0 +1,133 @@
+"""
+Đọc báo cáo / thống kê / xuất dữ liệu từ DB replica (alias 'replica'), để các truy vấn tổng hợp nặng không tranh chấp
+với check-in, check-out trên DB chính. Chỉ bật khi settings.DATABASES có alias replica (xem core/settings.py).
+- Độ trễ replica: so sánh dòng heartbeat (ConfigVersion) trên DB chính và replica; trễ quá REPLICA_MAX_LAG_SECONDS thì đọc DB chính.
+- Đọc lại cái mình vừa ghi: user vừa gửi POST/PUT/PATCH/DELETE thì REPLICA_STICKY_SECONDS giây sau vẫn đọc DB chính.
+- Chỉ các view được đánh dấu (ReplicaReadMixin / @replica_reads) và chỉ request GET mới đọc replica, còn lại như cũ.
+"""
+import math
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections
+from rest_framework.permissions import SAFE_METHODS
+
+from .models import ConfigVersion
+
+REPLICA_ALIAS = getattr(settings, 'REPLICA_DATABASE_ALIAS', 'replica')
+MAX_LAG_SECONDS = getattr(settings, 'REPLICA_MAX_LAG_SECONDS', 5)
+STICKY_SECONDS = getattr(settings, 'REPLICA_STICKY_SECONDS', 10)
+LAG_CHECK_INTERVAL = 1.0  # Mỗi process đo độ trễ tối đa 1 lần/giây
+HEARTBEAT_INTERVAL = 1.0
+HEARTBEAT_NAME = 'replica_heartbeat'
+
+_read_alias = ContextVar('replica_read_alias', default=None)
+
+
+def enabled():
+    return REPLICA_ALIAS in connections.databases
+
+
+def current_read_alias():
+    """Alias mà router dùng cho truy vấn đọc hiện tại (None = mặc định)."""
+    return _read_alias.get()
+
+
+@contextmanager
+def reading(alias):
+    token = _read_alias.set(alias)
+    try:
+        yield alias
+    finally:
+        _read_alias.reset(token)
+
+
+class _State:
+    lock = threading.Lock()
+    lag = 0.0
+    lag_checked_at = 0.0
+    heartbeat_at = 0.0
+
+
+def _heartbeat_value(alias):
+    return ConfigVersion.objects.using(alias).filter(name=HEARTBEAT_NAME).values_list('version', flat=True).first()
+
+
+def heartbeat(force=False):
+    """Ghi mốc thời gian lên DB chính (tối đa 1 lần/giây mỗi process), replica chép theo để đo độ trễ."""
+    now = time.monotonic()
+    with _State.lock:
+        if not force and now - _State.heartbeat_at < HEARTBEAT_INTERVAL:
+            return
+        _State.heartbeat_at = now
+    ConfigVersion.objects.using(DEFAULT_DB_ALIAS).update_or_create(name=HEARTBEAT_NAME, defaults={'version': time.time_ns()})
+
+
+def lag():
+    """Độ trễ replica (giây) so với DB chính; replica lỗi/thiếu dữ liệu thì coi như trễ vô hạn."""
+    now = time.monotonic()
+    with _State.lock:
+        if now - _State.lag_checked_at < LAG_CHECK_INTERVAL:
+            return _State.lag
+    try:
+        primary, replica = _heartbeat_value(DEFAULT_DB_ALIAS), _heartbeat_value(REPLICA_ALIAS)
+        if primary is None:
+            value = 0.0
+        elif replica is None:
+            value = math.inf
+        else:
+            value = max(0, primary - replica) / 1e9
+    except DatabaseError:
+        value = math.inf
+    with _State.lock:
+        _State.lag, _State.lag_checked_at = value, now
+    return value
+
+
+def _sticky_key(user):
+    return f'replica:sticky:{user.pk}'
+
+
+def mark_write(user):
+    if user is not None and user.is_authenticated:
+        cache.set(_sticky_key(user), True, timeout=STICKY_SECONDS)
+
+
+def read_alias(user=None):
+    """Alias nên dùng để đọc dữ liệu báo cáo cho user này."""
+    if not enabled():
+        return DEFAULT_DB_ALIAS
+    if user is not None and user.is_authenticated and cache.get(_sticky_key(user)):
+        return DEFAULT_DB_ALIAS
+    if lag() > MAX_LAG_SECONDS:
+        return DEFAULT_DB_ALIAS
+    return REPLICA_ALIAS
+
+
+class ReplicaReadMixin:
+    """Cho ViewSet: mọi request GET đọc từ replica (nếu được)."""
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        if request.method in SAFE_METHODS:
+            self._replica_token = _read_alias.set(read_alias(request.user))
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        token = getattr(self, '_replica_token', None)
+        if token is not None:
+            _read_alias.reset(token)
+            self._replica_token = None
+        return super().finalize_response(request, response, *args, **kwargs)
+
+
+def replica_reads(view_func):
+    """Decorator cho 1 action chỉ đọc (VD: BookingViewSet.stats)."""
+    @wraps(view_func)
+    def wrapper(self, request, *args, **kwargs):
+        with reading(read_alias(request.user)):
+            return view_func(self, request, *args, **kwargs)
+    return wrapper
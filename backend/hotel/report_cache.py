@@ -0,0 +1,87 @@
+"""
+Cache kết quả các API báo cáo (ReportViewSet) theo chi nhánh + bộ lọc + khoảng ngày.
+- Khoảng ngày đã qua hẳn: cache vô thời hạn, chỉ bị xóa khi có ghi nhận muộn vào một ngày cũ.
+- Khoảng ngày có hôm nay: bị vô hiệu khi có check-out, phiếu thu/chi, dịch vụ... trong hôm nay.
+Cơ chế: mỗi khóa cache chứa "phiên bản" của chi nhánh; ghi dữ liệu chỉ cần tăng phiên bản (không phải dò xóa từng khóa).
+Chạy nhiều worker thì cần cấu hình CACHES dùng chung (Redis/Memcached).
+"""
+import time
+from functools import wraps
+
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+from rest_framework.response import Response
+
+LIVE_TIMEOUT = 24 * 3600  # Khoảng có hôm nay: tối đa 1 ngày (khóa đổi theo ngày nên không cần lâu hơn)
+STATS_KEYS = ('report_cache:hits', 'report_cache:misses')
+
+
+def _version(name):
+    # Khởi tạo bằng thời gian: nếu khóa phiên bản bị cache đẩy ra thì phiên bản mới vẫn không trùng cái cũ
+    return cache.get_or_set(f'report_cache:v:{name}', time.time_ns, timeout=None)
+
+
+def _bump(name):
+    try:
+        cache.incr(f'report_cache:v:{name}')
+    except ValueError:
+        cache.set(f'report_cache:v:{name}', time.time_ns(), timeout=None)
+
+
+def _count(key):
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, 1, timeout=None)
+
+
+def invalidate(branch_id, day):
+    """Báo có dữ liệu báo cáo thay đổi tại chi nhánh/ngày. Thực hiện sau khi transaction commit."""
+    def run():
+        scope = 'today' if day >= timezone.localdate() else 'past'
+        for branch in (branch_id, 'all'):
+            _bump(f'{scope}:{branch}')
+    transaction.on_commit(run)
+
+
+def invalidate_branch(branch_id):
+    """Xóa mọi kết quả đã cache của chi nhánh (VD: sau khi dựng lại bảng tổng hợp)."""
+    def run():
+        for branch in (branch_id, 'all'):
+            _bump(f'past:{branch}')
+            _bump(f'today:{branch}')
+    transaction.on_commit(run)
+
+
+def cached_report(view_func):
+    """Decorator cho các action của ReportViewSet."""
+    @wraps(view_func)
+    def wrapper(self, request, *args, **kwargs):
+        start, end = self.get_date_range(request)
+        branch = request.query_params.get('branch') or 'all'
+        is_live = end >= timezone.localdate()
+
+        versions = f"p{_version(f'past:{branch}')}"
+        if is_live:
+            versions += f"t{_version(f'today:{branch}')}"
+        key = f'report_cache:{view_func.__name__}:{branch}:{start}:{end}:{versions}'
+
+        data = cache.get(key)
+        if data is not None:
+            _count(STATS_KEYS[0])
+            return Response(data, headers={'X-Report-Cache': 'HIT'})
+
+        _count(STATS_KEYS[1])
+        response = view_func(self, request, *args, **kwargs)
+        if response.status_code == 200:
+            cache.set(key, response.data, timeout=LIVE_TIMEOUT if is_live else None)
+        response['X-Report-Cache'] = 'MISS'
+        return response
+    return wrapper
+
+
+def stats():
+    hits, misses = (cache.get(k, 0) for k in STATS_KEYS)
+    total = hits + misses
+    return {'hits': hits, 'misses': misses, 'hit_rate': round(hits / total, 4) if total else 0}
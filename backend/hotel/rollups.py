@@ -0,0 +1,117 @@
+"""
+Cập nhật bảng DailyRollup (tổng hợp theo chi nhánh/ngày) ngay trong transaction của nghiệp vụ,
+để các báo cáo doanh thu, thu chi không phải gom lại bảng gốc mỗi lần gọi.
+"""
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import transaction, IntegrityError
+from django.db.models import Sum, Count, F
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .models import DailyRollup, Booking, BookingRoom, ServiceOrder, CashFlow
+from . import report_cache
+
+ROLLUP_FIELDS = ('revenue', 'service_revenue', 'completed_bookings', 'room_checkins', 'receipt', 'payment')
+
+
+def bump(branch_id, day, **deltas):
+    """Cộng dồn (UPDATE ... SET x = x + delta) vào dòng của ngày, tạo dòng nếu chưa có."""
+    deltas = {k: v for k, v in deltas.items() if v}
+    if not deltas:
+        return
+    report_cache.invalidate(branch_id, day)
+    updates = {k: F(k) + v for k, v in deltas.items()}
+    if DailyRollup.objects.filter(branch_id=branch_id, date=day).update(**updates):
+        return
+    try:
+        with transaction.atomic():
+            DailyRollup.objects.create(branch_id=branch_id, date=day, **deltas)
+    except IntegrityError:
+        # Request khác vừa tạo dòng này
+        DailyRollup.objects.filter(branch_id=branch_id, date=day).update(**updates)
+
+
+def record_checkout(booking, service_money):
+    bump(booking.branch_id, timezone.localdate(booking.created_at),
+         revenue=booking.total_amount, service_revenue=service_money, completed_bookings=1)
+
+
+def record_booking(booking, sign=1):
+    """Phần của 1 đơn đã trả phòng (doanh thu, tiền dịch vụ, số đơn); sign=-1 để trừ ra trước khi sửa / xóa đơn."""
+    if booking.status != 'COMPLETED':
+        return
+    service_money = booking.service_orders.aggregate(total=Sum(F('quantity') * F('unit_price_snapshot')))['total'] or 0
+    bump(booking.branch_id, timezone.localdate(booking.created_at),
+         revenue=sign * Decimal(booking.total_amount), service_revenue=sign * service_money, completed_bookings=sign)
+
+
+def forget_booking(booking):
+    """Trừ mọi số liệu sẽ mất khi xóa đơn: phần đơn đã trả phòng và lượt nhận phòng (BookingRoom bị xóa theo).
+    Phiếu thu/chi của đơn vẫn giữ lại (booking=NULL) nên không trừ."""
+    record_booking(booking, sign=-1)
+    checkins = booking.booking_rooms.filter(check_in_actual__isnull=False).values_list('check_in_actual', flat=True)
+    for check_in in checkins:
+        record_room_checkin(booking.branch_id, check_in, count=-1)
+
+
+def record_room_checkin(branch_id, check_in, count=1):
+    bump(branch_id, timezone.localdate(check_in), room_checkins=count)
+
+
+def record_cash_flow(cash_flow, sign=1):
+    field = 'receipt' if cash_flow.flow_type == 'RECEIPT' else 'payment'
+    bump(cash_flow.branch_id, timezone.localdate(cash_flow.created_at), **{field: sign * Decimal(cash_flow.amount)})
+
+
+def compute_from_raw():
+    """Tính lại toàn bộ số liệu từ bảng gốc: {(branch_id, date): {field: value}}."""
+    rows = defaultdict(lambda: dict.fromkeys(ROLLUP_FIELDS, 0))
+
+    completed = Booking.objects.filter(status='COMPLETED')
+    for r in completed.annotate(date=TruncDate('created_at')).values('branch_id', 'date').annotate(total=Sum('total_amount'), count=Count('id')):
+        rows[(r['branch_id'], r['date'])]['revenue'] = r['total'] or 0
+        rows[(r['branch_id'], r['date'])]['completed_bookings'] = r['count']
+
+    services = ServiceOrder.objects.filter(booking__status='COMPLETED').annotate(date=TruncDate('booking__created_at'))
+    for r in services.values('booking__branch_id', 'date').annotate(total=Sum(F('quantity') * F('unit_price_snapshot'))):
+        rows[(r['booking__branch_id'], r['date'])]['service_revenue'] = r['total'] or 0
+
+    checkins = BookingRoom.objects.filter(check_in_actual__isnull=False).annotate(date=TruncDate('check_in_actual'))
+    for r in checkins.values('booking__branch_id', 'date').annotate(count=Count('id')):
+        rows[(r['booking__branch_id'], r['date'])]['room_checkins'] = r['count']
+
+    flows = CashFlow.objects.annotate(date=TruncDate('created_at')).values('branch_id', 'date', 'flow_type').annotate(total=Sum('amount'))
+    for r in flows:
+        field = 'receipt' if r['flow_type'] == 'RECEIPT' else 'payment'
+        rows[(r['branch_id'], r['date'])][field] += r['total'] or 0
+
+    return rows
+
+
+@transaction.atomic
+def rebuild():
+    rows = compute_from_raw()
+    DailyRollup.objects.all().delete()
+    DailyRollup.objects.bulk_create(
+        [DailyRollup(branch_id=branch_id, date=day, **values) for (branch_id, day), values in rows.items()],
+        batch_size=1000
+    )
+    for branch_id in {branch_id for branch_id, _ in rows}:
+        report_cache.invalidate_branch(branch_id)
+    return len(rows)
+
+
+def verify():
+    """So sánh bảng tổng hợp với bảng gốc, trả về danh sách sai lệch."""
+    expected = compute_from_raw()
+    actual = {(r.branch_id, r.date): {f: getattr(r, f) for f in ROLLUP_FIELDS} for r in DailyRollup.objects.all()}
+    mismatches = []
+    for key in set(expected) | set(actual):
+        exp = expected.get(key, dict.fromkeys(ROLLUP_FIELDS, 0))
+        act = actual.get(key, dict.fromkeys(ROLLUP_FIELDS, 0))
+        for field in ROLLUP_FIELDS:
+            if exp[field] != act[field]:
+                mismatches.append({'branch_id': key[0], 'date': key[1], 'field': field, 'expected': exp[field], 'actual': act[field]})
+    return mismatches
@@ -0,0 +1,192 @@
+"""
+Sinh dữ liệu giả lập cho benchmark / thử tải: chi nhánh, khu vực, hạng phòng (có bảng giá lũy tiến theo giờ),
+phòng, hàng hóa, khách và lịch sử đơn đã trả phòng (kèm dịch vụ, phiếu thu/chi) trải đều trong N ngày gần nhất.
+- Ghi bằng bulk_create theo lô, bộ nhớ không tăng theo số đơn: sinh được hàng triệu đơn.
+- Cùng seed -> cùng dữ liệu (trừ id/thời gian chạy), để so sánh kết quả giữa các phiên bản.
+- Chạy nhiều lần thì cộng thêm đơn vào các chi nhánh/phòng đã có.
+- Xong thì dựng lại DailyRollup, ghi sổ tồn ban đầu và đổi phiên bản cache cấu hình giá (bulk_create không phát signal).
+"""
+import random
+from contextlib import contextmanager
+from datetime import timedelta
+from decimal import Decimal
+
+from django.db import transaction
+from django.utils import timezone
+
+from . import config_cache, pricing, rollups
+from .models import (
+    Branch, Area, RoomClass, Room, Customer, Booking, BookingRoom, Product,
+    ServiceOrder, CashFlow, BranchSetting
+)
+from .stock import record_initial_stock
+
+BATCH_SIZE = 5000
+ROOM_CLASSES = (
+    # code, tên, giá giờ đầu, giá ngày, giá qua đêm
+    ('STD', "Tiêu chuẩn", 100000, 400000, 250000),
+    ('DLX', "Deluxe", 150000, 600000, 350000),
+    ('VIP', "VIP", 250000, 1000000, 600000),
+)
+PRODUCTS = (
+    ("Nước suối", 10000), ("Coca", 15000), ("Bia Tiger", 25000), ("Mì ly", 20000), ("Khăn lạnh", 5000),
+    ("Snack", 15000), ("Cà phê", 20000), ("Bàn chải", 10000), ("Giặt ủi", 50000), ("Thuê xe máy", 150000),
+)
+PAYMENT_CATEGORIES = ("Điện", "Nước", "Nhập hàng", "Lương", "Sửa chữa")
+
+
+def hourly_config(first_hour_price):
+    """Bảng giá lũy tiến: giờ đầu đủ giá, 2 giờ sau rẻ dần, từ giờ thứ 4 tính giá 'next'."""
+    step = first_hour_price // 4
+    return [
+        {'hour': 1, 'price': first_hour_price},
+        {'hour': 2, 'price': first_hour_price - step},
+        {'hour': 3, 'price': first_hour_price - 2 * step},
+        {'hour': 'next', 'price': first_hour_price // 2},
+    ]
+
+
+@contextmanager
+def explicit_created_at(*models):
+    """Tạm tắt auto_now_add của created_at để ghi được ngày trong quá khứ."""
+    fields = [m._meta.get_field('created_at') for m in models]
+    saved = [f.auto_now_add for f in fields]
+    for f in fields:
+        f.auto_now_add = False
+    try:
+        yield
+    finally:
+        for f, value in zip(fields, saved):
+            f.auto_now_add = value
+
+
+def chunks(total, size):
+    for start in range(0, total, size):
+        yield start, min(size, total - start)
+
+
+@transaction.atomic
+def seed_structure(branches=2, rooms_per_branch=100, rooms_per_area=20, customers=10000, rng=None, batch_size=BATCH_SIZE):
+    """Tạo chi nhánh + cài đặt, khu vực, hạng phòng, phòng, hàng hóa và khách. Trả về số dòng đã tạo theo bảng."""
+    rng = rng or random.Random(0)
+    start = Branch.objects.count()
+    new_branches = Branch.objects.bulk_create([
+        Branch(name=f"Chi nhánh {start + i + 1}", address=f"{start + i + 1} Đường Giả Lập") for i in range(branches)
+    ])
+    BranchSetting.objects.bulk_create([BranchSetting(branch=b) for b in new_branches])
+
+    areas, room_classes, rooms, products = [], [], [], []
+    for branch in new_branches:
+        branch_areas = [Area(branch=branch, name=f"Tầng {i + 1}") for i in range((rooms_per_branch - 1) // rooms_per_area + 1)]
+        branch_classes = [
+            RoomClass(branch=branch, code=code, name=name, base_price_hourly=hourly, base_price_daily=daily,
+                      base_price_overnight=overnight, hourly_price_config=hourly_config(hourly))
+            for code, name, hourly, daily, overnight in ROOM_CLASSES
+        ]
+        Area.objects.bulk_create(branch_areas)
+        RoomClass.objects.bulk_create(branch_classes)
+        rooms += [
+            Room(branch=branch, area=branch_areas[i // rooms_per_area], room_class=rng.choice(branch_classes),
+                 name=f"{i // rooms_per_area + 1}{i % rooms_per_area + 1:02d}")
+            for i in range(rooms_per_branch)
+        ]
+        products += [Product(branch=branch, name=name, selling_price=price, stock_quantity=10 ** 6) for name, price in PRODUCTS]
+        areas += branch_areas
+        room_classes += branch_classes
+    Room.objects.bulk_create(rooms, batch_size=batch_size)
+    record_initial_stock(Product.objects.bulk_create(products))
+
+    for offset, size in chunks(customers, batch_size):
+        Customer.objects.bulk_create([
+            Customer(full_name=f"Khách Giả Lập {start}-{offset + i}", phone=f"09{rng.randrange(10 ** 8):08d}",
+                     identity_card=f"{start:03d}{offset + i:09d}")
+            for i in range(size)
+        ])
+    config_cache.bump()
+    return {'branches': branches, 'areas': len(areas), 'room_classes': len(room_classes), 'rooms': len(rooms),
+            'products': len(products), 'customers': customers}
+
+
+def seed_bookings(count, days=365, rng=None, batch_size=BATCH_SIZE, rebuild_rollups=True):
+    """Thêm `count` đơn đã trả phòng (kèm phòng, dịch vụ, phiếu thu) và ~1 phiếu chi mỗi 20 đơn."""
+    rng = rng or random.Random(0)
+    rooms = list(Room.objects.values_list('id', 'branch_id', 'room_class__base_price_hourly',
+                                          'room_class__base_price_daily', 'room_class__base_price_overnight'))
+    customer_ids = list(Customer.objects.values_list('id', flat=True))
+    products = {}
+    for pid, branch_id, price in Product.objects.values_list('id', 'branch_id', 'selling_price'):
+        products.setdefault(branch_id, []).append((pid, price))
+    if not rooms or not customer_ids:
+        raise ValueError("Chưa có phòng/khách, chạy seed_structure trước")
+
+    now = timezone.now()
+    code_start = Booking.objects.count()
+    totals = {'bookings': 0, 'booking_rooms': 0, 'service_orders': 0, 'cash_flows': 0}
+    with explicit_created_at(Booking, ServiceOrder, CashFlow):
+        for offset, size in chunks(count, batch_size):
+            with transaction.atomic():
+                bookings, stays, services, flows = [], [], [], []
+                for i in range(size):
+                    room_id, branch_id, hourly, daily, overnight = rng.choice(rooms)
+                    check_in = now - timedelta(days=rng.random() * days)
+                    booking_type = rng.choices(('HOURLY', 'DAILY', 'OVERNIGHT'), weights=(5, 3, 2))[0]
+                    if booking_type == 'HOURLY':
+                        units = rng.randint(1, 6)
+                        check_out, price = check_in + timedelta(hours=units), hourly
+                        room_money = pricing.compile_hourly_config(hourly_config(int(hourly))).price_for(units)
+                    else:
+                        units = rng.randint(1, 3) if booking_type == 'DAILY' else 1
+                        check_out, price = check_in + timedelta(days=units), daily if booking_type == 'DAILY' else overnight
+                        room_money = units * price
+                    orders = [(*rng.choice(products[branch_id]), rng.randint(1, 3)) for _ in range(rng.choice((0, 0, 1, 2, 3)))]
+                    service_money = sum(price * qty for _, price, qty in orders)
+                    booking = Booking(code=f"SEED-{code_start + offset + i:09d}", branch_id=branch_id, customer_id=rng.choice(customer_ids),
+                                      status='COMPLETED', total_amount=Decimal(room_money) + service_money, created_at=check_in)
+                    bookings.append(booking)
+                    stays.append((booking, BookingRoom(room_id=room_id, booking_type=booking_type, check_in_actual=check_in,
+                                                       check_out_actual=check_out, price_snapshot=price,
+                                                       price_config_snapshot=hourly_config(int(hourly)) if booking_type == 'HOURLY' else [])))
+                    services += [(booking, ServiceOrder(product_id=pid, quantity=qty, unit_price_snapshot=price, created_at=check_in))
+                                 for pid, price, qty in orders]
+                    flows.append((booking, CashFlow(branch_id=branch_id, flow_type='RECEIPT', category='Thu tiền phòng',
+                                                    amount=booking.total_amount, created_at=check_out)))
+                    if rng.random() < 0.05:
+                        flows.append((None, CashFlow(branch_id=branch_id, flow_type='PAYMENT', category=rng.choice(PAYMENT_CATEGORIES),
+                                                     amount=rng.randrange(100, 5000) * 1000, created_at=check_in)))
+
+                Booking.objects.bulk_create(bookings)
+                for objs, model in ((stays, BookingRoom), (services, ServiceOrder), (flows, CashFlow)):
+                    for booking, obj in objs:
+                        obj.booking = booking
+                    model.objects.bulk_create([obj for _, obj in objs], batch_size=batch_size)
+                totals['bookings'] += len(bookings)
+                totals['booking_rooms'] += len(stays)
+                totals['service_orders'] += len(services)
+                totals['cash_flows'] += len(flows)
+
+    if rebuild_rollups:
+        rollups.rebuild()
+    return totals
+
+
+@transaction.atomic
+def seed_occupancy(ratio=0.3, rng=None):
+    """Cho khoảng `ratio` số phòng đang trống thành đang có khách (đơn theo giờ, chưa trả phòng)."""
+    rng = rng or random.Random(0)
+    rooms = [r for r in Room.objects.filter(status='AVAILABLE').select_related('room_class') if rng.random() < ratio]
+    customer_ids = list(Customer.objects.values_list('id', flat=True)[:1000])
+    now = timezone.now()
+    code_start = Booking.objects.count()
+    bookings = Booking.objects.bulk_create([
+        Booking(code=f"SEED-{code_start + i:09d}", branch_id=room.branch_id, customer_id=rng.choice(customer_ids), status='CHECKED_IN')
+        for i, room in enumerate(rooms)
+    ])
+    stays = BookingRoom.objects.bulk_create([
+        BookingRoom(booking=booking, room=room, booking_type='HOURLY', check_in_actual=now - timedelta(minutes=rng.randint(10, 600)),
+                    price_snapshot=room.room_class.base_price_hourly, price_config_snapshot=room.room_class.hourly_price_config)
+        for booking, room in zip(bookings, rooms)
+    ])
+    for stay in stays:
+        rollups.record_room_checkin(stay.booking.branch_id, stay.check_in_actual)
+    Room.objects.filter(id__in=[room.id for room in rooms]).update(status='OCCUPIED')
+    return len(rooms)
@@ -1,27 +1,74 @@
+from django.conf import settings
 from rest_framework import serializers
+from .renderers import CompactDecimalsMixin
 from .models import (
     Branch, Area, RoomClass, Room, Booking, Product, ServiceOrder, 
     Customer, User, BookingRoom, CashFlow,
-    Device, MaintenanceLog, ActivityLog, BranchSetting
+    Device, MaintenanceLog, ActivityLog, ActivityLogArchive, BranchSetting
 )
 
-class BranchSerializer(serializers.ModelSerializer):
+
+def _param_set(value):
+    return None if value is None else {name.strip() for name in value.split(',') if name.strip()}
+
+
+class SparseFieldsMixin:
+    """
+    Chọn field theo query param (chỉ với request GET):
+    - ?fields=id,code,...: chỉ trả các field được liệt kê.
+    - ?expand=a,b: chỉ trả các field nặng (Meta.expandable_fields: dữ liệu lồng, cần thêm query) được liệt kê.
+    Không gửi cả 2 thì trả đủ như cũ. View dùng requested_fields() để bỏ luôn query của field không cần.
+    """
+    def get_fields(self):
+        fields = super().get_fields()
+        request = self.context.get('request')
+        if request is None or request.method != 'GET' or not self._is_root():
+            return fields
+        wanted, expand = _param_set(request.query_params.get('fields')), _param_set(request.query_params.get('expand'))
+        if wanted is None and expand is None:
+            return fields
+        expand = expand or set()
+        expandable = getattr(self.Meta, 'expandable_fields', ())
+
+        def keep(name):
+            if name in expandable:
+                return name in expand or (wanted is not None and name in wanted)
+            return wanted is None or name in wanted or name in expand
+        return {name: field for name, field in fields.items() if keep(name)}
+
+    def _is_root(self):
+        # Serializer lồng bên trong (VD: service_orders của Booking) không lọc theo query param.
+        # Serializer dựng riêng trong SerializerMethodField (không có parent) thì đánh dấu bằng context['nested']
+        if self.context.get('nested'):
+            return False
+        parent = self.parent
+        if isinstance(parent, serializers.ListSerializer):
+            parent = parent.parent
+        return parent is None
+
+
+def requested_fields(serializer_class, request):
+    """Tên các field serializer sẽ trả về cho request này."""
+    return set(serializer_class(context={'request': request}).fields)
+
+
+class BranchSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = Branch
         fields = '__all__'
 
-class AreaSerializer(serializers.ModelSerializer):
+class AreaSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = Area
         fields = '__all__'
 
-class RoomClassSerializer(serializers.ModelSerializer):
+class RoomClassSerializer(CompactDecimalsMixin, SparseFieldsMixin, serializers.ModelSerializer):
     # JSONField hourly_price_config sẽ tự động được include vì dùng __all__
     class Meta:
         model = RoomClass
         fields = '__all__'
 
-class RoomSerializer(serializers.ModelSerializer):
+class RoomSerializer(CompactDecimalsMixin, SparseFieldsMixin, serializers.ModelSerializer):
     room_class_name = serializers.CharField(source='room_class.name', read_only=True)
     area_name = serializers.CharField(source='area.name', read_only=True)
     price_hourly = serializers.DecimalField(source='room_class.base_price_hourly', max_digits=12, decimal_places=0, read_only=True)
@@ -30,11 +77,17 @@ class RoomSerializer(serializers.ModelSerializer):
     class Meta:
         model = Room
         fields = ['id', 'name', 'status', 'branch', 'area', 'area_name', 'room_class', 'room_class_name', 'price_hourly', 'current_booking']
+        expandable_fields = ('current_booking',)
 
     def get_current_booking(self, obj):
         if obj.status == 'OCCUPIED':
             try:
-                booking_room = obj.bookingroom_set.filter(check_out_actual__isnull=True).latest('id')
+                # Dùng dữ liệu đã prefetch từ RoomViewSet nếu có, tránh N+1 query
+                if hasattr(obj, 'open_booking_rooms'):
+                    if not obj.open_booking_rooms: return None
+                    booking_room = obj.open_booking_rooms[0]
+                else:
+                    booking_room = obj.bookingroom_set.filter(check_out_actual__isnull=True).latest('id')
                 return {
                     'booking_type': booking_room.booking_type,
                     'booking_type_display': booking_room.get_booking_type_display(),
@@ -45,39 +98,78 @@ class RoomSerializer(serializers.ModelSerializer):
                 return None
         return None
 
-class ProductSerializer(serializers.ModelSerializer):
+class ProductSerializer(CompactDecimalsMixin, SparseFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = Product
         fields = '__all__'
 
-class ServiceOrderSerializer(serializers.ModelSerializer):
+class ServiceOrderSerializer(CompactDecimalsMixin, SparseFieldsMixin, serializers.ModelSerializer):
     product_name = serializers.CharField(source='product.name', read_only=True)
     class Meta:
         model = ServiceOrder
         fields = ['id', 'product', 'product_name', 'quantity', 'unit_price_snapshot', 'total_price', 'created_at']
 
-class CustomerSerializer(serializers.ModelSerializer):
+# Số cấp người đi cùng tối đa được trả về (Trưởng đoàn -> người đi cùng -> ...)
+ENTOURAGE_DEFAULT_DEPTH = getattr(settings, 'CUSTOMER_ENTOURAGE_DEPTH', 2)
+
+def build_entourage_map(customers, depth):
+    """
+    Tải cây người đi cùng cho cả danh sách khách: mỗi cấp 1 query (thay vì 1 query/khách/cấp).
+    Trả về {representative_id: [Customer, ...]}, representative của từng người đã được gán sẵn.
+    """
+    entourage_map = {}
+    parents = {c.id: c for c in customers}
+    for _ in range(depth):
+        if not parents: break
+        children = list(Customer.objects.filter(representative_id__in=list(parents)).order_by('id'))
+        for child in children:
+            child.representative = parents[child.representative_id]
+            entourage_map.setdefault(child.representative_id, []).append(child)
+        parents = {c.id: c for c in children}
+    return entourage_map
+
+class CustomerListSerializer(serializers.ListSerializer):
+    def to_representation(self, data):
+        # Dựng sẵn cây người đi cùng cho cả trang trước khi serialize từng dòng
+        if 'entourage_map' not in self._context and 'entourage' in self.child.fields:
+            items = list(data.all() if hasattr(data, 'all') else data)
+            depth = self._context.get('entourage_depth', ENTOURAGE_DEFAULT_DEPTH)
+            self._context['entourage_map'] = build_entourage_map(items, depth)
+            data = items
+        return super().to_representation(data)
+
+class CustomerSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     representative_name = serializers.SerializerMethodField()
     entourage = serializers.SerializerMethodField()
+    entourage_count = serializers.IntegerField(read_only=True)  # Chỉ có khi queryset đã annotate
 
     class Meta:
         model = Customer
         fields = '__all__'
+        list_serializer_class = CustomerListSerializer
+        expandable_fields = ('entourage',)
 
     def get_representative_name(self, obj):
         return obj.representative.full_name if obj.representative else None
 
     def get_entourage(self, obj):
-        people = obj.entourage.all()
-        return CustomerSerializer(people, many=True).data
+        depth = self.context.get('entourage_depth', ENTOURAGE_DEFAULT_DEPTH)
+        if depth <= 0: return []
+        entourage_map = self.context.get('entourage_map')
+        if entourage_map is None:
+            # Serialize 1 khách lẻ (retrieve/create/update)
+            entourage_map = build_entourage_map([obj], depth)
+        people = entourage_map.get(obj.id, [])
+        context = {**self.context, 'entourage_map': entourage_map, 'entourage_depth': depth - 1, 'nested': True}
+        return CustomerSerializer(people, many=True, context=context).data
 
-class BookingRoomDetailSerializer(serializers.ModelSerializer):
+class BookingRoomDetailSerializer(CompactDecimalsMixin, SparseFieldsMixin, serializers.ModelSerializer):
     room_name = serializers.CharField(source='room.name', read_only=True)
     class Meta:
         model = BookingRoom
         fields = ['room_name', 'booking_type', 'check_in_actual', 'check_out_actual', 'price_snapshot', 'price_config_snapshot']
 
-class BookingSerializer(serializers.ModelSerializer):
+class BookingSerializer(CompactDecimalsMixin, SparseFieldsMixin, serializers.ModelSerializer):
     customer_name = serializers.CharField(source='customer.full_name', read_only=True)
     room_name = serializers.SerializerMethodField()
     service_orders = ServiceOrderSerializer(many=True, read_only=True) 
@@ -86,12 +178,26 @@ class BookingSerializer(serializers.ModelSerializer):
     class Meta:
         model = Booking
         fields = ['id', 'code', 'customer_name', 'room_name', 'total_amount', 'status', 'created_at', 'service_orders', 'booking_details', 'check_in_expected', 'check_out_expected', 'note', 'deposit', 'people_count']
+        expandable_fields = ('service_orders', 'booking_details')
 
     def get_room_name(self, obj):
-        first_room = obj.booking_rooms.first()
-        return first_room.room.name if first_room else "N/A"
+        # booking_rooms đã prefetch (BookingViewSet) thì lấy từ bộ nhớ, không query lại cho từng đơn
+        booking_rooms = sorted(obj.booking_rooms.all(), key=lambda br: br.id)
+        return booking_rooms[0].room.name if booking_rooms else "N/A"
+
+class BookingListSerializer(CompactDecimalsMixin, SparseFieldsMixin, serializers.ModelSerializer):
+    """Danh sách đơn gọn: mọi cột tính sẵn trong 1 query (BookingViewSet.list_queryset), không có dữ liệu lồng.
+    Chi tiết dịch vụ / phòng lấy ở /api/bookings/<id>/."""
+    customer_name = serializers.CharField(read_only=True)
+    room_name = serializers.CharField(read_only=True)
+    room_count = serializers.IntegerField(read_only=True)
+    service_total = serializers.DecimalField(max_digits=14, decimal_places=0, read_only=True)
+
+    class Meta:
+        model = Booking
+        fields = ['id', 'code', 'customer_name', 'room_name', 'room_count', 'service_total', 'total_amount', 'status', 'created_at', 'check_in_expected', 'check_out_expected', 'note', 'deposit', 'people_count']
 
-class UserSerializer(serializers.ModelSerializer):
+class UserSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     branch_name = serializers.CharField(source='branch.name', read_only=True)
     password = serializers.CharField(write_only=True, required=False) 
 
@@ -113,13 +219,13 @@ class UserSerializer(serializers.ModelSerializer):
         instance.save()
         return instance
 
-class CashFlowSerializer(serializers.ModelSerializer):
+class CashFlowSerializer(CompactDecimalsMixin, SparseFieldsMixin, serializers.ModelSerializer):
     booking_code = serializers.CharField(source='booking.code', read_only=True)
     class Meta:
         model = CashFlow
         fields = ['id', 'branch', 'booking', 'booking_code', 'flow_type', 'category', 'amount', 'description', 'created_at']
 
-class DeviceSerializer(serializers.ModelSerializer):
+class DeviceSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     room_name = serializers.CharField(source='room.name', read_only=True)
     area_name = serializers.CharField(source='area.name', read_only=True)
     next_maintenance_date = serializers.ReadOnlyField() 
@@ -128,21 +234,28 @@ class DeviceSerializer(serializers.ModelSerializer):
         model = Device
         fields = '__all__'
 
-class MaintenanceLogSerializer(serializers.ModelSerializer):
+class MaintenanceLogSerializer(CompactDecimalsMixin, SparseFieldsMixin, serializers.ModelSerializer):
     device_name = serializers.CharField(source='device.name', read_only=True)
     
     class Meta:
         model = MaintenanceLog
         fields = '__all__'
 
-class ActivityLogSerializer(serializers.ModelSerializer):
+class ActivityLogSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     user_name = serializers.CharField(source='user.username', read_only=True)
 
     class Meta:
         model = ActivityLog
         fields = '__all__'
 
-class BranchSettingSerializer(serializers.ModelSerializer):
+class ActivityLogArchiveSerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    user_name = serializers.CharField(source='user.username', read_only=True)
+
+    class Meta:
+        model = ActivityLogArchive
+        fields = '__all__'
+
+class BranchSettingSerializer(CompactDecimalsMixin, SparseFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = BranchSetting
         fields = '__all__'
\ No newline at end of file
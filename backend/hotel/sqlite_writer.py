@@ -0,0 +1,91 @@
+"""
+Chế độ SQLite cho chi nhánh nhỏ chạy 1 máy (settings.SQLITE_PRODUCTION_MODE, bật bằng SQLITE_MODE=production):
+- WAL: người đọc không chặn người ghi và ngược lại; synchronous=NORMAL, busy_timeout, cache lớn (xem core/settings.py).
+- transaction_mode IMMEDIATE: transaction giành khóa ghi ngay từ BEGIN nên chờ theo busy_timeout,
+  không còn lỗi "database is locked" khi 2 transaction cùng nâng từ đọc lên ghi.
+- Hàng đợi ghi: trong 1 process, mọi request ghi (POST/PUT/PATCH/DELETE) và luồng ghi nhật ký đi qua 1 "cửa ghi" tuần tự,
+  request đọc chạy song song. Đo số request đang chờ và thời gian chờ (xem stats()).
+Chạy nhiều process thì SQLite vẫn tuần tự hóa giữa các process bằng busy_timeout; khuyến nghị 1 process nhiều thread.
+"""
+import statistics
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import connection
+
+WAIT_SAMPLES = 1000  # Số lần chờ gần nhất giữ lại để tính p95
+
+
+def enabled():
+    return getattr(settings, 'SQLITE_PRODUCTION_MODE', False) and connection.vendor == 'sqlite'
+
+
+class WriteQueue:
+    def __init__(self):
+        self.lock = threading.RLock()
+        self.stats_lock = threading.Lock()
+        self.waiting = 0
+        self.max_waiting = 0
+        self.acquired = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+        self.total_held = 0.0
+        self.recent_waits = deque(maxlen=WAIT_SAMPLES)
+
+    @contextmanager
+    def slot(self):
+        """Giữ cửa ghi trong suốt khối lệnh; trả về số giây đã phải chờ."""
+        with self.stats_lock:
+            self.waiting += 1
+            self.max_waiting = max(self.max_waiting, self.waiting)
+        started = time.perf_counter()
+        self.lock.acquire()
+        acquired_at = time.perf_counter()
+        wait = acquired_at - started
+        with self.stats_lock:
+            self.waiting -= 1
+            self.acquired += 1
+            self.total_wait += wait
+            self.max_wait = max(self.max_wait, wait)
+            self.recent_waits.append(wait)
+        try:
+            yield wait
+        finally:
+            held = time.perf_counter() - acquired_at
+            self.lock.release()
+            with self.stats_lock:
+                self.total_held += held
+
+    def stats(self):
+        with self.stats_lock:
+            waits = list(self.recent_waits)
+            return {
+                'enabled': enabled(),
+                'queue_depth': self.waiting,
+                'max_queue_depth': self.max_waiting,
+                'writes': self.acquired,
+                'avg_wait_ms': round(self.total_wait / self.acquired * 1000, 3) if self.acquired else 0,
+                'p95_wait_ms': round(statistics.quantiles(waits, n=20)[-1] * 1000, 3) if len(waits) > 1 else 0,
+                'max_wait_ms': round(self.max_wait * 1000, 3),
+                'avg_hold_ms': round(self.total_held / self.acquired * 1000, 3) if self.acquired else 0,
+            }
+
+
+queue = WriteQueue()
+
+
+@contextmanager
+def write_slot():
+    """Khối lệnh ghi đi qua hàng đợi ghi (không làm gì nếu chế độ SQLite production tắt)."""
+    if not enabled():
+        yield 0.0
+        return
+    with queue.slot() as wait:
+        yield wait
+
+
+def stats():
+    return queue.stats()
@@ -0,0 +1,73 @@
+"""
+Tồn kho hàng hóa: thay read-modify-write (product.stock_quantity += qty; save()) bằng
+- 1 câu UPDATE có điều kiện với F() (không mất cập nhật khi nhiều phòng gọi cùng lúc, không khóa bảng)
+- 1 dòng ghi thêm vào sổ kho StockMovement
+Tồn theo sổ = StockSnapshot mới nhất + tổng movement sau đó; dùng để đối chiếu với Product.stock_quantity.
+"""
+from django.db import transaction
+from django.db.models import F, Sum, Max, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from .models import Product, StockMovement, StockSnapshot
+
+
+class InsufficientStock(Exception):
+    pass
+
+
+def change_stock(product, delta, movement_type, allow_negative=False, **ledger_fields):
+    """
+    Cộng/trừ tồn kho của 1 hàng hóa. Bán hàng (delta < 0) bị từ chối nếu tồn không đủ.
+    Trả về StockMovement vừa ghi.
+    """
+    with transaction.atomic():
+        products = Product.objects.filter(pk=product.pk)
+        if delta < 0 and not allow_negative:
+            products = products.filter(stock_quantity__gte=-delta)
+        if not products.update(stock_quantity=F('stock_quantity') + delta):
+            raise InsufficientStock(f"{product.name} không đủ tồn kho (cần {-delta})")
+        return StockMovement.objects.create(product=product, movement_type=movement_type, quantity=delta, **ledger_fields)
+
+
+def record_initial_stock(products, user=None):
+    """Ghi sổ tồn ban đầu cho hàng hóa vừa tạo (tạo tay hoặc nhập file)."""
+    StockMovement.objects.bulk_create([
+        StockMovement(product=p, movement_type='ADJUSTMENT', quantity=p.stock_quantity, user=user, note="Tồn ban đầu")
+        for p in products if p.stock_quantity
+    ])
+
+
+def ledger_quantities(upto_movement_id=None):
+    """Tồn theo sổ của từng hàng hóa: {product_id: quantity}, 1 query cho toàn bộ hàng hóa."""
+    latest = StockSnapshot.objects.filter(product=OuterRef('pk')).order_by('-last_movement_id', '-id')
+    movements = StockMovement.objects.filter(product=OuterRef('pk'), id__gt=OuterRef('snapshot_mid'))
+    if upto_movement_id is not None:
+        movements = movements.filter(id__lte=upto_movement_id)
+    deltas = movements.order_by().values('product').annotate(total=Sum('quantity')).values('total')
+
+    products = Product.objects.annotate(
+        snapshot_qty=Coalesce(Subquery(latest.values('quantity')[:1]), 0),
+        snapshot_mid=Coalesce(Subquery(latest.values('last_movement_id')[:1]), 0),
+    ).annotate(delta=Coalesce(Subquery(deltas), 0))
+    return {pid: qty + delta for pid, qty, delta in products.values_list('id', 'snapshot_qty', 'delta')}
+
+
+def verify():
+    """Danh sách hàng hóa có Product.stock_quantity lệch với sổ kho."""
+    ledger = ledger_quantities()
+    return [
+        {'product_id': pid, 'stock_quantity': qty, 'ledger': ledger.get(pid, 0)}
+        for pid, qty in Product.objects.values_list('id', 'stock_quantity')
+        if qty != ledger.get(pid, 0)
+    ]
+
+
+@transaction.atomic
+def take_snapshots():
+    """Chốt tồn theo sổ cho mọi hàng hóa (chạy định kỳ), để lần tính sau chỉ cộng các movement mới."""
+    last_id = StockMovement.objects.aggregate(m=Max('id'))['m'] or 0
+    ledger = ledger_quantities(upto_movement_id=last_id)
+    StockSnapshot.objects.bulk_create([
+        StockSnapshot(product_id=pid, quantity=qty, last_movement_id=last_id) for pid, qty in ledger.items()
+    ])
+    return len(ledger)
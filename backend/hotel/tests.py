@@ -1,3 +1,909 @@
-from django.test import TestCase
+import asyncio
+import csv
+import gzip
+import io
+import json
+import random
+import threading
+import time
+from decimal import Decimal
+from io import StringIO
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from asgiref.sync import async_to_sync
+from django.test import AsyncClient, TestCase, SimpleTestCase, TransactionTestCase, override_settings
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.http import HttpResponse
+from django.db import connection, transaction, IntegrityError, OperationalError
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+
+from datetime import date, datetime, timedelta
+
+from .models import User, Branch, Area, RoomClass, Room, Customer, Booking, BookingRoom, Product, ActivityLog, BranchSetting, CodeSequence, RoomNight, ConfigVersion, CashFlow
+from . import pricing, rollups, events, stock, codes, activity, archive, config_cache, query_stats, seed, bench, loadsim, replica, db_router, sqlite_writer, renderers, availability
+from .management.commands import explain_queries
+
+
+class RoomBoardQueryTest(TestCase):
+    def setUp(self):
+        self.branch = Branch.objects.create(name="CN Test")
+        self.area = Area.objects.create(branch=self.branch, name="Tầng 1")
+        self.room_class = RoomClass.objects.create(branch=self.branch, code="STD", name="Standard", base_price_hourly=100000)
+        self.customer = Customer.objects.create(full_name="Khách Test")
+        self.user = User.objects.create_user(username="letan", password="x", role='RECEPTIONIST')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.counter = 0
+
+    def add_occupied_rooms(self, n):
+        for _ in range(n):
+            self.counter += 1
+            room = Room.objects.create(
+                branch=self.branch, area=self.area, room_class=self.room_class,
+                name=f"P{self.counter}", status='OCCUPIED'
+            )
+            booking = Booking.objects.create(branch=self.branch, customer=self.customer, code=f"DP{self.counter}")
+            BookingRoom.objects.create(booking=booking, room=room, booking_type='HOURLY', check_in_actual=timezone.now(), price_snapshot=100000)
+
+    def count_list_queries(self):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get('/api/rooms/', {'branch': self.branch.id})
+        self.assertEqual(response.status_code, 200)
+        return len(ctx.captured_queries), response.json()
+
+    def test_room_list_query_count_is_constant(self):
+        self.add_occupied_rooms(2)
+        small_count, _ = self.count_list_queries()
+        self.add_occupied_rooms(10)
+        large_count, data = self.count_list_queries()
+
+        self.assertEqual(small_count, large_count)
+        self.assertEqual(len(data), 12)
+        self.assertTrue(all(r['current_booking'] and r['current_booking']['booking_type'] == 'HOURLY' for r in data))
+        self.assertTrue(all(r['room_class_name'] == "Standard" and r['area_name'] == "Tầng 1" for r in data))
+
+    def test_write_actions_load_room_without_board_joins(self):
+        room = Room.objects.create(branch=self.branch, area=self.area, room_class=self.room_class, name="P1")
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.post(f'/api/rooms/{room.id}/check_in/', {'full_name': "Khách A", 'booking_type': 'HOURLY'}, format='json')
+        self.assertEqual(response.status_code, 200)
+        room_loads = [q['sql'] for q in ctx.captured_queries if q['sql'].startswith('SELECT') and 'FROM "hotel_room" ' in q['sql']]
+        self.assertEqual(len(room_loads), 1)
+        self.assertNotIn('JOIN', room_loads[0])
+
+    def test_branch_bills_query_count_is_constant(self):
+        def count_bill_queries():
+            with CaptureQueriesContext(connection) as ctx:
+                response = self.client.get('/api/rooms/bills/', {'branch': self.branch.id})
+            self.assertEqual(response.status_code, 200)
+            return len(ctx.captured_queries), response.json()
+
+        self.add_occupied_rooms(2)
+        small_count, _ = count_bill_queries()
+        self.add_occupied_rooms(10)
+        large_count, data = count_bill_queries()
+
+        self.assertEqual(small_count, large_count)
+        self.assertEqual(data['summary']['room_count'], 12)
+        self.assertTrue(all(r['room_money'] == 100000 for r in data['rooms']))
+
+
+class CustomerEntourageQueryTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="letan", password="x")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def add_groups(self, n):
+        for _ in range(n):
+            rep = Customer.objects.create(full_name="Trưởng đoàn")
+            for _ in range(2):
+                Customer.objects.create(full_name="Người đi cùng", representative=rep)
+
+    def count_list_queries(self, params=None):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get('/api/customers/', params or {})
+        self.assertEqual(response.status_code, 200)
+        return len(ctx.captured_queries), response.json()
+
+    def test_entourage_loaded_in_constant_queries(self):
+        self.add_groups(1)
+        small_count, _ = self.count_list_queries()
+        self.add_groups(5)
+        large_count, data = self.count_list_queries()
+
+        self.assertEqual(small_count, large_count)
+        reps = [c for c in data if c['representative'] is None]
+        self.assertEqual(len(reps), 6)
+        self.assertTrue(all(len(c['entourage']) == 2 and c['entourage_count'] == 2 for c in reps))
+        self.assertTrue(all(p['representative_name'] == "Trưởng đoàn" for c in reps for p in c['entourage']))
+
+    def test_representatives_only_mode(self):
+        self.add_groups(3)
+        _, data = self.count_list_queries({'representatives_only': '1'})
+        self.assertEqual(len(data), 3)
+        self.assertTrue(all(c['entourage'] == [] and c['entourage_count'] == 2 for c in data))
+
+
+class HourlyPricingTest(SimpleTestCase):
+    CONFIG = [{'hour': 1, 'price': 100000}, {'hour': 2, 'price': 50000}, {'hour': 4, 'price': 30000}, {'hour': 'next', 'price': 20000}]
+
+    def naive_price(self, config, total_hours):
+        # Cách tính cũ: cộng từng giờ
+        price_map, next_price = {}, 0
+        for item in config:
+            if str(item.get('hour')).lower() == 'next': next_price = int(item.get('price', 0))
+            else: price_map[int(item.get('hour'))] = int(item.get('price', 0))
+        fallback = next_price if next_price > 0 else price_map.get(max(price_map.keys(), default=0), 0)
+        return sum(price_map.get(h, fallback) for h in range(1, total_hours + 1))
+
+    def test_compiled_table_matches_hour_by_hour_sum(self):
+        for config in (self.CONFIG, self.CONFIG[:3]):
+            table = pricing.compile_hourly_config(config)
+            for hours in range(1, 60):
+                self.assertEqual(table.price_for(hours), self.naive_price(config, hours))
+
+    def test_room_charge_by_booking_type(self):
+        check_in = timezone.now()
+        self.assertEqual(pricing.room_charge('HOURLY', check_in, check_in + timedelta(minutes=150), 80000, self.CONFIG), (170000, 3))
+        self.assertEqual(pricing.room_charge('HOURLY', check_in, check_in + timedelta(minutes=10), 80000, []), (80000, 1))
+        self.assertEqual(pricing.room_charge('DAILY', check_in, check_in + timedelta(hours=30), 500000), (1000000, 48))
+
+
+class RoomQuoteTest(TestCase):
+    def setUp(self):
+        branch = Branch.objects.create(name="CN Test")
+        room_class = RoomClass.objects.create(branch=branch, code="STD", name="Standard", base_price_hourly=80000,
+                                              hourly_price_config=HourlyPricingTest.CONFIG)
+        self.room = Room.objects.create(branch=branch, room_class=room_class, name="101")
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_user(username="letan", password="x"))
+
+    def test_quote_matches_pricing_for_open_stay(self):
+        self.client.post(f'/api/rooms/{self.room.id}/check_in/', {'full_name': "Khách giờ", 'booking_type': 'HOURLY'}, format='json')
+        booking_room = BookingRoom.objects.get(room=self.room)
+        at = booking_room.check_in_actual + timedelta(minutes=150)
+        with mock.patch.object(timezone, 'now', return_value=at):
+            data = self.client.get(f'/api/rooms/{self.room.id}/quote/').json()
+
+        expected = pricing.quote_booking_room(booking_room, *config_cache.pricing_config(self.room), at=at)
+        self.assertEqual((data['hours'], data['room_money']), (expected['hours'], expected['room_money']))
+        self.assertEqual((data['hours'], data['room_money']), (3, 170000))
+        self.assertEqual(data['total_money'], expected['room_money'] + expected['early_surcharge'])
+        self.assertEqual(BookingRoom.objects.get(pk=booking_room.pk).check_out_actual, None)
+
+    def test_quote_without_open_stay_is_rejected(self):
+        self.assertEqual(self.client.get(f'/api/rooms/{self.room.id}/quote/').status_code, 400)
+        Room.objects.filter(pk=self.room.pk).update(status='OCCUPIED')
+        response = self.client.get(f'/api/rooms/{self.room.id}/quote/')
+        self.assertEqual((response.status_code, response.json()['error']), (400, 'Không tìm thấy lượt ở đang mở'))
+
+
+@override_settings(ACTIVITY_LOG_MODE='sync')
+class DailyRollupTest(TestCase):
+    def setUp(self):
+        self.branch = Branch.objects.create(name="CN Test")
+        room_class = RoomClass.objects.create(branch=self.branch, code="STD", name="Standard", base_price_daily=400000)
+        self.room = Room.objects.create(branch=self.branch, room_class=room_class, name="101")
+        self.product = Product.objects.create(branch=self.branch, name="Nước suối", selling_price=10000, stock_quantity=10)
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_user(username="letan", password="x"))
+
+    def test_rollup_matches_raw_tables_and_feeds_reports(self):
+        self.client.post(f'/api/rooms/{self.room.id}/check_in/', {'full_name': "Khách A"}, format='json')
+        self.client.post(f'/api/rooms/{self.room.id}/add_service/', {'product_id': self.product.id, 'quantity': 2}, format='json')
+        self.client.post(f'/api/rooms/{self.room.id}/check_out/')
+        self.client.post(f'/api/products/{self.product.id}/import_goods/', {'quantity': 5, 'total_cost': 30000}, format='json')
+        response = self.client.post('/api/cash-flows/', {'branch': self.branch.id, 'flow_type': 'PAYMENT', 'category': 'Điện', 'amount': 70000})
+        self.client.patch(f"/api/cash-flows/{response.json()['id']}/", {'amount': 50000})
+
+        self.assertEqual(rollups.verify(), [])
+        revenue = self.client.get('/api/reports/revenue/', {'filter': 'today'}).json()['summary']
+        self.assertEqual((revenue['total'], revenue['service_revenue']), (420000, 20000))
+        finance = self.client.get('/api/reports/finance/', {'filter': 'today'}).json()['summary']
+        self.assertEqual((finance['receipt'], finance['payment']), (420000, 80000))
+
+    def test_generic_booking_edits_keep_rollup_in_sync(self):
+        self.client.post(f'/api/rooms/{self.room.id}/check_in/', {'full_name': "Khách A"}, format='json')
+        self.client.post(f'/api/rooms/{self.room.id}/add_service/', {'product_id': self.product.id, 'quantity': 2}, format='json')
+        self.client.post(f'/api/rooms/{self.room.id}/check_out/')
+        booking = Booking.objects.get()
+
+        self.client.patch(f'/api/bookings/{booking.id}/', {'total_amount': 500000}, format='json')
+        self.assertEqual(rollups.verify(), [])
+        self.client.patch(f'/api/bookings/{booking.id}/', {'status': 'CANCELLED'}, format='json')
+        self.assertEqual(rollups.verify(), [])
+        self.client.patch(f'/api/bookings/{booking.id}/', {'status': 'COMPLETED'}, format='json')
+        self.assertEqual(self.client.delete(f'/api/bookings/{booking.id}/').status_code, 204)
+        self.assertEqual(rollups.verify(), [])
+
+    def test_report_cache_hits_and_is_invalidated_by_checkout(self):
+        def revenue():
+            response = self.client.get('/api/reports/revenue/', {'filter': 'today', 'branch': self.branch.id})
+            return response['X-Report-Cache'], response.json()['summary']['total']
+
+        self.assertEqual(revenue(), ('MISS', 0))
+        self.assertEqual(revenue(), ('HIT', 0))
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(f'/api/rooms/{self.room.id}/check_in/', {'full_name': "Khách A"}, format='json')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(f'/api/rooms/{self.room.id}/check_out/')
+        self.assertEqual(revenue(), ('MISS', 400000))
+        self.assertEqual(self.client.get('/api/reports/cache_stats/').json()['hits'], 1)
+
+
+class ExportStreamTest(TestCase):
+    def setUp(self):
+        self.branches = [Branch.objects.create(name=f"CN {i}") for i in range(2)]
+        customer = Customer.objects.create(full_name="Nguyễn Văn A")
+        for i, (branch, day) in enumerate([(self.branches[0], 1), (self.branches[0], 5), (self.branches[1], 5)]):
+            booking = Booking.objects.create(branch=branch, customer=customer, code=f"DP-{i}", status='COMPLETED', total_amount=100000 * (i + 1))
+            Booking.objects.filter(pk=booking.pk).update(created_at=timezone.make_aware(datetime(2024, 3, day, 10)))
+            CashFlow.objects.create(branch=branch, booking=booking, flow_type='RECEIPT', category="Tiền phòng", amount=booking.total_amount)
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_user(username="ketoan", password="x"))
+
+    def content(self, response):
+        self.assertEqual(response.status_code, 200)
+        return b''.join(response.streaming_content).decode('utf-8')
+
+    def test_csv_has_header_and_filtered_rows(self):
+        response = self.client.get('/api/exports/bookings/', {'branch': self.branches[0].id, 'date_from': '2024-03-05', 'date_to': '2024-03-05'})
+        self.assertTrue(response.streaming)
+        self.assertIn('attachment; filename="bookings_', response['Content-Disposition'])
+        rows = list(csv.reader(io.StringIO(self.content(response).lstrip('\ufeff'))))
+        self.assertEqual(rows[0][:5], ['id', 'code', 'branch_id', 'customer__full_name', 'status'])
+        self.assertEqual([(r[1], r[3], r[5]) for r in rows[1:]], [("DP-1", "Nguyễn Văn A", "200000")])
+
+    def test_jsonl_has_one_object_per_line(self):
+        response = self.client.get('/api/exports/cash_flows/', {'output': 'jsonl', 'branch': self.branches[1].id})
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson; charset=utf-8')
+        lines = [json.loads(line) for line in self.content(response).splitlines()]
+        self.assertEqual([(r['booking__code'], r['amount']) for r in lines], [("DP-2", "300000")])
+
+    def test_reads_from_the_replica_alias(self):
+        aliases = []
+        with mock.patch.object(replica, 'read_alias', return_value='replica') as read_alias, \
+                mock.patch('hotel.views.stream_export', side_effect=lambda qs, *args, **kwargs: aliases.append(qs.db) or HttpResponse()):
+            self.client.get('/api/exports/activity_logs/')
+        self.assertEqual(aliases, ['replica'])
+        self.assertEqual(read_alias.call_args.args[0].username, "ketoan")
+
+
+class RoomEventsBrokerTest(SimpleTestCase):
+    async def test_in_process_broker_filters_by_branch(self):
+        broker = events.InProcessBroker()
+        branch_sub, all_sub = broker.subscribe(1), broker.subscribe()
+        await asyncio.to_thread(broker.publish, 2, {'room_id': 5, 'status': 'OCCUPIED'})
+
+        self.assertEqual((await all_sub.get(1))['room_id'], 5)
+        with self.assertRaises(asyncio.TimeoutError):
+            await branch_sub.get(0.05)
+        branch_sub.close()
+        all_sub.close()
+        self.assertFalse(broker.subscriptions)
+
+
+class RoomEventsStreamTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="letan", password="x")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_stream_is_disabled_under_wsgi(self):
+        self.assertEqual(self.client.post('/api/events/ticket/').json(), {'enabled': False})
+        self.assertEqual(self.client.get('/api/events/rooms/').status_code, 503)
+
+    @override_settings(ROOM_EVENTS_ENABLED=True)
+    def test_stream_requires_a_fresh_ticket_not_a_jwt(self):
+        ticket = self.client.post('/api/events/ticket/').json()['ticket']
+        jwt = str(AccessToken.for_user(self.user))
+        self.assertEqual(self.client.get('/api/events/rooms/', {'token': jwt}).status_code, 401)
+        with override_settings(ROOM_EVENTS_TICKET_SECONDS=-1):
+            self.assertEqual(self.client.get('/api/events/rooms/', {'ticket': ticket}).status_code, 401)
+
+        async def first_chunk():
+            response = await AsyncClient().get('/api/events/rooms/', {'ticket': ticket})
+            chunk = await anext(aiter(response.streaming_content))
+            await response.streaming_content.aclose()
+            return response, chunk
+        response, chunk = async_to_sync(first_chunk)()
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        self.assertEqual(chunk, b'retry: 3000\n\n')
+
+
+class CsvImportTest(TestCase):
+    def setUp(self):
+        self.branch = Branch.objects.create(name="CN Test")
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_user(username="quanly", password="x"))
+
+    def upload(self, url, content, **params):
+        upload = SimpleUploadedFile("data.csv", content.encode('utf-8'), content_type='text/csv')
+        query = '&'.join(f'{k}={v}' for k, v in params.items())
+        return self.client.post(f'{url}?{query}', {'file': upload}, format='multipart').json()
+
+    def test_customer_import_reports_errors_per_row(self):
+        Customer.objects.create(full_name="Cũ", identity_card="001")
+        content = "full_name,birth_date,identity_card\nNguyễn Văn A,1990-01-01,002\nTrần B,sai-ngay,003\nLê C,,001\n,,004\n"
+        report = self.upload('/api/customers/import_csv/', content)
+
+        self.assertEqual((report['total_rows'], report['created'], report['error_count']), (4, 1, 3))
+        self.assertEqual([e['row'] for e in sorted(report['errors'], key=lambda e: e['row'])], [3, 4, 5])
+        self.assertTrue(Customer.objects.filter(identity_card="002", full_name="Nguyễn Văn A").exists())
+
+    def test_product_import_checks_foreign_keys_and_dry_run(self):
+        content = f"branch,name,selling_price\n{self.branch.id},Nước suối,10000\n999,Bia,20000\n"
+        report = self.upload('/api/products/import_csv/', content, dry_run=1)
+        self.assertEqual((report['valid'], report['created'], report['error_count']), (1, 0, 1))
+        self.assertFalse(Product.objects.exists())
+
+        report = self.upload('/api/products/import_csv/', content)
+        self.assertEqual(report['created'], 1)
+        self.assertEqual(Product.objects.get().selling_price, 10000)
+
+
+class StockLedgerTest(TestCase):
+    def setUp(self):
+        branch = Branch.objects.create(name="CN Test")
+        room_class = RoomClass.objects.create(branch=branch, code="STD", name="Standard")
+        self.room = Room.objects.create(branch=branch, room_class=room_class, name="101")
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_user(username="letan", password="x"))
+        self.product = self.client.post('/api/products/', {'branch': branch.id, 'name': "Bia", 'selling_price': 20000, 'stock_quantity': 3}).json()
+
+    def test_sales_are_ledgered_and_cannot_go_negative(self):
+        self.client.post(f'/api/rooms/{self.room.id}/check_in/', {'full_name': "Khách A"}, format='json')
+        add = lambda qty: self.client.post(f'/api/rooms/{self.room.id}/add_service/', {'product_id': self.product['id'], 'quantity': qty}, format='json')
+
+        self.assertEqual(add(2).status_code, 200)
+        self.assertEqual(add(2).status_code, 400)
+        self.client.post(f"/api/products/{self.product['id']}/import_goods/", {'quantity': 5}, format='json')
+        self.client.patch(f"/api/products/{self.product['id']}/", {'stock_quantity': 4, 'name': "Bia lon"})
+
+        product = Product.objects.get()
+        self.assertEqual((product.stock_quantity, product.name), (4, "Bia lon"))
+        self.assertEqual(list(product.stock_movements.order_by('id').values_list('movement_type', 'quantity')),
+                         [('ADJUSTMENT', 3), ('SALE', -2), ('IMPORT', 5), ('ADJUSTMENT', -2)])
+        self.assertEqual(stock.verify(), [])
+        stock.take_snapshots()
+        self.assertEqual(stock.ledger_quantities(), {product.id: 4})
+
+
+class RoomAvailabilityTest(TestCase):
+    def setUp(self):
+        self.branch = Branch.objects.create(name="CN Test")
+        room_class = RoomClass.objects.create(branch=self.branch, code="STD", name="Standard")
+        self.rooms = [Room.objects.create(branch=self.branch, room_class=room_class, name=f"10{i}") for i in range(3)]
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_user(username="letan", password="x"))
+
+    def reserve(self, room, check_in, check_out):
+        return self.client.post('/api/bookings/reserve/', {
+            'customer': {'full_name': "Khách đặt"}, 'room_id': room.id,
+            'check_in_expected': f"{check_in}T14:00:00+00:00", 'check_out_expected': f"{check_out}T12:00:00+00:00",
+        }, format='json')
+
+    def test_overlapping_reservation_is_rejected(self):
+        self.assertEqual(self.reserve(self.rooms[0], '2030-01-10', '2030-01-13').status_code, 200)
+        self.assertEqual(self.reserve(self.rooms[0], '2030-01-12', '2030-01-14').status_code, 400)
+        self.assertEqual(self.reserve(self.rooms[0], '2030-01-13', '2030-01-14').status_code, 200)
+        self.assertEqual(Booking.objects.count(), 2)
+
+        free = self.client.get('/api/rooms/availability/', {'branch': self.branch.id, 'start': '2030-01-11', 'end': '2030-01-12'}).json()
+        self.assertEqual([r['name'] for r in free], ["101", "102"])
+
+    def test_multi_night_walk_in_blocks_overlapping_reservation(self):
+        today = timezone.localdate()
+        check_out = timezone.now() + timedelta(days=3)
+        response = self.client.post(f'/api/rooms/{self.rooms[0].id}/check_in/', {
+            'full_name': "Khách vãng lai", 'booking_type': 'DAILY', 'check_out_expected': check_out.isoformat(),
+        }, format='json')
+        self.assertEqual(response.status_code, 200)
+
+        night2 = today + timedelta(days=1)
+        self.assertEqual(self.reserve(self.rooms[0], night2, night2 + timedelta(days=1)).status_code, 400)
+        self.assertEqual(self.reserve(self.rooms[0], today + timedelta(days=3), today + timedelta(days=4)).status_code, 200)
+        free = self.client.get('/api/rooms/availability/', {'branch': self.branch.id, 'start': night2, 'end': night2 + timedelta(days=1)}).json()
+        self.assertNotIn("100", [r['name'] for r in free])
+
+    def test_overstaying_guest_keeps_the_room_each_night(self):
+        self.client.post(f'/api/rooms/{self.rooms[1].id}/check_in/', {'full_name': "Khách ở tiếp", 'booking_type': 'DAILY'}, format='json')
+        tomorrow = timezone.localdate() + timedelta(days=1)
+        self.assertEqual(availability.extend_open_stays(today=tomorrow), 1)
+        self.assertEqual(self.reserve(self.rooms[1], tomorrow, tomorrow + timedelta(days=1)).status_code, 400)
+
+    def reserve_hourly(self, room, day, start='14:00', end='16:00'):
+        return self.client.post('/api/bookings/reserve/', {
+            'customer': {'full_name': "Khách giờ"}, 'room_id': room.id, 'booking_type': 'HOURLY',
+            'check_in_expected': f"{day}T{start}:00+00:00", 'check_out_expected': f"{day}T{end}:00+00:00",
+        }, format='json')
+
+    def test_confirm_checkin_moves_nights_to_actual_dates(self):
+        today = timezone.localdate()
+        self.assertEqual(self.reserve(self.rooms[2], today - timedelta(days=1), today + timedelta(days=1)).status_code, 200)
+        booking = Booking.objects.get(booking_rooms__room=self.rooms[2])
+        self.client.post(f'/api/bookings/{booking.id}/confirm_checkin/', {}, format='json')
+        self.assertEqual(list(RoomNight.objects.filter(room=self.rooms[2]).values_list('date', flat=True)), [today])
+
+    def test_hourly_stay_holds_its_date(self):
+        self.assertEqual(self.reserve_hourly(self.rooms[0], '2030-03-01').status_code, 200)
+        self.assertEqual(list(RoomNight.objects.filter(room=self.rooms[0]).values_list('date', flat=True)), [date(2030, 3, 1)])
+        # Đơn theo giờ khác hoặc đơn theo ngày trùng ngày đó đều bị từ chối
+        self.assertEqual(self.reserve_hourly(self.rooms[0], '2030-03-01', '17:00', '19:00').status_code, 400)
+        self.assertEqual(self.reserve(self.rooms[0], '2030-02-28', '2030-03-02').status_code, 400)
+        self.assertEqual(self.reserve_hourly(self.rooms[0], '2030-03-02').status_code, 200)
+
+        # Khách theo giờ đang ở cũng chặn đơn đặt trước hôm nay, trả phòng xong thì nhả ra
+        today = timezone.localdate()
+        self.client.post(f'/api/rooms/{self.rooms[1].id}/check_in/', {'full_name': "Khách vãng lai", 'booking_type': 'HOURLY'}, format='json')
+        self.assertEqual(self.reserve_hourly(self.rooms[1], today, '20:00', '22:00').status_code, 400)
+        self.client.post(f'/api/rooms/{self.rooms[1].id}/check_out/')
+        self.assertEqual(self.reserve_hourly(self.rooms[1], today, '20:00', '22:00').status_code, 200)
+
+    def test_cancel_releases_nights(self):
+        booking_id = self.reserve(self.rooms[1], '2030-02-01', '2030-02-02').json()['booking_id']
+        self.client.post(f'/api/bookings/{booking_id}/cancel/')
+        self.assertEqual(self.reserve(self.rooms[1], '2030-02-01', '2030-02-02').status_code, 200)
+
+
+class BookingCodeTest(TestCase):
+    def setUp(self):
+        self.branch = Branch.objects.create(name="CN Test")
+
+    def test_codes_are_unique_and_sortable_within_branch(self):
+        generator = codes.CodeGenerator(block_size=3)
+        values = [generator.next_code(self.branch.id, 'DP') for _ in range(8)]
+        self.assertEqual(len(set(values)), 8)
+        self.assertEqual(values, sorted(values))
+        self.assertTrue(values[0].endswith(f"-{self.branch.id:02d}-0000001"))
+
+    def test_blocks_do_not_overlap_between_processes(self):
+        # Hai generator = hai worker process dùng chung DB
+        first, second = codes.CodeGenerator(block_size=5), codes.CodeGenerator(block_size=5)
+        values = [g.next_value(self.branch.id, 'RES') for _ in range(6) for g in (first, second)]
+        self.assertEqual(len(set(values)), 12)
+
+
+class BookingCodeRefillTest(TransactionTestCase):
+    def test_block_refill_commits_outside_the_request_transaction(self):
+        branch = Branch.objects.create(name="CN Test")
+        generator = codes.CodeGenerator(block_size=5)
+        # Giả lập DB nhiều người ghi (PostgreSQL): khối được xin và commit trên kết nối riêng
+        with mock.patch.object(codes, 'SINGLE_WRITER_VENDORS', ()):
+            with transaction.atomic():
+                self.assertEqual(generator.next_value(branch.id, 'DP'), 1)
+                self.assertIn((branch.id, 'DP'), generator.blocks)  # Dùng chung ngay, không chờ request commit
+                transaction.set_rollback(True)
+        self.assertEqual(CodeSequence.objects.get(branch=branch, prefix='DP').next_value, 6)
+        self.assertEqual(generator.next_value(branch.id, 'DP'), 2)
+
+    def test_branch_created_in_the_same_transaction_falls_back_to_it(self):
+        generator = codes.CodeGenerator(block_size=5)
+        # Kết nối riêng không thấy chi nhánh chưa commit: FK lỗi (IntegrityError) hoặc không đọc lại được bộ đếm
+        for i, error in enumerate((IntegrityError, CodeSequence.DoesNotExist)):
+            with self.subTest(error=error.__name__), mock.patch.object(codes, 'SINGLE_WRITER_VENDORS', ()), \
+                    mock.patch.object(generator, 'reserve_on_own_connection', side_effect=error):
+                with transaction.atomic():
+                    branch = Branch.objects.create(name=f"CN mới {i}")
+                    self.assertEqual(generator.next_value(branch.id, 'DP'), 1)
+                    self.assertNotIn((branch.id, 'DP'), generator.blocks)  # Chỉ dùng chung sau khi commit
+                self.assertEqual(CodeSequence.objects.get(branch=branch, prefix='DP').next_value, 6)
+                self.assertEqual(generator.next_value(branch.id, 'DP'), 2)
+
+
+class ActivityLogWriterTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="letan", password="x")
+
+    def test_buffered_logs_are_written_after_commit(self):
+        buffer = activity.ActivityLogBuffer(size=100, background=False)
+        with mock.patch.object(activity, 'buffer', buffer):
+            with self.captureOnCommitCallbacks(execute=True):
+                activity.log_activity(self.user, "NHẬP FILE", "Nhập 3 dòng")
+            self.assertFalse(ActivityLog.objects.exists())
+            self.assertEqual(buffer.flush(), 1)
+
+        log = ActivityLog.objects.get()
+        self.assertEqual((log.user, log.action), (self.user, "NHẬP FILE"))
+
+    def test_late_flushed_log_is_not_skipped_by_cursor_pages(self):
+        # Chế độ mặc định (buffered): thao tác nghiệp vụ ghi ngay, log ghi trễ lên đầu danh sách chứ không lọt ra sau cursor
+        client = APIClient()
+        client.force_authenticate(self.user)
+        branch = Branch.objects.create(name="CN Test")
+        room = Room.objects.create(branch=branch, room_class=RoomClass.objects.create(branch=branch, code="STD", name="Standard"), name="101")
+        ActivityLog.objects.create(user=self.user, action="CŨ", content="Hôm qua", created_at=timezone.now() - timedelta(days=1))
+        buffer = activity.ActivityLogBuffer(size=100, background=False)
+        with mock.patch.object(activity, 'buffer', buffer):
+            with self.captureOnCommitCallbacks(execute=True):
+                activity.log_activity(self.user, "NHẬP FILE", "Nhập 3 dòng")
+            client.post(f'/api/rooms/{room.id}/check_in/', {'full_name': "Khách", 'booking_type': 'HOURLY'}, format='json')
+            self.assertEqual(ActivityLog.objects.filter(action="CHECK_IN").count(), 1)
+
+            # Client đã đọc hết các trang trước khi log kịp ghi
+            first = client.get('/api/activity-logs/', {'page_size': 1}).json()
+            self.assertEqual([r['action'] for r in first['results']], ["CHECK_IN"])
+            self.assertEqual([r['action'] for r in client.get(first['next']).json()['results']], ["CŨ"])
+            buffer.flush()
+
+        newest = client.get('/api/activity-logs/', {'page_size': 1}).json()
+        self.assertEqual([r['action'] for r in newest['results']], ["NHẬP FILE"])
+
+    def test_durable_logs_are_written_in_the_transaction(self):
+        activity.log_activity(self.user, "CHECK_OUT", "Trả phòng 101", durable=True)
+        self.assertEqual(ActivityLog.objects.count(), 1)
+
+
+class ActivityLogArchiveTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="letan", password="x")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_old_logs_move_to_archive_and_stay_searchable(self):
+        now = timezone.now()
+        for days in (200, 120, 10):
+            ActivityLog.objects.create(user=self.user, action="CHECK_IN", content=f"{days} ngày trước", created_at=now - timedelta(days=days))
+
+        self.assertEqual(archive.archive_activity_logs(older_than_days=90, batch_size=1), 2)
+        self.assertEqual(list(ActivityLog.objects.values_list('content', flat=True)), ["10 ngày trước"])
+
+        date_from = (now - timedelta(days=150)).date().isoformat()
+        data = self.client.get('/api/activity-logs/archive/', {'user': self.user.id, 'action': "CHECK_IN", 'date_from': date_from}).json()
+        self.assertEqual([r['content'] for r in data['results']], ["120 ngày trước"])
+
+
+class PricingConfigCacheTest(TestCase):
+    def setUp(self):
+        self.branch = Branch.objects.create(name="CN Test")
+        self.room_class = RoomClass.objects.create(branch=self.branch, code="STD", name="Standard", base_price_daily=400000)
+        BranchSetting.objects.create(branch=self.branch)
+        self.room = Room.objects.create(branch=self.branch, room_class=self.room_class, name="101")
+        config_cache.cache.clear()
+
+    def test_cached_until_a_pricing_row_changes(self):
+        config_cache.pricing_config(self.room)
+        with self.assertNumQueries(0):
+            settings, room_class = config_cache.pricing_config(self.room)
+        self.assertEqual((settings.branch_id, room_class.base_price_daily), (self.branch.id, 400000))
+
+        self.room_class.base_price_daily = 450000
+        self.room_class.save()
+        self.assertEqual(config_cache.room_class(self.room_class.id).base_price_daily, 450000)
+
+    def test_other_worker_sees_new_version(self):
+        config_cache.pricing_config(self.room)
+        RoomClass.objects.filter(pk=self.room_class.pk).update(base_price_daily=500000)
+        ConfigVersion.objects.filter(name=config_cache.VERSION_NAME).update(version=time.time_ns())
+        self.assertEqual(config_cache.room_class(self.room_class.id).base_price_daily, 400000)
+        config_cache.cache.checked_at -= config_cache.CHECK_SECONDS  # Hết khoảng chờ: hỏi lại phiên bản
+        self.assertEqual(config_cache.room_class(self.room_class.id).base_price_daily, 500000)
+
+    def test_confirm_checkin_has_no_per_room_lookups(self):
+        client = APIClient()
+        client.force_authenticate(User.objects.create_user(username="letan", password="x"))
+        rollups.record_room_checkin(self.branch.id, timezone.now())
+        config_cache.pricing_config(self.room)
+
+        def reserved(size):
+            booking = Booking.objects.create(branch=self.branch, customer=Customer.objects.create(full_name="Khách"), code=f"DP-{size}", status='RESERVED')
+            for i in range(size):
+                room = Room.objects.create(branch=self.branch, room_class=self.room_class, name=f"{size}0{i}")
+                BookingRoom.objects.create(booking=booking, room=room, booking_type='DAILY')
+            return f'/api/bookings/{booking.id}/confirm_checkin/'
+
+        # Mỗi phòng: lưu BookingRoom, giữ lại đêm (7 câu), cập nhật phòng, cộng rollup; không đọc phòng / hạng phòng / phiên bản giá
+        per_room = 10
+        single, triple = reserved(1), reserved(3)
+        with self.assertNumQueries(7 + per_room):
+            client.post(single, {'booking_type': 'OVERNIGHT'}, format='json')
+        with self.assertNumQueries(7 + 3 * per_room):
+            client.post(triple, {'booking_type': 'OVERNIGHT'}, format='json')
+        self.assertEqual(Room.objects.filter(status='OCCUPIED').count(), 4)
+
+
+class QueryBudgetMixin:
+    """assertQueryBudget: endpoint không vượt số query cho phép và không có câu SQL nào lặp kiểu N+1."""
+    def assertQueryBudget(self, url, budget, method='get', **kwargs):
+        with query_stats.record_queries() as rec:
+            response = getattr(self.client, method)(url, **kwargs)
+        self.assertLess(response.status_code, 400, url)
+        self.assertLessEqual(rec.count, budget, f"{url}: {rec.count} query > {budget}\n" + '\n'.join(fp for fp, _ in rec.duplicates))
+        self.assertEqual(rec.n_plus_one, [], url)
+        return response
+
+
+@override_settings(ACTIVITY_LOG_MODE='sync')
+class HotEndpointQueryBudgetTest(QueryBudgetMixin, TestCase):
+    # Số query tối đa của các API nóng (xem hotel/urls.py), không phụ thuộc số dòng dữ liệu
+    BUDGETS = {
+        '/api/rooms/': 2,
+        '/api/rooms/bills/': 3,
+        '/api/bookings/': 1,
+        '/api/bookings/?page_size=20': 1,
+        '/api/customers/': 2,
+        '/api/products/': 1,
+        '/api/cash-flows/': 1,
+        '/api/activity-logs/?page_size=20': 1,
+        '/api/reports/revenue/': 2,
+    }
+
+    def setUp(self):
+        self.branch = Branch.objects.create(name="CN Test")
+        room_class = RoomClass.objects.create(branch=self.branch, code="STD", name="Standard", base_price_hourly=100000)
+        product = Product.objects.create(branch=self.branch, name="Nước suối", selling_price=10000, stock_quantity=100)
+        self.user = User.objects.create_user(username="letan", password="x")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        cache.clear()
+        for i in range(8):
+            room = Room.objects.create(branch=self.branch, room_class=room_class, name=f"P{i}")
+            self.client.post(f'/api/rooms/{room.id}/check_in/', {'full_name': f"Khách {i}", 'booking_type': 'HOURLY'}, format='json')
+            self.client.post(f'/api/rooms/{room.id}/add_service/', {'product_id': product.id, 'quantity': 1}, format='json')
+            if i % 2:
+                self.client.post(f'/api/rooms/{room.id}/check_out/')
+
+    def test_hot_endpoints_stay_within_query_budget(self):
+        for url, budget in self.BUDGETS.items():
+            with self.subTest(url=url):
+                self.assertQueryBudget(url, budget)
+
+    def test_invalid_filter_params_return_400(self):
+        for url in ('/api/bookings/?branch=abc', '/api/cash-flows/?flow_type=XYZ', '/api/activity-logs/?user=1.5',
+                    '/api/bookings/?date_from=2024-02-31', '/api/exports/bookings/?branch=abc',
+                    '/api/rooms/?branch=abc', '/api/rooms/bills/?branch=abc', '/api/reports/revenue/?branch=abc'):
+            with self.subTest(url=url):
+                self.assertEqual(self.client.get(url).status_code, 400)
+        self.assertEqual(len(self.client.get(f'/api/bookings/?branch={self.branch.id}').json()), 8)
+
+    def test_booking_list_columns_match_detail(self):
+        rows = self.client.get('/api/bookings/').json()
+        self.assertNotIn('service_orders', rows[0])
+        for row in rows:
+            detail = self.client.get(f"/api/bookings/{row['id']}/").json()
+            self.assertEqual(row['customer_name'], detail['customer_name'])
+            self.assertEqual(row['room_name'], detail['room_name'])
+            self.assertEqual(row['room_count'], len(detail['booking_details']))
+            self.assertEqual(Decimal(row['service_total']), sum(Decimal(s['total_price']) for s in detail['service_orders']))
+
+    @override_settings(SQL_INSTRUMENTATION=True)
+    def test_middleware_reports_query_stats_in_headers(self):
+        response = self.client.get('/api/bookings/')
+        self.assertGreater(int(response['X-DB-Queries']), 0)
+        self.assertIn('X-DB-Time-Ms', response)
+        self.assertEqual(response['X-DB-Duplicate-Queries'], '0')
+
+    def test_n_plus_one_is_detected(self):
+        with query_stats.record_queries() as rec:
+            for booking in Booking.objects.all():
+                booking.booking_rooms.first()
+        self.assertEqual(len(rec.n_plus_one), 1)
+        self.assertEqual(rec.n_plus_one[0][1], 8)
+
+
+class HotTableIndexTest(TestCase):
+    def test_explain_shows_index_used_only_when_present(self):
+        branch = Branch.objects.create(name="CN Test")
+        room_class = RoomClass.objects.create(branch=branch, code="STD", name="Standard")
+        room = Room.objects.create(branch=branch, room_class=room_class, name="101")
+        index = explain_queries.find_index(BookingRoom, ['room', 'check_out_actual'])
+        query = BookingRoom.objects.filter(room=room, check_out_actual__isnull=True)
+        self.assertIn(f"USING INDEX {index.name}", explain_queries.explain(query, 'có index'))
+        with explain_queries.without_index(BookingRoom, index):
+            self.assertNotIn(index.name, explain_queries.explain(query, 'không index'))
+
+        output = StringIO()
+        call_command('explain_queries', runs=1, stdout=output)
+        self.assertIn(f"[Không index {index.name}]", output.getvalue())
+
+
+class SeedDataTest(TestCase):
+    def test_seeded_data_is_consistent(self):
+        rng = random.Random(1)
+        created = seed.seed_structure(branches=2, rooms_per_branch=10, customers=20, rng=rng)
+        totals = seed.seed_bookings(300, days=30, rng=rng, batch_size=100)
+        occupied = seed.seed_occupancy(0.5, rng=rng)
+
+        self.assertEqual((created['rooms'], totals['bookings']), (20, 300))
+        self.assertEqual(Booking.objects.filter(status='COMPLETED').count(), 300)
+        self.assertEqual(Room.objects.filter(status='OCCUPIED').count(), occupied)
+        self.assertEqual(rollups.verify(), [])
+        self.assertEqual(stock.verify(), [])
+
+    def test_percentiles_use_nearest_rank(self):
+        stats = bench.summarize(range(1, 101))
+        self.assertEqual((stats['p50_ms'], stats['p95_ms'], stats['p99_ms'], stats['max_ms']), (50, 95, 99, 100))
+
+
+class FrontDeskLoadSimulatorTest(TestCase):
+    def test_outcomes_are_classified(self):
+        self.assertEqual(loadsim.classify(201, ''), 'ok')
+        self.assertEqual(loadsim.classify(400, 'Phòng đã có khách/đặt trước các đêm: 18/10'), 'rejected')
+        self.assertEqual(loadsim.classify(400, 'database is locked'), 'lock_timeout')
+        self.assertEqual(loadsim.classify(exc=OperationalError('deadlock detected')), 'lock_timeout')
+        self.assertEqual(loadsim.classify(exc=IntegrityError('UNIQUE constraint failed: hotel_booking.code')), 'integrity')
+        self.assertEqual(loadsim.classify(500, ''), 'error')
+
+    def test_invariants_detect_double_check_in(self):
+        branch = Branch.objects.create(name="CN Test")
+        room_class = RoomClass.objects.create(branch=branch, code="STD", name="Standard")
+        room = Room.objects.create(branch=branch, room_class=room_class, name="101", status='OCCUPIED')
+        customer = Customer.objects.create(full_name="Khách")
+        for code in ("A", "B"):
+            booking = Booking.objects.create(branch=branch, customer=customer, code=code)
+            BookingRoom.objects.create(booking=booking, room=room, check_in_actual=timezone.now())
+
+        self.assertEqual(loadsim.check_invariants()['rooms_with_multiple_open_stays'], 1)
+
+
+class ReplicaRouterTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="ketoan", password="x")
+        self.router = db_router.ReplicaRouter()
+        cache.clear()
+
+    def test_reads_go_to_replica_only_inside_replica_views(self):
+        with mock.patch.object(replica, 'enabled', return_value=True), mock.patch.object(replica, 'lag', return_value=0.5):
+            self.assertIsNone(self.router.db_for_read(Booking))
+            with replica.reading(replica.read_alias(self.user)):
+                self.assertEqual(self.router.db_for_read(Booking), 'replica')
+                self.assertEqual(self.router.db_for_write(Booking), 'default')
+
+    def test_lagging_replica_and_recent_writes_fall_back_to_primary(self):
+        with mock.patch.object(replica, 'enabled', return_value=True):
+            with mock.patch.object(replica, 'lag', return_value=replica.MAX_LAG_SECONDS + 1):
+                self.assertEqual(replica.read_alias(self.user), 'default')
+            with mock.patch.object(replica, 'lag', return_value=0):
+                replica.mark_write(self.user)
+                self.assertEqual(replica.read_alias(self.user), 'default')
+                self.assertEqual(replica.read_alias(User.objects.create_user(username="khac", password="x")), 'replica')
+
+    def test_without_replica_everything_reads_primary(self):
+        self.assertEqual(replica.read_alias(self.user), 'default')
+        client = APIClient()
+        client.force_authenticate(self.user)
+        self.assertEqual(client.get('/api/reports/revenue/').status_code, 200)
+
+
+class SQLiteWriteQueueTest(SimpleTestCase):
+    def test_writes_are_serialized_and_waits_are_measured(self):
+        queue = sqlite_writer.WriteQueue()
+        holding, release = threading.Event(), threading.Event()
+
+        def writer():
+            with queue.slot():
+                holding.set()
+                release.wait(5)
+
+        thread = threading.Thread(target=writer)
+        thread.start()
+        holding.wait(5)
+        waiter = threading.Thread(target=self.take_slot, args=(queue,))
+        waiter.start()
+        while queue.stats()['queue_depth'] != 1:
+            time.sleep(0.001)
+        time.sleep(0.02)
+        release.set()
+        thread.join()
+        waiter.join()
+
+        stats = queue.stats()
+        self.assertEqual((stats['queue_depth'], stats['max_queue_depth'], stats['writes']), (0, 1, 2))
+        self.assertGreaterEqual(stats['max_wait_ms'], 20)
+
+    def take_slot(self, queue):
+        with queue.slot():
+            pass
+
+    def test_write_slot_is_a_no_op_outside_sqlite_production_mode(self):
+        with self.settings(SQLITE_PRODUCTION_MODE=False), sqlite_writer.write_slot() as wait:
+            self.assertEqual(wait, 0.0)
+        self.assertEqual(sqlite_writer.stats()['writes'], 0)
+
+
+@override_settings(ACTIVITY_LOG_MODE='sync')
+class SparseFieldsetTest(QueryBudgetMixin, TestCase):
+    def setUp(self):
+        branch = Branch.objects.create(name="CN Test")
+        room_class = RoomClass.objects.create(branch=branch, code="STD", name="Standard", base_price_hourly=100000)
+        product = Product.objects.create(branch=branch, name="Nước suối", selling_price=10000, stock_quantity=100)
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_user(username="letan", password="x"))
+        for i in range(3):
+            room = Room.objects.create(branch=branch, room_class=room_class, name=f"P{i}")
+            self.client.post(f'/api/rooms/{room.id}/check_in/', {'full_name': f"Khách {i}", 'booking_type': 'HOURLY'}, format='json')
+            self.client.post(f'/api/rooms/{room.id}/add_service/', {'product_id': product.id, 'quantity': 1}, format='json')
+
+    def test_unrequested_fields_are_dropped_with_their_queries(self):
+        data = self.assertQueryBudget('/api/bookings/?fields=id,code,status', 1).json()
+        self.assertEqual(set(data[0]), {'id', 'code', 'status'})
+
+        data = self.assertQueryBudget('/api/rooms/?fields=id,name,status', 1).json()
+        self.assertEqual(set(data[0]), {'id', 'name', 'status'})
+
+        data = self.assertQueryBudget('/api/customers/?fields=id,full_name', 1).json()
+        self.assertEqual(set(data[0]), {'id', 'full_name'})
+
+    def test_fields_apply_to_the_top_level_only(self):
+        leader = Customer.objects.create(full_name="Trưởng đoàn", type='GROUP')
+        Customer.objects.create(full_name="Người đi cùng", identity_card="001", representative=leader)
+        data = self.client.get(f'/api/customers/{leader.id}/?fields=id,full_name,entourage').json()
+        self.assertEqual(set(data), {'id', 'full_name', 'entourage'})
+        self.assertEqual(data['entourage'][0]['identity_card'], "001")
+        self.assertEqual(data['entourage'][0]['representative_name'], "Trưởng đoàn")
+
+    def test_expand_selects_nested_data(self):
+        booking_id = Booking.objects.first().id
+        data = self.assertQueryBudget(f'/api/bookings/{booking_id}/?expand=service_orders', 5).json()
+        self.assertIn('service_orders', data)
+        self.assertNotIn('booking_details', data)
+        self.assertEqual(data['service_orders'][0]['product_name'], "Nước suối")
+        self.assertIn('booking_details', self.client.get(f'/api/bookings/{booking_id}/').json())
+
+
+@override_settings(ACTIVITY_LOG_MODE='sync')
+class FastRendererTest(TestCase):
+    def setUp(self):
+        branch = Branch.objects.create(name="CN Test")
+        room_class = RoomClass.objects.create(branch=branch, code="STD", name="Standard", base_price_hourly=100000)
+        self.user = User.objects.create_user(username="letan", password="x")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        for i in range(30):
+            room = Room.objects.create(branch=branch, room_class=room_class, name=f"P{i}")
+            self.client.post(f'/api/rooms/{room.id}/check_in/', {'full_name': f"Khách {i}", 'booking_type': 'HOURLY'}, format='json')
+
+    @skipUnless(renderers.orjson, "chưa cài orjson")
+    def test_accept_selects_renderer_with_integer_amounts(self):
+        default = self.client.get('/api/rooms/')
+        self.assertEqual(default['Content-Type'], 'application/json')
+        self.assertEqual(default.json()[0]['price_hourly'], '100000')
+
+        fast = self.client.get('/api/rooms/', HTTP_ACCEPT=renderers.ORJSONRenderer.media_type)
+        self.assertEqual(fast['Content-Type'], renderers.ORJSONRenderer.media_type)
+        rows = json.loads(fast.content)
+        self.assertEqual(rows[0]['price_hourly'], 100000)
+        self.assertEqual(rows[0]['name'], default.json()[0]['name'])
+
+    @skipUnless(renderers.msgpack, "chưa cài msgpack")
+    @skipUnless(renderers.orjson, "chưa cài orjson")
+    def test_msgpack_matches_orjson(self):
+        packed = self.client.get('/api/bookings/', HTTP_ACCEPT=renderers.MsgPackRenderer.media_type)
+        self.assertEqual(packed['Content-Type'], renderers.MsgPackRenderer.media_type)
+        fast = self.client.get('/api/bookings/', HTTP_ACCEPT=renderers.ORJSONRenderer.media_type)
+        self.assertEqual(renderers.msgpack.unpackb(packed.content), json.loads(fast.content))
+
+    def test_missing_orjson_falls_back_to_drf_json(self):
+        default = self.client.get('/api/rooms/').json()
+        with mock.patch.object(renderers, 'orjson', None):
+            self.assertNotIn(renderers.ORJSONRenderer, renderers.available_renderers())
+            response = self.client.get('/api/rooms/', HTTP_ACCEPT=renderers.ORJSONRenderer.media_type)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(json.loads(response.content), default)
+
+    @skipUnless(renderers.orjson, "chưa cài orjson")
+    def test_fractional_decimals_stay_exact(self):
+        content = renderers.ORJSONRenderer().render({'a': Decimal('150000'), 'b': Decimal('0.15'), 'c': None})
+        self.assertEqual(json.loads(content), {'a': 150000, 'b': '0.15', 'c': None})
+
+    def test_large_responses_are_gzipped(self):
+        response = self.client.get('/api/bookings/', HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(len(json.loads(gzip.decompress(response.content))), 30)
+
+        small = self.client.get('/api/bookings/?page_size=1', HTTP_ACCEPT_ENCODING='gzip')
+        self.assertFalse(small.has_header('Content-Encoding'))
+
+    @skipUnless(renderers.orjson, "chưa cài orjson")
+    def test_render_benchmark_reports_payload_sizes(self):
+        results = bench.RenderBenchmark(self.user, runs=2).run()
+        self.assertEqual(results['render.bookings.json']['size_vs_json'], 1)
+        self.assertLess(results['render.bookings.orjson']['bytes'], results['render.bookings.json']['bytes'])
+        self.assertLess(results['render.customers.orjson']['gzip_bytes'], results['render.customers.orjson']['bytes'])
@@ -5,8 +5,10 @@ from .views import (
     BookingViewSet, ProductViewSet, CustomerViewSet, UserViewSet, 
     CashFlowViewSet, ReportViewSet,
     DeviceViewSet, MaintenanceLogViewSet, ActivityLogViewSet, 
-    BranchSettingViewSet # <--- Import thêm BranchSettingViewSet
+    BranchSettingViewSet, # <--- Import thêm BranchSettingViewSet
+    ExportViewSet
 )
+from .events import room_events, stream_ticket
 
 router = DefaultRouter()
 router.register(r'branches', BranchViewSet)
@@ -30,6 +32,12 @@ router.register(r'activity-logs', ActivityLogViewSet)
 # --- API CHO CÀI ĐẶT CẤU HÌNH (MỚI) ---
 router.register(r'settings', BranchSettingViewSet)
 
+# --- API XUẤT DỮ LIỆU (CSV / JSONL) ---
+router.register(r'exports', ExportViewSet, basename='exports')
+
 urlpatterns = [
+    # Sự kiện trạng thái phòng (SSE, cần chạy ASGI)
+    path('events/ticket/', stream_ticket, name='room-events-ticket'),
+    path('events/rooms/', room_events, name='room-events'),
     path('', include(router.urls)),
 ]
\ No newline at end of file
@@ -1,23 +1,117 @@
-from rest_framework import viewsets, status
+from rest_framework import viewsets, status, exceptions
 from rest_framework.decorators import action
 from rest_framework.response import Response
+from rest_framework.parsers import MultiPartParser
+from django.core.exceptions import ValidationError
 from django.utils import timezone
 from django.db import transaction
-from django.db.models import Sum, Count, F
-from django.db.models.functions import TruncDate
+from django.db.models import Sum, Count, F, Prefetch, OuterRef, Subquery, Value, DecimalField
+from django.db.models.functions import Coalesce
+from django.utils.dateparse import parse_date
+import csv
 import math
-from datetime import timedelta, datetime
+from datetime import timedelta, datetime, time
 from .models import (
     Branch, Area, RoomClass, Room, Booking, Customer, BookingRoom, 
     Product, ServiceOrder, User, CashFlow,
-    Device, MaintenanceLog, ActivityLog, BranchSetting
+    Device, MaintenanceLog, ActivityLog, ActivityLogArchive, BranchSetting, DailyRollup
 )
 from .serializers import (
     BranchSerializer, AreaSerializer, RoomClassSerializer, RoomSerializer, 
-    BookingSerializer, ProductSerializer, ServiceOrderSerializer, 
+    BookingSerializer, BookingListSerializer, ProductSerializer, ServiceOrderSerializer, 
     CustomerSerializer, UserSerializer, CashFlowSerializer,
-    DeviceSerializer, MaintenanceLogSerializer, ActivityLogSerializer, BranchSettingSerializer
+    DeviceSerializer, MaintenanceLogSerializer, ActivityLogSerializer, ActivityLogArchiveSerializer, BranchSettingSerializer,
+    requested_fields
 )
+from .pagination import CreatedAtCursorPagination, AlwaysCreatedAtCursorPagination
+from . import pricing, rollups, report_cache, events
+from .exports import stream_export
+from .imports import CsvImporter
+from .stock import change_stock, record_initial_stock
+from . import availability, config_cache, replica, sqlite_writer
+from .codes import next_booking_code
+from .activity import log_activity
+
+ENTOURAGE_MAX_DEPTH = 5
+
+def day_start(d):
+    # Mốc 00:00 (theo múi giờ hiện tại) của một ngày
+    return timezone.make_aware(datetime.combine(d, time.min))
+
+def date_range_filter(field, start, end):
+    # Khoảng ngày [start, end] viết thành khoảng thời gian nửa mở [start 00:00, end+1 00:00)
+    # để DB dùng được index trên cột datetime (field__date__range phải ép kiểu từng dòng)
+    return {f'{field}__gte': day_start(start), f'{field}__lt': day_start(end + timedelta(days=1))}
+
+def _filter_value(model, field, value):
+    """Đổi giá trị query param sang kiểu của field (id khóa ngoại, choices...); sai thì trả 400 thay vì lỗi 500."""
+    model_field = model._meta.get_field(field)
+    target = model_field.target_field if model_field.is_relation else model_field
+    try:
+        value = target.to_python(value)
+    except ValidationError:
+        raise exceptions.ValidationError({field: f"Giá trị không hợp lệ: {value}"})
+    if model_field.choices and value not in dict(model_field.flatchoices):
+        raise exceptions.ValidationError({field: f"Giá trị không hợp lệ: {value}"})
+    return value
+
+def int_param(params, name):
+    """Tham số id dạng số (VD: ?branch=), không gửi thì None, sai kiểu thì 400."""
+    value = params.get(name)
+    if not value:
+        return None
+    try:
+        return int(value)
+    except ValueError:
+        raise exceptions.ValidationError({name: f"Giá trị không hợp lệ: {value}"})
+
+def _filter_date(params, name):
+    try:
+        return parse_date(params.get(name) or '')
+    except ValueError:
+        raise exceptions.ValidationError({name: "Ngày không hợp lệ (YYYY-MM-DD)"})
+
+def filter_queryset_by_params(queryset, request, fields=(), date_field='created_at'):
+    """
+    Lọc danh sách phía server theo query params.
+    - fields: các tham số lọc bằng (VD: branch, status, flow_type)
+    - date_from / date_to (YYYY-MM-DD): khoảng ngày nửa mở [date_from, date_to + 1)
+    """
+    params = request.query_params
+    for field in fields:
+        value = params.get(field)
+        if value:
+            queryset = queryset.filter(**{field: _filter_value(queryset.model, field, value)})
+
+    date_from = _filter_date(params, 'date_from')
+    date_to = _filter_date(params, 'date_to')
+    if date_from:
+        queryset = queryset.filter(**{f'{date_field}__gte': day_start(date_from)})
+    if date_to:
+        queryset = queryset.filter(**{f'{date_field}__lt': day_start(date_to + timedelta(days=1))})
+    return queryset
+
+class CsvImportMixin:
+    """Thêm API POST .../import_csv/ (multipart, field 'file'; ?dry_run=1 để chỉ kiểm tra)."""
+    import_kind = None
+
+    @action(detail=False, methods=['post'], parser_classes=[MultiPartParser])
+    def import_csv(self, request):
+        uploaded = request.FILES.get('file')
+        if not uploaded:
+            return Response({'error': 'Chưa chọn file CSV'}, status=status.HTTP_400_BAD_REQUEST)
+        dry_run = request.query_params.get('dry_run') in ('1', 'true')
+        try:
+            report = CsvImporter(self.import_kind, dry_run=dry_run).run(uploaded.file)
+        except (ValidationError, UnicodeDecodeError, csv.Error) as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        if report['created']:
+            log_activity(
+                request.user, "NHẬP FILE",
+                f"Nhập {report['created']} dòng {self.import_kind} từ file {uploaded.name}, lỗi {report['error_count']} dòng"
+            )
+        return Response(report)
 
 class BranchViewSet(viewsets.ModelViewSet):
     queryset = Branch.objects.all()
@@ -31,9 +125,28 @@ class RoomClassViewSet(viewsets.ModelViewSet):
     queryset = RoomClass.objects.all()
     serializer_class = RoomClassSerializer
 
-class ProductViewSet(viewsets.ModelViewSet):
+class ProductViewSet(CsvImportMixin, viewsets.ModelViewSet):
     queryset = Product.objects.all()
     serializer_class = ProductSerializer
+    import_kind = 'products'
+
+    @transaction.atomic
+    def perform_create(self, serializer):
+        product = serializer.save()
+        record_initial_stock([product], user=self.request.user if self.request.user.is_authenticated else None)
+
+    @transaction.atomic
+    def perform_update(self, serializer):
+        # Không ghi đè cả dòng: chỉ lưu các trường khác, tồn kho đổi qua sổ kho (điều chỉnh)
+        product = serializer.instance
+        target = serializer.validated_data.pop('stock_quantity', None)
+        for attr, value in serializer.validated_data.items(): setattr(product, attr, value)
+        if serializer.validated_data:
+            product.save(update_fields=list(serializer.validated_data))
+        if target is not None and target != product.stock_quantity:
+            change_stock(product, target - product.stock_quantity, 'ADJUSTMENT', allow_negative=True,
+                         user=self.request.user if self.request.user.is_authenticated else None, note="Sửa tồn kho")
+            product.refresh_from_db(fields=['stock_quantity'])
 
     @action(detail=True, methods=['post'])
     @transaction.atomic
@@ -45,29 +158,52 @@ class ProductViewSet(viewsets.ModelViewSet):
         if quantity <= 0:
             return Response({'error': 'Số lượng nhập phải lớn hơn 0'}, status=status.HTTP_400_BAD_REQUEST)
 
-        product.stock_quantity += quantity
-        product.save()
+        change_stock(product, quantity, 'IMPORT', user=request.user if request.user.is_authenticated else None, note=f"Tổng tiền: {total_cost}")
+        product.refresh_from_db(fields=['stock_quantity'])
 
         if total_cost > 0:
-            CashFlow.objects.create(
+            cash_flow = CashFlow.objects.create(
                 branch=product.branch,
                 flow_type='PAYMENT',
                 category='Nhập hàng hóa',
                 amount=total_cost,
                 description=f"Nhập kho: {quantity} {product.name}"
             )
+            rollups.record_cash_flow(cash_flow)
         
-        ActivityLog.objects.create(
-            user=request.user if request.user.is_authenticated else None,
-            action="NHẬP KHO",
-            content=f"Nhập {quantity} {product.name}. Tổng tiền: {total_cost:,} đ"
+        log_activity(
+            request.user, "NHẬP KHO",
+            f"Nhập {quantity} {product.name}. Tổng tiền: {total_cost:,} đ", durable=True
         )
         
         return Response({'status': 'success', 'message': f'Đã nhập {quantity} {product.name}, tồn kho mới: {product.stock_quantity}'})
 
-class CustomerViewSet(viewsets.ModelViewSet):
-    queryset = Customer.objects.all().order_by('-created_at')
+class CustomerViewSet(CsvImportMixin, viewsets.ModelViewSet):
+    queryset = Customer.objects.all().order_by('-created_at', '-id')
     serializer_class = CustomerSerializer
+    import_kind = 'customers'
+    pagination_class = CreatedAtCursorPagination
+
+    def get_queryset(self):
+        fields = requested_fields(CustomerSerializer, self.request)
+        queryset = super().get_queryset()
+        if 'representative_name' in fields:
+            queryset = queryset.select_related('representative')
+        if 'entourage_count' in fields:
+            queryset = queryset.annotate(entourage_count=Count('entourage'))
+        if self.request.query_params.get('representatives_only') in ('1', 'true'):
+            queryset = queryset.filter(representative__isnull=True)
+        return filter_queryset_by_params(queryset, self.request, fields=('type',))
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        params = self.request.query_params
+        if params.get('representatives_only') in ('1', 'true'):
+            # Chế độ danh sách gọn: chỉ trả trưởng đoàn + entourage_count, không duyệt cây
+            context['entourage_depth'] = 0
+        elif params.get('entourage_depth', '').isdigit():
+            context['entourage_depth'] = min(int(params['entourage_depth']), ENTOURAGE_MAX_DEPTH)
+        return context
 
     @transaction.atomic
     def create(self, request, *args, **kwargs):
@@ -109,13 +245,28 @@ class CustomerViewSet(viewsets.ModelViewSet):
                 if sub_serializer.is_valid(): sub_serializer.save()
         return Response(serializer.data)
 
-class RoomViewSet(viewsets.ModelViewSet):
+class RoomViewSet(CsvImportMixin, viewsets.ModelViewSet):
     queryset = Room.objects.all()
     serializer_class = RoomSerializer
+    import_kind = 'rooms'
     
     def get_queryset(self):
+        # Sơ đồ phòng: lấy room_class, area và lượt ở đang mở của mọi phòng trong số truy vấn cố định
+        # (chỉ những phần client yêu cầu qua ?fields= / ?expand=). Các action ghi (check_in, check_out...)
+        # chỉ cần dòng phòng, không JOIN / prefetch thêm.
         queryset = Room.objects.all()
-        branch_id = self.request.query_params.get('branch', None)
+        fields = requested_fields(RoomSerializer, self.request) if self.action in ('list', 'retrieve') else set()
+        if fields & {'room_class_name', 'price_hourly'}:
+            queryset = queryset.select_related('room_class')
+        if 'area_name' in fields:
+            queryset = queryset.select_related('area')
+        if 'current_booking' in fields:
+            queryset = queryset.prefetch_related(Prefetch(
+                'bookingroom_set',
+                queryset=BookingRoom.objects.filter(check_out_actual__isnull=True).order_by('-id'),
+                to_attr='open_booking_rooms'
+            ))
+        branch_id = int_param(self.request.query_params, 'branch')
         if branch_id is not None:
             queryset = queryset.filter(branch_id=branch_id)
         return queryset
@@ -151,38 +302,47 @@ class RoomViewSet(viewsets.ModelViewSet):
                 if not person.get('address'): person['address'] = main_customer.address
                 create_or_update_customer(person, rep=main_customer)
 
-        booking_code = f"DP{timezone.now().strftime('%Y%m%d%H%M%S')}"
         booking = Booking.objects.create(
-            branch=room.branch, customer=main_customer, status='CHECKED_IN', code=booking_code, total_amount=0
+            branch_id=room.branch_id, customer=main_customer, status='CHECKED_IN',
+            code=next_booking_code(room.branch_id, 'DP'), total_amount=0,
+            check_out_expected=availability.to_datetime(data.get('check_out_expected'))
         )
         
         price_snapshot = 0
         price_config_snapshot = []
 
+        room_class = config_cache.room_class(room.room_class_id)
         if booking_type == 'HOURLY':
-            price_snapshot = room.room_class.base_price_hourly
+            price_snapshot = room_class.base_price_hourly
             # Lưu lại bảng giá lũy tiến tại thời điểm check-in
-            price_config_snapshot = room.room_class.hourly_price_config 
+            price_config_snapshot = room_class.hourly_price_config 
         elif booking_type == 'OVERNIGHT':
-            price_snapshot = room.room_class.base_price_overnight
+            price_snapshot = room_class.base_price_overnight
         else:
             booking_type = 'DAILY'
-            price_snapshot = room.room_class.base_price_daily
+            price_snapshot = room_class.base_price_daily
 
-        BookingRoom.objects.create(
+        booking_room = BookingRoom.objects.create(
             booking=booking, room=room, 
             booking_type=booking_type,
             check_in_actual=timezone.now(), 
             price_snapshot=price_snapshot,
             price_config_snapshot=price_config_snapshot
         )
+        # Giữ các đêm từ nay tới ngày ra dự kiến (chặn nếu trùng đơn đặt trước), theo giờ thì giữ ngày hôm nay
+        try:
+            availability.claim(booking_room, booking_room.check_in_actual, booking.check_out_expected)
+        except availability.RoomUnavailable as e:
+            transaction.set_rollback(True)
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        rollups.record_room_checkin(booking.branch_id, booking_room.check_in_actual)
         room.status = 'OCCUPIED'
         room.save()
+        events.publish_room_status(room, previous_status='AVAILABLE')
 
-        ActivityLog.objects.create(
-            user=request.user if request.user.is_authenticated else None,
-            action="CHECK_IN",
-            content=f"Nhận phòng {room.name} ({booking_type}). Khách: {main_customer.full_name}"
+        log_activity(
+            request.user, "CHECK_IN",
+            f"Nhận phòng {room.name} ({booking_type}). Khách: {main_customer.full_name}", durable=True
         )
 
         return Response({'status': 'success', 'message': f'Đã nhận phòng ({booking_type})'})
@@ -195,14 +355,96 @@ class RoomViewSet(viewsets.ModelViewSet):
             booking = BookingRoom.objects.filter(room=room, check_out_actual__isnull=True).latest('id').booking
             product = Product.objects.get(id=request.data.get('product_id'))
             qty = int(request.data.get('quantity', 1))
-            
-            product.stock_quantity -= qty
-            product.save()
+            if qty <= 0: return Response({'error': 'Số lượng phải lớn hơn 0'}, status=400)
 
-            ServiceOrder.objects.create(booking=booking, product=product, quantity=qty, unit_price_snapshot=product.selling_price)
+            with transaction.atomic():
+                change_stock(product, -qty, 'SALE', booking=booking, user=request.user if request.user.is_authenticated else None)
+                ServiceOrder.objects.create(booking=booking, product=product, quantity=qty, unit_price_snapshot=product.selling_price)
+            report_cache.invalidate(room.branch_id, timezone.localdate())
             return Response({'status': 'success', 'message': 'Đã thêm dịch vụ'})
         except Exception as e: return Response({'error': str(e)}, status=400)
 
+    def build_bill(self, room, booking_room, at):
+        # 1. Tiền phòng + 2. Phụ thu check-in sớm (xem pricing.py)
+        settings, room_class = config_cache.pricing_config(room) # Settings chi nhánh + hạng phòng (cache trong process)
+        bill = pricing.quote_booking_room(booking_room, settings, room_class, at=at)
+        # 3. Tổng hợp tiền
+        service_money = booking_room.booking.service_orders.aggregate(
+            total=Sum(F('quantity') * F('unit_price_snapshot'))
+        )['total'] or 0
+        bill['service_money'] = service_money
+        bill['total_money'] = bill['room_money'] + service_money + bill['early_surcharge']
+        return bill
+
+    @action(detail=True, methods=['get'])
+    def quote(self, request, pk=None):
+        # Báo giá tạm tính tại thời điểm hiện tại (không ghi dữ liệu), UI có thể gọi liên tục
+        room = self.get_object()
+        if room.status != 'OCCUPIED': return Response({'error': 'Phòng trống!'}, status=400)
+        booking_room = BookingRoom.objects.filter(room=room, check_out_actual__isnull=True).select_related('booking').order_by('-id').first()
+        if not booking_room or not booking_room.check_in_actual:
+            return Response({'error': 'Không tìm thấy lượt ở đang mở'}, status=400)
+        bill = self.build_bill(room, booking_room, timezone.now())
+        return Response({
+            'code': booking_room.booking.code,
+            'room_name': room.name,
+            'booking_type': booking_room.get_booking_type_display(),
+            **bill
+        })
+
+    @action(detail=False, methods=['get'])
+    def availability(self, request):
+        # Phòng trống mọi đêm trong [start, end): ?branch=&start=YYYY-MM-DD&end=YYYY-MM-DD&room_class=
+        params = request.query_params
+        start, end = parse_date(params.get('start') or ''), parse_date(params.get('end') or '')
+        branch_id = int_param(params, 'branch')
+        if not branch_id or not start:
+            return Response({'error': 'Cần chọn chi nhánh và ngày nhận phòng'}, status=400)
+        rooms = availability.free_rooms(branch_id, start, end or start + timedelta(days=1), int_param(params, 'room_class'))
+        return Response(list(rooms.values('id', 'name', 'room_class_id', 'room_class__name', 'area_id').order_by('name')))
+
+    @action(detail=False, methods=['get'])
+    def bills(self, request):
+        # Tạm tính tiền của mọi phòng đang có khách trong chi nhánh (chỉ đọc), số query cố định
+        at = timezone.now()
+        booking_rooms = BookingRoom.objects.filter(
+            check_out_actual__isnull=True, check_in_actual__isnull=False, room__status='OCCUPIED'
+        ).select_related('room', 'room__room_class', 'booking').order_by('room__name')
+        branch_id = int_param(request.query_params, 'branch')
+        if branch_id:
+            booking_rooms = booking_rooms.filter(room__branch_id=branch_id)
+        booking_rooms = list(booking_rooms)
+
+        booking_ids = {br.booking_id for br in booking_rooms}
+        service_totals = dict(
+            ServiceOrder.objects.filter(booking_id__in=booking_ids).values('booking_id')
+            .annotate(total=Sum(F('quantity') * F('unit_price_snapshot'))).values_list('booking_id', 'total')
+        )
+        settings_map = {s.branch_id: s for s in BranchSetting.objects.filter(branch_id__in={br.room.branch_id for br in booking_rooms})}
+
+        results = []
+        for br in booking_rooms:
+            bill = pricing.quote_booking_room(br, settings_map.get(br.room.branch_id), br.room.room_class, at=at)
+            service_money = service_totals.get(br.booking_id) or 0
+            results.append({
+                'room_id': br.room_id,
+                'room_name': br.room.name,
+                'code': br.booking.code,
+                'booking_type': br.get_booking_type_display(),
+                'check_in': br.check_in_actual,
+                **bill,
+                'service_money': service_money,
+                'total_money': bill['room_money'] + service_money + bill['early_surcharge'],
+            })
+        return Response({
+            'quoted_at': at,
+            'rooms': results,
+            'summary': {
+                'room_count': len(results),
+                'total_money': sum(r['total_money'] for r in results)
+            }
+        })
+
     @action(detail=True, methods=['post'])
     def check_out(self, request, pk=None):
         room = self.get_object()
@@ -210,111 +452,40 @@ class RoomViewSet(viewsets.ModelViewSet):
         try:
             booking_room = BookingRoom.objects.filter(room=room, check_out_actual__isnull=True).latest('id')
             check_out_time = timezone.now()
-            duration = check_out_time - booking_room.check_in_actual
-            
-            room_money = 0
-            hours = 0 
-            
-            # 1. TÍNH TIỀN PHÒNG (Room Money)
-            if booking_room.booking_type == 'HOURLY':
-                total_hours = max(1, math.ceil(duration.total_seconds() / 3600))
-                hours = total_hours
-                
-                config = booking_room.price_config_snapshot
-                
-                # Logic tính tiền lũy tiến (Tiered Pricing)
-                if config and isinstance(config, list) and len(config) > 0:
-                    room_money = 0
-                    price_map = {}
-                    next_price = 0
-                    
-                    # Parse config
-                    for item in config:
-                        if str(item.get('hour')).lower() == 'next':
-                            next_price = int(item.get('price', 0))
-                        else:
-                            try:
-                                price_map[int(item.get('hour'))] = int(item.get('price', 0))
-                            except ValueError: pass
-                    
-                    # Tính từng giờ
-                    for h in range(1, total_hours + 1):
-                        if h in price_map:
-                            room_money += price_map[h]
-                        else:
-                            # Nếu hết cấu hình, dùng giá 'next' hoặc giá của giờ cuối cùng
-                            room_money += next_price if next_price > 0 else (price_map.get(max(price_map.keys(), default=0), 0))
-                else:
-                    # Logic cũ: Nhân đều
-                    room_money = total_hours * booking_room.price_snapshot
-
-            elif booking_room.booking_type == 'OVERNIGHT':
-                hours = math.ceil(duration.total_seconds() / 3600)
-                room_money = booking_room.price_snapshot 
-            else:
-                # DAILY
-                days = max(1, math.ceil(duration.total_seconds() / 86400))
-                hours = days * 24 
-                room_money = days * booking_room.price_snapshot
-            
-            # 2. TÍNH PHỤ THU CHECK-IN SỚM (Early Check-in Surcharge)
-            settings = getattr(room.branch, 'settings', None) # Lấy settings của chi nhánh
-            early_surcharge = 0
-            
-            if settings and settings.check_in_time:
-                # Chuyển đổi về múi giờ local
-                local_check_in = timezone.localtime(booking_room.check_in_actual)
-                # Tạo mốc giờ chuẩn: Ngày khách vào + Giờ chuẩn (VD: 14:00)
-                standard_check_in = timezone.make_aware(
-                    datetime.combine(local_check_in.date(), settings.check_in_time)
-                )
-                
-                # Nếu khách vào sớm hơn giờ chuẩn
-                if booking_room.check_in_actual < standard_check_in:
-                    early_diff_hours = (standard_check_in - booking_room.check_in_actual).total_seconds() / 3600
-                    # Trừ giờ miễn phí
-                    chargeable_hours = math.ceil(max(0, early_diff_hours - settings.early_checkin_free_hours))
-                    
-                    if chargeable_hours > 0:
-                        # Kiểm tra ngưỡng phạt 1 ngày
-                        if early_diff_hours >= settings.early_checkin_threshold_hours:
-                            early_surcharge = room.room_class.base_price_daily # Phạt 1 ngày
-                        else:
-                            # Tính theo công thức
-                            if settings.early_checkin_method == 'FIXED':
-                                early_surcharge = chargeable_hours * settings.early_checkin_fixed
-                            else: # PERCENT
-                                daily_price = room.room_class.base_price_daily
-                                early_surcharge = chargeable_hours * (settings.early_checkin_percent / 100) * daily_price
-
-            # 3. TỔNG HỢP TIỀN
+            bill = self.build_bill(room, booking_room, check_out_time)
+            room_money, early_surcharge = bill['room_money'], bill['early_surcharge']
+            service_money, total_money = bill['service_money'], bill['total_money']
+            hours = bill['hours']
             booking = booking_room.booking
-            service_money = sum(s.quantity * s.unit_price_snapshot for s in booking.service_orders.all())
-            total_money = room_money + service_money + early_surcharge
-
-            booking_room.check_out_actual = check_out_time
-            booking_room.save()
-            booking.total_amount = total_money
-            booking.status = 'COMPLETED'
-            booking.save()
-            room.status = 'AVAILABLE'
-            room.save()
-
-            # Tạo mô tả cho phiếu thu
-            desc = f"Thu tiền {booking_room.get_booking_type_display()} phòng {room.name}"
-            if early_surcharge > 0:
-                desc += f" (Phụ thu sớm: {int(early_surcharge):,}đ)"
-
-            CashFlow.objects.create(
-                branch=room.branch, booking=booking, flow_type='RECEIPT',
-                category='Thu tiền phòng', amount=total_money, description=desc
-            )
 
-            ActivityLog.objects.create(
-                user=request.user if request.user.is_authenticated else None,
-                action="CHECK_OUT",
-                content=f"Trả phòng {room.name}. Khách: {booking.customer.full_name}. Tổng: {total_money:,}đ (Tiền phòng: {room_money:,}đ, Phụ thu sớm: {int(early_surcharge):,}đ)"
-            )
+            with transaction.atomic():
+                booking_room.check_out_actual = check_out_time
+                booking_room.save()
+                booking.total_amount = total_money
+                booking.status = 'COMPLETED'
+                booking.save()
+                room.status = 'AVAILABLE'
+                room.save()
+                events.publish_room_status(room, previous_status='OCCUPIED')
+
+                # Tạo mô tả cho phiếu thu
+                desc = f"Thu tiền {booking_room.get_booking_type_display()} phòng {room.name}"
+                if early_surcharge > 0:
+                    desc += f" (Phụ thu sớm: {int(early_surcharge):,}đ)"
+
+                cash_flow = CashFlow.objects.create(
+                    branch_id=room.branch_id, booking=booking, flow_type='RECEIPT',
+                    category='Thu tiền phòng', amount=total_money, description=desc
+                )
+                availability.release([booking_room], from_date=timezone.localdate(check_out_time))
+                rollups.record_checkout(booking, service_money)
+                report_cache.invalidate(room.branch_id, timezone.localdate(booking_room.check_in_actual))
+                rollups.record_cash_flow(cash_flow)
+
+                log_activity(
+                    request.user, "CHECK_OUT",
+                    f"Trả phòng {room.name}. Khách: {booking.customer.full_name}. Tổng: {total_money:,}đ (Tiền phòng: {room_money:,}đ, Phụ thu sớm: {int(early_surcharge):,}đ)", durable=True
+                )
 
             return Response({
                 'status': 'success', 'message': 'Trả phòng thành công!',
@@ -333,10 +504,63 @@ class RoomViewSet(viewsets.ModelViewSet):
         except Exception as e: return Response({'status': 'error', 'message': str(e)}, status=400)
 
 class BookingViewSet(viewsets.ModelViewSet):
-    queryset = Booking.objects.all().order_by('-created_at')
+    queryset = Booking.objects.all().order_by('-created_at', '-id')
     serializer_class = BookingSerializer
+    pagination_class = CreatedAtCursorPagination
+
+    def get_serializer_class(self):
+        if self.action == 'list':
+            return BookingListSerializer
+        return BookingSerializer
+
+    def get_queryset(self):
+        if self.action == 'list':
+            queryset = self.list_queryset(super().get_queryset())
+            return filter_queryset_by_params(queryset, self.request, fields=('branch', 'status'))
+        fields = requested_fields(BookingSerializer, self.request)
+        queryset = super().get_queryset()
+        if 'customer_name' in fields:
+            queryset = queryset.select_related('customer')
+        if fields & {'room_name', 'booking_details'} or self.action == 'confirm_checkin':
+            queryset = queryset.prefetch_related(Prefetch('booking_rooms', queryset=BookingRoom.objects.select_related('room')))
+        if 'service_orders' in fields:
+            queryset = queryset.prefetch_related('service_orders__product')
+        return filter_queryset_by_params(queryset, self.request, fields=('branch', 'status'))
+
+    def list_queryset(self, queryset):
+        """Tên khách, phòng đầu tiên, số phòng, tiền dịch vụ tính bằng JOIN + subquery: cả trang là 1 query."""
+        fields = requested_fields(BookingListSerializer, self.request)
+        money = DecimalField(max_digits=14, decimal_places=0)
+        if 'customer_name' in fields:
+            queryset = queryset.annotate(customer_name=F('customer__full_name'))
+        if 'room_name' in fields:
+            first_room = BookingRoom.objects.filter(booking=OuterRef('pk')).order_by('id').values('room__name')[:1]
+            queryset = queryset.annotate(room_name=Coalesce(Subquery(first_room), Value("N/A")))
+        if 'room_count' in fields:
+            stays = BookingRoom.objects.filter(booking=OuterRef('pk')).order_by().values('booking').annotate(n=Count('id')).values('n')
+            queryset = queryset.annotate(room_count=Coalesce(Subquery(stays), 0))
+        if 'service_total' in fields:
+            total = ServiceOrder.objects.filter(booking=OuterRef('pk')).order_by().values('booking').annotate(total=Sum(F('quantity') * F('unit_price_snapshot'), output_field=money)).values('total')
+            queryset = queryset.annotate(service_total=Coalesce(Subquery(total, output_field=money), Value(0), output_field=money))
+        return queryset
+
+    # Sửa / xóa đơn qua API chung: cập nhật bảng tổng hợp trong cùng transaction (giống CashFlowViewSet)
+    @transaction.atomic
+    def perform_create(self, serializer):
+        rollups.record_booking(serializer.save())
+
+    @transaction.atomic
+    def perform_update(self, serializer):
+        rollups.record_booking(serializer.instance, sign=-1)
+        rollups.record_booking(serializer.save())
+
+    @transaction.atomic
+    def perform_destroy(self, instance):
+        rollups.forget_booking(instance)
+        instance.delete()
 
     @action(detail=False, methods=['get'])
+    @replica.replica_reads
     def stats(self, request):
         filter_type = request.query_params.get('filter', 'this_month')
         today = timezone.now().date()
@@ -345,9 +569,10 @@ class BookingViewSet(viewsets.ModelViewSet):
         elif filter_type == 'last_7_days': start, end = today - timedelta(days=7), today
         elif filter_type == 'this_month': start, end = today.replace(day=1), today
         else: start, end = today - timedelta(days=30), today
+        rows = DailyRollup.objects.filter(date__range=[start, end])
         return Response({
-            'revenue_chart': list(Booking.objects.filter(created_at__date__range=[start, end], status='COMPLETED').annotate(date=TruncDate('created_at')).values('date').annotate(total=Sum('total_amount')).order_by('date')), 
-            'occupancy_chart': list(BookingRoom.objects.filter(check_in_actual__date__range=[start, end]).annotate(date=TruncDate('check_in_actual')).values('date').annotate(count=Count('id')).order_by('date')), 
+            'revenue_chart': list(rows.filter(completed_bookings__gt=0).values('date').annotate(total=Sum('revenue')).order_by('date')), 
+            'occupancy_chart': list(rows.filter(room_checkins__gt=0).values('date').annotate(count=Sum('room_checkins')).order_by('date')), 
             'total_rooms': Room.objects.count()
         })
 
@@ -364,12 +589,12 @@ class BookingViewSet(viewsets.ModelViewSet):
             defaults={'phone': customer_data.get('phone')}
         )
         
-        booking_code = f"RES{timezone.now().strftime('%Y%m%d%H%M%S')}"
+        branch = Branch.objects.first()
         booking = Booking.objects.create(
-            branch=Branch.objects.first(), 
+            branch=branch, 
             customer=customer, 
             status='RESERVED', 
-            code=booking_code,
+            code=next_booking_code(branch.id, 'RES'),
             check_in_expected=data.get('check_in_expected'), 
             check_out_expected=data.get('check_out_expected'), 
             note=data.get('note')
@@ -383,29 +608,38 @@ class BookingViewSet(viewsets.ModelViewSet):
                 price_snapshot = 0
                 price_config_snapshot = []
 
+                room_class = config_cache.room_class(room.room_class_id)
                 if booking_type == 'HOURLY':
-                    price_snapshot = room.room_class.base_price_hourly
-                    price_config_snapshot = room.room_class.hourly_price_config
+                    price_snapshot = room_class.base_price_hourly
+                    price_config_snapshot = room_class.hourly_price_config
                 elif booking_type == 'OVERNIGHT':
-                    price_snapshot = room.room_class.base_price_overnight
+                    price_snapshot = room_class.base_price_overnight
                 else:
-                    price_snapshot = room.room_class.base_price_daily
+                    price_snapshot = room_class.base_price_daily
                     booking_type = 'DAILY'
 
-                BookingRoom.objects.create(
+                booking_room = BookingRoom.objects.create(
                     booking=booking, 
                     room=room, 
                     booking_type=booking_type,
                     price_snapshot=price_snapshot,
                     price_config_snapshot=price_config_snapshot
                 )
+                availability.claim(
+                    booking_room,
+                    availability.to_datetime(booking.check_in_expected) or timezone.now(),
+                    availability.to_datetime(booking.check_out_expected)
+                )
             except Room.DoesNotExist:
+                transaction.set_rollback(True)
                 return Response({'error': 'Phòng không tồn tại'}, status=400)
+            except availability.RoomUnavailable as e:
+                transaction.set_rollback(True)
+                return Response({'error': str(e)}, status=400)
 
-        ActivityLog.objects.create(
-            user=request.user if request.user.is_authenticated else None,
-            action="ĐẶT PHÒNG",
-            content=f"Tạo đơn đặt trước {booking.code} cho khách {customer.full_name}"
+        log_activity(
+            request.user, "ĐẶT PHÒNG",
+            f"Tạo đơn đặt trước {booking.code} cho khách {customer.full_name}", durable=True
         )
 
         return Response({'status': 'success', 'message': 'Đặt phòng thành công!', 'booking_id': booking.id})
@@ -452,27 +686,36 @@ class BookingViewSet(viewsets.ModelViewSet):
 
         new_booking_type = data.get('booking_type') 
         
-        for br in booking.booking_rooms.all():
+        for br in booking.booking_rooms.all():  # Đã nạp kèm phòng (get_queryset), không query theo từng phòng
             br.check_in_actual = timezone.now()
             
             if new_booking_type:
                 br.booking_type = new_booking_type
+                room_class = config_cache.room_class(br.room.room_class_id)
                 if new_booking_type == 'HOURLY':
-                    br.price_snapshot = br.room.room_class.base_price_hourly
-                    br.price_config_snapshot = br.room.room_class.hourly_price_config
+                    br.price_snapshot = room_class.base_price_hourly
+                    br.price_config_snapshot = room_class.hourly_price_config
                 elif new_booking_type == 'OVERNIGHT':
-                    br.price_snapshot = br.room.room_class.base_price_overnight
+                    br.price_snapshot = room_class.base_price_overnight
                 elif new_booking_type == 'DAILY':
-                    br.price_snapshot = br.room.room_class.base_price_daily
+                    br.price_snapshot = room_class.base_price_daily
             
             br.save()
+            # Ngày nhận thật / loại lượt ở có thể khác lúc đặt: giữ lại đúng các đêm từ hôm nay tới ngày ra dự kiến
+            try:
+                availability.reconcile(br, br.check_in_actual, availability.to_datetime(booking.check_out_expected))
+            except availability.RoomUnavailable as e:
+                transaction.set_rollback(True)
+                return Response({'error': str(e)}, status=400)
+            previous_status = br.room.status
             br.room.status = 'OCCUPIED'
             br.room.save()
+            events.publish_room_status(br.room, previous_status=previous_status)
+            rollups.record_room_checkin(booking.branch_id, br.check_in_actual)
 
-        ActivityLog.objects.create(
-            user=request.user if request.user.is_authenticated else None,
-            action="NHẬN PHÒNG (ĐẶT TRƯỚC)",
-            content=f"Xác nhận nhận phòng cho đơn {booking.code}"
+        log_activity(
+            request.user, "NHẬN PHÒNG (ĐẶT TRƯỚC)",
+            f"Xác nhận nhận phòng cho đơn {booking.code}", durable=True
         )
 
         return Response({
@@ -482,22 +725,45 @@ class BookingViewSet(viewsets.ModelViewSet):
         })
 
     @action(detail=True, methods=['post'])
+    @transaction.atomic
     def cancel(self, request, pk=None):
         booking = self.get_object()
         booking.status = 'CANCELLED'
         booking.save()
+        availability.release(booking.booking_rooms.all())
 
-        ActivityLog.objects.create(
-            user=request.user if request.user.is_authenticated else None,
-            action="HỦY ĐƠN",
-            content=f"Hủy đơn đặt phòng {booking.code} của khách {booking.customer.full_name}"
+        log_activity(
+            request.user, "HỦY ĐƠN",
+            f"Hủy đơn đặt phòng {booking.code} của khách {booking.customer.full_name}", durable=True
         )
 
         return Response({'status': 'success', 'message': 'Đã hủy đơn đặt phòng'})
 
 class CashFlowViewSet(viewsets.ModelViewSet):
-    queryset = CashFlow.objects.all().order_by('-created_at')
+    queryset = CashFlow.objects.all().order_by('-created_at', '-id')
     serializer_class = CashFlowSerializer
+    pagination_class = CreatedAtCursorPagination
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if 'booking_code' in requested_fields(CashFlowSerializer, self.request):
+            queryset = queryset.select_related('booking')
+        return filter_queryset_by_params(queryset, self.request, fields=('branch', 'flow_type'))
+
+    # Phiếu thu/chi nhập tay: cập nhật bảng tổng hợp trong cùng transaction
+    @transaction.atomic
+    def perform_create(self, serializer):
+        rollups.record_cash_flow(serializer.save())
+
+    @transaction.atomic
+    def perform_update(self, serializer):
+        rollups.record_cash_flow(serializer.instance, sign=-1)
+        rollups.record_cash_flow(serializer.save())
+
+    @transaction.atomic
+    def perform_destroy(self, instance):
+        rollups.record_cash_flow(instance, sign=-1)
+        instance.delete()
 
 class UserViewSet(viewsets.ModelViewSet):
     queryset = User.objects.all()
@@ -526,18 +792,18 @@ class DeviceViewSet(viewsets.ModelViewSet):
         
         cost = int(data.get('cost', 0))
         if cost > 0:
-            CashFlow.objects.create(
+            cash_flow = CashFlow.objects.create(
                 branch=device.branch,
                 flow_type='PAYMENT',
                 category='Chi phí bảo trì',
                 amount=cost,
                 description=f"Bảo trì: {device.name} ({data.get('description')})"
             )
+            rollups.record_cash_flow(cash_flow)
 
-        ActivityLog.objects.create(
-            user=request.user if request.user.is_authenticated else None,
-            action="BẢO TRÌ",
-            content=f"Bảo trì thiết bị {device.name}. Nội dung: {data.get('description')}. Chi phí: {cost:,} đ"
+        log_activity(
+            request.user, "BẢO TRÌ",
+            f"Bảo trì thiết bị {device.name}. Nội dung: {data.get('description')}. Chi phí: {cost:,} đ", durable=True
         )
 
         return Response({'status': 'success', 'message': 'Đã ghi nhận bảo trì thành công'})
@@ -548,20 +814,35 @@ class MaintenanceLogViewSet(viewsets.ModelViewSet):
     
     def get_queryset(self):
         queryset = super().get_queryset()
-        device_id = self.request.query_params.get('device', None)
+        device_id = int_param(self.request.query_params, 'device')
         if device_id:
             queryset = queryset.filter(device_id=device_id)
         return queryset
 
 class ActivityLogViewSet(viewsets.ReadOnlyModelViewSet):
-    queryset = ActivityLog.objects.all().order_by('-created_at')
+    queryset = ActivityLog.objects.all().order_by('-created_at', '-id')
     serializer_class = ActivityLogSerializer
+    pagination_class = CreatedAtCursorPagination
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if 'user_name' in requested_fields(ActivityLogSerializer, self.request):
+            queryset = queryset.select_related('user')
+        return filter_queryset_by_params(queryset, self.request, fields=('user', 'action'))
+
+    @action(detail=False, methods=['get'])
+    def archive(self, request):
+        # Tìm trong nhật ký đã lưu trữ: ?user=&action=&date_from=&date_to=&cursor=
+        queryset = filter_queryset_by_params(ActivityLogArchive.objects.select_related('user'), request, fields=('user', 'action'))
+        paginator = AlwaysCreatedAtCursorPagination()
+        page = paginator.paginate_queryset(queryset, request, view=self)
+        return paginator.get_paginated_response(ActivityLogArchiveSerializer(page, many=True).data)
 
 class BranchSettingViewSet(viewsets.ModelViewSet):
     queryset = BranchSetting.objects.all()
     serializer_class = BranchSettingSerializer
 
-class ReportViewSet(viewsets.ViewSet):
+class ReportViewSet(replica.ReplicaReadMixin, viewsets.ViewSet):
     def get_date_range(self, request):
         filter_type = request.query_params.get('filter', 'this_month')
         today = timezone.now().date()
@@ -572,32 +853,91 @@ class ReportViewSet(viewsets.ViewSet):
         else: start, end = today - timedelta(days=30), today
         return start, end
 
+    def get_rollups(self, request):
+        start, end = self.get_date_range(request)
+        rows = DailyRollup.objects.filter(date__range=[start, end])
+        branch_id = int_param(request.query_params, 'branch')
+        if branch_id:
+            rows = rows.filter(branch_id=branch_id)
+        return rows
+
     @action(detail=False, methods=['get'])
+    @report_cache.cached_report
     def revenue(self, request):
-        start, end = self.get_date_range(request)
-        bookings = Booking.objects.filter(created_at__date__range=[start, end], status='COMPLETED')
-        daily_rev = bookings.annotate(date=TruncDate('created_at')).values('date').annotate(total=Sum('total_amount')).order_by('date')
-        total_rev = bookings.aggregate(Sum('total_amount'))['total_amount__sum'] or 0
-        service_rev = ServiceOrder.objects.filter(booking__in=bookings).aggregate(total=Sum(F('quantity') * F('unit_price_snapshot')))['total'] or 0
+        rows = self.get_rollups(request).filter(completed_bookings__gt=0)
+        daily_rev = rows.values('date').annotate(total=Sum('revenue')).order_by('date')
+        totals = rows.aggregate(total=Sum('revenue'), service=Sum('service_revenue'))
+        total_rev = totals['total'] or 0
+        service_rev = totals['service'] or 0
         return Response({'chart_data': list(daily_rev), 'summary': {'total': total_rev, 'room_revenue': total_rev - service_rev, 'service_revenue': service_rev}})
 
     @action(detail=False, methods=['get'])
+    @report_cache.cached_report
     def finance(self, request):
-        start, end = self.get_date_range(request)
-        flows = CashFlow.objects.filter(created_at__date__range=[start, end])
-        daily = flows.annotate(date=TruncDate('created_at')).values('date', 'flow_type').annotate(amount=Sum('amount')).order_by('date')
-        receipt = flows.filter(flow_type='RECEIPT').aggregate(Sum('amount'))['amount__sum'] or 0
-        payment = flows.filter(flow_type='PAYMENT').aggregate(Sum('amount'))['amount__sum'] or 0
-        return Response({'chart_data': list(daily), 'summary': {'receipt': receipt, 'payment': payment, 'profit': receipt - payment}})
+        rows = self.get_rollups(request)
+        daily = []
+        for r in rows.values('date').annotate(receipt=Sum('receipt'), payment=Sum('payment')).order_by('date'):
+            if r['receipt']: daily.append({'date': r['date'], 'flow_type': 'RECEIPT', 'amount': r['receipt']})
+            if r['payment']: daily.append({'date': r['date'], 'flow_type': 'PAYMENT', 'amount': r['payment']})
+        totals = rows.aggregate(receipt=Sum('receipt'), payment=Sum('payment'))
+        receipt = totals['receipt'] or 0
+        payment = totals['payment'] or 0
+        return Response({'chart_data': daily, 'summary': {'receipt': receipt, 'payment': payment, 'profit': receipt - payment}})
 
     @action(detail=False, methods=['get'])
+    @report_cache.cached_report
     def goods(self, request):
         start, end = self.get_date_range(request)
-        stats = ServiceOrder.objects.filter(created_at__date__range=[start, end]).values('product__name').annotate(total_qty=Sum('quantity'), total_sales=Sum(F('quantity') * F('unit_price_snapshot'))).order_by('-total_qty')
+        stats = ServiceOrder.objects.filter(**date_range_filter('created_at', start, end))
+        branch_id = int_param(request.query_params, 'branch')
+        if branch_id:
+            stats = stats.filter(booking__branch_id=branch_id)
+        stats = stats.values('product__name').annotate(total_qty=Sum('quantity'), total_sales=Sum(F('quantity') * F('unit_price_snapshot'))).order_by('-total_qty')
         return Response(list(stats))
 
     @action(detail=False, methods=['get'])
+    @report_cache.cached_report
     def room_performance(self, request):
         start, end = self.get_date_range(request)
-        stats = BookingRoom.objects.filter(check_in_actual__date__range=[start, end]).values('room__name', 'room__room_class__name').annotate(booking_count=Count('id'), total_revenue=Sum('booking__total_amount')).order_by('-total_revenue')
-        return Response(list(stats))
\ No newline at end of file
+        stats = BookingRoom.objects.filter(**date_range_filter('check_in_actual', start, end))
+        branch_id = int_param(request.query_params, 'branch')
+        if branch_id:
+            stats = stats.filter(booking__branch_id=branch_id)
+        stats = stats.values('room__name', 'room__room_class__name').annotate(booking_count=Count('id'), total_revenue=Sum('booking__total_amount')).order_by('-total_revenue')
+        return Response(list(stats))
+
+    @action(detail=False, methods=['get'])
+    def cache_stats(self, request):
+        return Response(report_cache.stats())
+
+    @action(detail=False, methods=['get'])
+    def writer_stats(self, request):
+        # Hàng đợi ghi của chế độ SQLite production: số request đang chờ, thời gian chờ
+        return Response(sqlite_writer.stats())
+
+class ExportViewSet(viewsets.ViewSet):
+    """
+    Xuất dữ liệu cho kế toán, stream từng chunk (không nạp cả danh sách vào bộ nhớ).
+    Query params: output=csv|jsonl, date_from, date_to, branch (và flow_type, status, user, action tùy loại).
+    """
+    def export(self, request, queryset, columns, name, fields):
+        # Stream chạy sau khi view trả về nên chọn DB replica ngay trên queryset
+        queryset = filter_queryset_by_params(queryset.using(replica.read_alias(request.user)), request, fields=fields)
+        output = request.query_params.get('output', 'csv')
+        return stream_export(queryset, columns, f"{name}_{timezone.localdate():%Y%m%d}", output=output)
+
+    @action(detail=False, methods=['get'])
+    def bookings(self, request):
+        columns = ['id', 'code', 'branch_id', 'customer__full_name', 'status', 'total_amount', 'deposit',
+                   'people_count', 'check_in_expected', 'check_out_expected', 'created_at', 'note']
+        return self.export(request, Booking.objects.order_by('created_at', 'id'), columns, 'bookings', ('branch', 'status'))
+
+    @action(detail=False, methods=['get'])
+    def cash_flows(self, request):
+        columns = ['id', 'branch_id', 'booking__code', 'flow_type', 'category', 'amount', 'description', 'created_at']
+        return self.export(request, CashFlow.objects.order_by('created_at', 'id'), columns, 'cash_flows', ('branch', 'flow_type'))
+
+    @action(detail=False, methods=['get'])
+    def activity_logs(self, request):
+        columns = ['id', 'user__username', 'action', 'content', 'created_at']
+        return self.export(request, ActivityLog.objects.order_by('created_at', 'id'), columns, 'activity_logs', ('user', 'action'))
@@ -44,6 +44,7 @@ function App() {
   const [currentKey, setCurrentKey] = useState("2");
   const [isDetailModalOpen, setIsDetailModalOpen] = useState(false);
   const [detailBooking, setDetailBooking] = useState(null);
+  const [liveRooms, setLiveRooms] = useState(false); // Đang nhận sự kiện phòng qua SSE
   
   const [checkInForm] = Form.useForm();
 
@@ -54,16 +55,59 @@ function App() {
     }
   }, [token, currentKey, timeFilter]);
 
-  const fetchData = async () => {
+  // Nhận sự kiện đổi trạng thái phòng từ server (SSE), chỉ tải lại đúng phòng đó.
+  // Chỉ kết nối khi server hỗ trợ (chạy ASGI); xác thực bằng vé ngắn hạn, không đưa JWT lên URL.
+  useEffect(() => {
+    if (!token) return;
+    let source = null, retryTimer = null, closed = false, reconnecting = false;
+    const connect = async () => {
+      try {
+        const res = await axios.post('/api/events/ticket/');
+        if (!res.data.enabled || closed) return;
+        source = new EventSource(`${axios.defaults.baseURL}/api/events/rooms/?ticket=${encodeURIComponent(res.data.ticket)}`);
+        source.onopen = async () => {
+          setLiveRooms(true);
+          if (reconnecting) {
+            // Mất kết nối một lúc: tải lại sơ đồ phòng một lần cho chắc
+            try { setRooms((await axios.get('/api/rooms/')).data); } catch (error) { /* Lần tải sau sẽ cập nhật */ }
+          }
+        };
+        source.onerror = () => {
+          // Vé chỉ dùng được vài chục giây: tự xin vé mới rồi kết nối lại
+          setLiveRooms(false);
+          source.close();
+          reconnecting = true;
+          if (!closed) retryTimer = setTimeout(connect, 5000);
+        };
+        source.addEventListener('room_status', async (e) => {
+          const event = JSON.parse(e.data);
+          try {
+            const res = await axios.get(`/api/rooms/${event.room_id}/`);
+            setRooms(prev => prev.map(r => r.id === event.room_id ? res.data : r));
+          } catch (error) { /* Bỏ qua, lần tải sau sẽ cập nhật */ }
+        });
+      } catch (error) { /* Không lấy được vé: vẫn dùng nút Cập nhật như cũ */ }
+    };
+    connect();
+    return () => {
+      closed = true;
+      clearTimeout(retryTimer);
+      if (source) source.close();
+      setLiveRooms(false);
+    };
+  }, [token]);
+
+  // includeRooms = false: sơ đồ phòng đã được luồng sự kiện cập nhật, chỉ tải lại đơn / thống kê
+  const fetchData = async (includeRooms = true) => {
     if (rooms.length === 0) setLoading(true);
     try {
       const [roomRes, bookingRes, productRes, statsRes] = await Promise.all([
-        axios.get('/api/rooms/'),
+        includeRooms ? axios.get('/api/rooms/') : null,
         axios.get('/api/bookings/'),
         axios.get('/api/products/'),
         axios.get(`/api/bookings/stats/?filter=${timeFilter}`)
       ]);
-      setRooms(roomRes.data);
+      if (roomRes) setRooms(roomRes.data);
       setBookings(bookingRes.data);
       setProducts(productRes.data);
       setDashboardStats(statsRes.data);
@@ -111,9 +155,13 @@ function App() {
     setIsModalOpen(true);
   };
 
-  const handleViewDetail = (record) => {
-      setDetailBooking(record);
-      setIsDetailModalOpen(true);
+  const handleViewDetail = async (record) => {
+      // Danh sách đơn chỉ có cột gọn, dịch vụ / phòng chi tiết lấy riêng theo đơn
+      try {
+          const res = await axios.get(`/api/bookings/${record.id}/`);
+          setDetailBooking(res.data);
+          setIsDetailModalOpen(true);
+      } catch (error) { message.error("Lỗi tải chi tiết đơn"); }
   };
 
   const printBill = (data) => {
@@ -153,12 +201,13 @@ function App() {
             const payload = {
                 ...values,
                 birth_date: values.birth_date ? values.birth_date.format('YYYY-MM-DD') : null,
+                check_out_expected: values.check_out_expected ? values.check_out_expected.toISOString() : null,
                 accompanying_people: values.accompanying_people ? values.accompanying_people.map(p => ({ ...p, birth_date: p.birth_date ? p.birth_date.format('YYYY-MM-DD') : null })) : []
             };
             await axios.post(`/api/rooms/${selectedRoom.id}/check_in/`, payload);
             message.success('Nhận phòng thành công!');
             setIsModalOpen(false);
-            fetchData(); 
+            fetchData(!liveRooms);
         } catch (error) {
             if (error.errorFields) message.error('Điền đủ thông tin (*)');
             else message.error('Lỗi khi nhận phòng');
@@ -172,7 +221,7 @@ function App() {
                 content: (<div><p>Khách: <b>{data.customer}</b></p><p>Hình thức: <b>{data.booking_type}</b></p><h2 style={{color:'red'}}>TỔNG: {parseInt(data.total_money).toLocaleString()} đ</h2><Button type="primary" icon={<PrinterOutlined />} onClick={() => printBill(data)}>In Hóa Đơn</Button></div>),
             });
             setIsModalOpen(false);
-            fetchData(); 
+            fetchData(!liveRooms);
         } catch (error) { message.error('Lỗi khi trả phòng'); }
     }
   };
@@ -260,7 +309,7 @@ function App() {
          <Button icon={<LogoutOutlined />} onClick={handleLogout}>Đăng xuất</Button>
       </Header>
       <Content style={{ padding: '30px', background: '#f0f2f5' }}>
-        <div style={{ textAlign: 'right', marginBottom: 20 }}><Button type="primary" onClick={fetchData}>🔄 Cập nhật</Button></div>
+        <div style={{ textAlign: 'right', marginBottom: 20 }}><Button type="primary" onClick={() => fetchData()}>🔄 Cập nhật</Button></div>
         
         {renderContent()}
 
@@ -280,6 +329,12 @@ function App() {
                                         </Radio.Group>
                                     </Form.Item>
                                 </Col>
+                                <Col span={24}>
+                                    {/* Giữ phòng đủ các đêm tới ngày ra, để không nhận đặt trước trùng */}
+                                    <Form.Item name="check_out_expected" label="Ngày ra dự kiến (ở nhiều đêm)" style={{marginTop: 10, marginBottom: 0}}>
+                                        <DatePicker showTime format="DD/MM/YYYY HH:mm" style={{width:'100%'}} />
+                                    </Form.Item>
+                                </Col>
                             </Row>
 
                             <Divider orientation="left" style={{borderColor: '#1890ff', color: '#1890ff'}}>Khách chính</Divider>